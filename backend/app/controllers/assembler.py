@@ -0,0 +1,195 @@
+import os
+import subprocess
+from app.controllers.media_finish import FASTSTART, POSTER_AT, POSTER_WIDTH, existing_poster, parse_duration, poster_output, poster_path_for
+
+FRAME_SIZE = (1920, 1080)
+SLIDE_FPS = 30
+
+
+def probe_duration(path):
+    """Container duration in seconds via ffprobe (reads headers only), or None"""
+    cmd = ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", path]
+    try:
+        process = subprocess.run(cmd, check=False, capture_output=True, text=True)
+        return float(process.stdout.strip())
+    except Exception:
+        return None
+
+
+def concat_copy(clips, output_path):
+    """
+    Join clips that share codec settings (e.g. ranges of one Manim scene)
+    without re-encoding; returns output_path, or None on failure.
+    """
+    list_path = output_path + ".txt"
+    with open(list_path, "w") as f:
+        for clip in clips:
+            escaped = os.path.abspath(clip).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+    cmd = ["ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", list_path, "-c", "copy", output_path]
+    try:
+        process = subprocess.run(cmd, check=False, capture_output=True)
+    except Exception as e:
+        print(f"Error joining clips: {e}")
+        return None
+    finally:
+        if os.path.exists(list_path):
+            os.remove(list_path)
+    if process.returncode != 0 or not os.path.exists(output_path):
+        print(f"FFmpeg error: {process.stderr.decode('utf-8', errors='replace')}")
+        return None
+    return output_path
+
+
+class Assembly:
+    """
+    One ffmpeg run that turns scene clips or still slides plus narration
+    tracks into the final fast-start MP4 and its poster frame.
+
+    Scene clips are concatenated, narration tracks are concatenated, and
+    the shorter side is padded (the last frame held, or silence added) so
+    nothing is cut off. Holds, given as (position, seconds) on the clips'
+    timeline, freeze the frame shown at that position for that long; they
+    re-expand waits that static-frame elision rendered as a single frame.
+    A single clip without holds whose narration fits inside it is
+    stream-copied instead of re-encoded. Nothing is written besides the
+    output and the poster.
+    """
+
+    def __init__(self, output_path, clips=(), slides=(), slide_duration=5.0, narration=(),
+                 crf="18", preset="slow", holds=()):
+        if bool(clips) == bool(slides):
+            raise ValueError("Assemble either scene clips or slides")
+        self.output_path = output_path
+        self.clips = list(clips)
+        self.slides = list(slides)
+        self.slide_duration = slide_duration
+        self.narration = list(narration)
+        self.crf = crf
+        self.preset = preset
+        self.holds = sorted(holds)
+        self.poster_path = poster_path_for(output_path)
+
+    def video_duration(self):
+        if self.slides:
+            return len(self.slides) * self.slide_duration
+        durations = [probe_duration(clip) for clip in self.clips]
+        return None if None in durations else sum(durations) + sum(seconds for _, seconds in self.holds)
+
+    def narration_duration(self):
+        durations = [probe_duration(track) for track in self.narration]
+        return None if None in durations else sum(durations)
+
+    def command(self, video_duration=None, narration_duration=None):
+        """The ffmpeg argument list; durations decide padding and stream copy"""
+        cmd = ["ffmpeg", "-y"]
+        if self.slides:
+            for slide in self.slides:
+                cmd += ["-loop", "1", "-framerate", str(SLIDE_FPS), "-t", str(self.slide_duration), "-i", slide]
+        else:
+            for clip in self.clips:
+                cmd += ["-i", clip]
+        video_inputs = list(range(len(self.slides or self.clips)))
+        audio_inputs = []
+        for track in self.narration:
+            audio_inputs.append(len(video_inputs) + len(audio_inputs))
+            cmd += ["-i", track]
+
+        pad = 0.0
+        if self.narration and video_duration is not None and narration_duration is not None:
+            pad = max(0.0, narration_duration - video_duration)
+        total = None
+        if video_duration is not None:
+            total = video_duration + pad
+
+        copy_video = len(self.clips) == 1 and pad == 0.0 and not self.holds
+
+        filters = []
+        if not copy_video:
+            width, height = FRAME_SIZE
+            labels = []
+            for i in video_inputs:
+                label = f"v{i}"
+                if self.slides:
+                    filters.append(
+                        f"[{i}:v]scale={width}:{height}:force_original_aspect_ratio=decrease,"
+                        f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1,format=yuv420p[{label}]"
+                    )
+                else:
+                    filters.append(f"[{i}:v]setsar=1,format=yuv420p[{label}]")
+                labels.append(f"[{label}]")
+            video = labels[0]
+            if len(labels) > 1:
+                filters.append(f"{''.join(labels)}concat=n={len(labels)}:v=1:a=0[vcat]")
+                video = "[vcat]"
+            if self.holds:
+                video = self._expand_holds(filters, video)
+            if pad > 0:
+                filters.append(f"{video}tpad=stop_mode=clone:stop_duration={pad:.3f}[vpad]")
+                video = "[vpad]"
+            # The poster comes off the same decoded frames
+            filters.append(f"{video}split=2[vout][vposter]")
+            filters.append(f"[vposter]select=gte(t\\,{POSTER_AT}),scale={POSTER_WIDTH}:-2[poster]")
+
+        if self.narration:
+            labels = "".join(f"[{i}:a]" for i in audio_inputs)
+            if len(audio_inputs) > 1:
+                filters.append(f"{labels}concat=n={len(audio_inputs)}:v=0:a=1,apad[aout]")
+            else:
+                filters.append(f"{labels}apad[aout]")
+
+        if filters:
+            cmd += ["-filter_complex", ";".join(filters)]
+
+        if copy_video:
+            cmd += ["-map", f"{video_inputs[0]}:v:0", "-c:v", "copy"]
+        else:
+            cmd += ["-map", "[vout]", "-c:v", "libx264", "-crf", self.crf, "-preset", self.preset,
+                    "-pix_fmt", "yuv420p"]
+        if self.narration:
+            cmd += ["-map", "[aout]", "-c:a", "aac"]
+            # apad makes the audio endless; stop at the (padded) video length
+            cmd += ["-t", f"{total:.3f}"] if total is not None else ["-shortest"]
+        cmd += [*FASTSTART, self.output_path]
+
+        if copy_video:
+            cmd += poster_output(self.poster_path, input_index=video_inputs[0])
+        else:
+            cmd += ["-map", "[poster]", "-frames:v", "1", "-update", "1", "-q:v", "4", self.poster_path]
+        return cmd
+
+    def _expand_holds(self, filters, video):
+        """Cut the video at each hold and clone the frame before the cut; returns the new label"""
+        cuts = [position for position, _ in self.holds]
+        parts = len(cuts) + 1
+        filters.append(f"{video}split={parts}{''.join(f'[hs{i}]' for i in range(parts))}")
+        labels = []
+        for i in range(parts):
+            start = cuts[i - 1] if i > 0 else None
+            end = cuts[i] if i < len(cuts) else None
+            trim = ":".join(bound for bound in (
+                f"start={start:.6f}" if start is not None else None,
+                f"end={end:.6f}" if end is not None else None,
+            ) if bound)
+            chain = f"[hs{i}]trim={trim},setpts=PTS-STARTPTS" if trim else f"[hs{i}]setpts=PTS-STARTPTS"
+            if end is not None:
+                chain += f",tpad=stop_mode=clone:stop_duration={self.holds[i][1]:.3f}"
+            filters.append(f"{chain}[h{i}]")
+            labels.append(f"[h{i}]")
+        filters.append(f"{''.join(labels)}concat=n={parts}:v=1:a=0[vheld]")
+        return "[vheld]"
+
+    def run(self):
+        """Write the output; returns (output_path, poster_path or None, duration or None), or None on failure"""
+        os.makedirs(os.path.dirname(self.output_path) or ".", exist_ok=True)
+        video_duration = self.video_duration()
+        narration_duration = self.narration_duration() if self.narration else None
+        try:
+            process = subprocess.run(self.command(video_duration, narration_duration), check=False, capture_output=True)
+        except Exception as e:
+            print(f"Error assembling video: {e}")
+            return None
+        if process.returncode != 0 or not os.path.exists(self.output_path):
+            print(f"FFmpeg error: {process.stderr.decode('utf-8', errors='replace')}")
+            return None
+        return self.output_path, existing_poster(self.poster_path), parse_duration(process.stderr)
@@ -1,157 +1,257 @@
 # app/controllers/combiner.py
+import ast
+import copy
+import hashlib
 import os
 import re
 
-class CombinedCodeGenerator:
-    def __init__(self, code_strings):
-        self.code_strings = code_strings
+# Name of the list of scene classes written at the end of every combined file
+MANIFEST_NAME = "SCENE_MANIFEST"
+SCENE_PREFIX = "LSTMScene"
 
-    def generate_combined_code(self):
-        import_lines = set()
-        code_blocks = []
+# Mobjects that break rendering; a scene using them gets a simple stand-in
+FORBIDDEN_CLASSES = {"Tree", "Node"}
+# Prose lines the LLM wraps around the code
+PROSE_MARKERS = ("Here is", "This code")
+# A chunk that needs more line drops than this is not treated as code
+MAX_DROPPED_LINES = 20
 
-        # Ensure required imports are added.
-        import_lines.add("from manim import *")
-        import_lines.add("import numpy as np")  # Added to allow np.arange
-
-        for code in self.code_strings:
-            # Clean up code to remove markdown delimiters
-            code = code.replace("```python", "").replace("```", "")
-            
-            lines = code.splitlines()
-            block = []
-            for line in lines:
-                # Skip any remaining markdown or explanatory text
-                if line.strip().startswith("from manim import"):
-                    import_lines.add(line.strip())
-                elif line.strip().startswith("import "):
-                    import_lines.add(line.strip())
-                elif not line.startswith("#") and line.strip() and not "Here is" in line and not "This code" in line:
-                    block.append(line)
-            code_blocks.append("\n".join(block).strip())
-        
-        # Basic static content for a working scene
-        simple_scene = """
+# Basic static content for a working scene
+SIMPLE_SCENE = """
 class LSTMScene(Scene):
     def construct(self):
         title = Text("Machine Learning Visualization")
         self.play(Write(title))
         self.wait(1)
         self.play(FadeOut(title))
-        
+
         subtitle = Text("Generated with Nebius AI")
         self.play(Write(subtitle))
         self.wait(1)
         self.play(FadeOut(subtitle))
 """
 
+# Replacement construct() for scenes that use FORBIDDEN_CLASSES
+STAND_IN_CONSTRUCT = """
+def construct(self):
+    title = Text({subtitle!r})
+    self.play(Write(title))
+    self.wait(1)
+    self.play(FadeOut(title))
+
+    # Create simple circle representation instead of Tree
+    circle1 = Circle(radius=0.5).shift(UP)
+    circle2 = Circle(radius=0.5).shift(LEFT + DOWN)
+    circle3 = Circle(radius=0.5).shift(RIGHT + DOWN)
+    line1 = Line(start=np.array([0, 0.5, 0]), end=np.array([-0.5, -0.5, 0]))
+    line2 = Line(start=np.array([0, 0.5, 0]), end=np.array([0.5, -0.5, 0]))
+
+    self.play(Create(circle1), Create(circle2), Create(circle3))
+    self.play(Create(line1), Create(line2))
+
+    subtitle = Text({subtitle!r}).to_edge(DOWN)
+    self.play(Write(subtitle))
+    self.wait(3)
+"""
+
+
+def _number(node, types=(int, float)):
+    """True for a numeric literal of the given types, including a negated one"""
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        node = node.operand
+    return isinstance(node, ast.Constant) and isinstance(node.value, types) and not isinstance(node.value, bool)
+
+
+def _point(x, y):
+    """np.array([x, y, 0])"""
+    array = ast.Attribute(value=ast.Name(id="np", ctx=ast.Load()), attr="array", ctx=ast.Load())
+    coords = ast.List(elts=[x, y, ast.Constant(value=0)], ctx=ast.Load())
+    return ast.Call(func=array, args=[coords], keywords=[])
+
+
+def _is_scene(node):
+    """A class with a construct() method"""
+    return isinstance(node, ast.ClassDef) and any(
+        isinstance(item, ast.FunctionDef) and item.name == "construct" for item in node.body
+    )
+
+
+class SceneFixer(ast.NodeTransformer):
+    """
+    Tree-level fix-ups for generated scene code, applied in a single pass:
+
+    - (x, y) coordinate tuples become np.array([x, y, 0]) points (not *_range arguments)
+    - range() with float bounds becomes np.arange()
+    - FunctionGraph loses the y_range argument it does not accept
+    - references to renamed names (the scene's own class, conflicting
+      helpers) follow the rename
+    """
+
+    def __init__(self, renames=None):
+        self.renames = renames or {}
+
+    def visit_Tuple(self, node):
+        self.generic_visit(node)
+        if isinstance(node.ctx, ast.Load) and len(node.elts) == 2 and all(_number(elt) for elt in node.elts):
+            return ast.copy_location(_point(*node.elts), node)
+        return node
+
+    def visit_keyword(self, node):
+        # x_range=(-3, 3) style arguments are ranges, not points
+        if node.arg and node.arg.endswith("_range") and isinstance(node.value, ast.Tuple):
+            node.value.elts = [self.visit(elt) for elt in node.value.elts]
+            return node
+        return self.generic_visit(node)
+
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        if isinstance(node.func, ast.Name):
+            if node.func.id == "range" and any(_number(arg, float) for arg in node.args):
+                node.func = ast.Attribute(value=ast.Name(id="np", ctx=ast.Load()), attr="arange", ctx=ast.Load())
+            elif node.func.id == "FunctionGraph":
+                node.keywords = [keyword for keyword in node.keywords if keyword.arg != "y_range"]
+        return node
+
+    def visit_Name(self, node):
+        node.id = self.renames.get(node.id, node.id)
+        return node
+
+
+class CombinedCodeGenerator:
+    """
+    Joins the LLM's per-scene code chunks into one Manim script.
+
+    Each chunk is parsed once; imports are merged, every scene class gets a
+    unique name (LSTMScene when there is only one, else LSTMScene01,
+    LSTMScene02, ... in chunk order) and the fix-ups run as tree transforms.
+    Top-level helpers repeated verbatim across chunks are kept once; a
+    helper that reuses a name with a different definition is renamed for
+    its chunk (prefixed with the chunk's scene name). The file ends with
+    SCENE_MANIFEST, the scene names in play order.
+    """
+
+    def __init__(self, code_strings):
+        self.code_strings = code_strings
+        # Scene class names in the last generated file, in order
+        self.scene_names = []
+
+    def generate_combined_code(self):
+        # Ensure required imports are added.
+        import_lines = {"from manim import *", "import numpy as np"}  # numpy for np.array / np.arange
+        chunks = []
+
+        for code in self.code_strings:
+            tree = self._parse_chunk(code)
+            if tree is None:
+                continue
+            chunk_scenes, chunk_helpers = [], []
+            for node in tree.body:
+                if isinstance(node, (ast.Import, ast.ImportFrom)):
+                    import_lines.add(ast.unparse(node))
+                elif _is_scene(node):
+                    chunk_scenes.append(node)
+                elif isinstance(node, (ast.FunctionDef, ast.ClassDef, ast.Assign)):
+                    chunk_helpers.append(node)
+            chunks.append((chunk_scenes, chunk_helpers))
+
+        if not any(chunk_scenes for chunk_scenes, _ in chunks):
+            # Generate a simple working scene if none was found in the code blocks
+            chunks.append(([ast.parse(SIMPLE_SCENE).body[0]], []))
+
+        count = sum(len(chunk_scenes) for chunk_scenes, _ in chunks)
+        names = [SCENE_PREFIX] if count == 1 else [f"{SCENE_PREFIX}{i:02d}" for i in range(1, count + 1)]
+        helpers = {}
+        fixed = []
+        remaining = iter(names)
+        for i, (chunk_scenes, chunk_helpers) in enumerate(chunks, 1):
+            chunk_names = [next(remaining) for _ in chunk_scenes]
+            renames = self._merge_helpers(helpers, chunk_helpers, chunk_names[0] if chunk_names else f"Chunk{i:02d}")
+            fixed += [self._fix_scene(scene, name, renames) for scene, name in zip(chunk_scenes, chunk_names)]
+        fixed_helpers = [ast.fix_missing_locations(SceneFixer(renames).visit(node)) for node, renames in helpers.values()]
+        self.scene_names = names
+
         # Combine unique import lines at the top.
         combined = "\n".join(sorted(import_lines)) + "\n\n"
-        
-        # Check if we can extract a usable scene from the generated code
-        has_valid_scene = False
-        for block in code_blocks:
-            if "class LSTMScene(Scene)" in block:
-                has_valid_scene = True
-                break
-        
-        # Fix common issues in the generated code
-        fixed_blocks = []
-        for block in code_blocks:
-            # Fix coordinate issues - ensure 3D coordinates
-            # Pattern matches things like: Line(start=(-2, 0), end=(-1, 0))
-            block = re.sub(r'(Line|Arrow|Vector|Point)(\s*\()(\s*start\s*=\s*\()([^)]+?)(\))', 
-                          lambda m: self._fix_coordinate(m.group(1), m.group(2), m.group(3), m.group(4), m.group(5)), 
-                          block)
-            
-            # Pattern matches coordinates like (x, y) but not (x, y, z)
-            block = re.sub(r'(\(\s*-?\d+(\.\d+)?\s*,\s*-?\d+(\.\d+)?\s*\))', 
-                          lambda m: self._fix_tuple_coord(m.group(1)), 
-                          block)
-            
-            # Fix FunctionGraph parameters
-            block = block.replace("FunctionGraph(lambda x: x**2, x_range=[-2, 2], y_range=[0, 4]", 
-                                "FunctionGraph(lambda x: x**2, x_range=[-2, 2]")
-            
-            # Fix class naming issues
-            if "class" in block and "Scene" in block and "LSTMScene" not in block:
-                block = block.replace("class MainScene", "class LSTMScene")
-                block = block.replace("class SimpleScene", "class LSTMScene")
-                block = block.replace("class DemoScene", "class LSTMScene")
-            
-            # Add proper Scene inheritance if missing
-            if "class LSTMScene" in block and "Scene" not in block:
-                block = block.replace("class LSTMScene", "class LSTMScene(Scene)")
-            
-            # Fix problematic usage of Tree and Node classes
-            if "Tree(" in block or "Node(" in block:
-                block = self._remove_tree_nodes(block)
-            
-            fixed_blocks.append(block)
-        
-        # Append fixed code blocks separated by two newlines
-        if has_valid_scene:
-            combined += "\n\n".join(fixed_blocks)
-        else:
-            # Generate a simple working scene if none was found in the code blocks
-            combined += simple_scene
-        
-        # Fix problematic range() calls by replacing them with np.arange()
-        combined = combined.replace("range(-1.5, 2, 1)", "np.arange(-1.5, 2, 1)")
-        
+        combined += "".join(ast.unparse(node) + "\n\n\n" for node in fixed_helpers)
+        combined += "\n\n\n".join(ast.unparse(node) for node in fixed)
+        combined += f"\n\n\n{MANIFEST_NAME} = {names!r}\n"
         return combined
 
-    def _fix_coordinate(self, obj_type, open_paren, start_part, coords, close_paren):
-        """Fix coordinates in Line/Arrow objects by ensuring they're 3D"""
-        if ',' in coords and coords.count(',') == 1:  # Only has x,y
-            # Split coordinates and add z=0
-            x, y = coords.split(',')
-            return f"{obj_type}{open_paren}{start_part}np.array([{x.strip()}, {y.strip()}, 0]){close_paren}"
-        return f"{obj_type}{open_paren}{start_part}{coords}{close_paren}"
-    
-    def _fix_tuple_coord(self, coord_tuple):
-        """Convert (x, y) tuples to (x, y, 0) format"""
-        coord_tuple = coord_tuple.strip('()')
-        parts = coord_tuple.split(',')
-        if len(parts) == 2:  # Only has x,y
-            return f"(np.array([{parts[0].strip()}, {parts[1].strip()}, 0]))"
-        return f"({coord_tuple})"
-    
-    def _remove_tree_nodes(self, block):
-        """Replace Tree and Node classes with basic shapes"""
-        # If a scene contains Tree or Node, completely replace it with a simple visualization
-        # This is a drastic but failsafe approach
-        if "def construct" in block:
-            construct_match = re.search(r'def\s+construct\s*\([^)]*\):(.*?)(?:def|\Z)', block, re.DOTALL)
-            if construct_match:
-                # Extract the subtitle if present
-                subtitle_match = re.search(r'Text\s*\(\s*["\']([^"\']+)["\']', construct_match.group(1))
-                subtitle_text = subtitle_match.group(1) if subtitle_match else "Basic Visualization"
-                
-                # Create a simplified replacement
-                simple_viz = f"""
-    def construct(self):
-        title = Text("{subtitle_text}")
-        self.play(Write(title))
-        self.wait(1)
-        self.play(FadeOut(title))
-        
-        # Create simple circle representation instead of Tree
-        circle1 = Circle(radius=0.5).shift(UP)
-        circle2 = Circle(radius=0.5).shift(LEFT + DOWN)
-        circle3 = Circle(radius=0.5).shift(RIGHT + DOWN)
-        line1 = Line(start=np.array([0, 0.5, 0]), end=np.array([-0.5, -0.5, 0]))
-        line2 = Line(start=np.array([0, 0.5, 0]), end=np.array([0.5, -0.5, 0]))
-        
-        self.play(Create(circle1), Create(circle2), Create(circle3))
-        self.play(Create(line1), Create(line2))
-        
-        subtitle = Text("{subtitle_text}").to_edge(DOWN)
-        self.play(Write(subtitle))
-        self.wait(3)
-"""
-                return re.sub(r'def\s+construct\s*\([^)]*\):(.*?)(?:def|\Z)', simple_viz, block, flags=re.DOTALL)
-        return block
+    def _parse_chunk(self, code):
+        """Parse one chunk, dropping markdown fences and top-level prose lines; None if it is not code"""
+        code = code.replace("```python", "").replace("```", "")
+        lines = [line for line in code.splitlines() if not (line.strip().startswith(PROSE_MARKERS) and not line[:1].isspace())]
+        for _ in range(MAX_DROPPED_LINES):
+            try:
+                return ast.parse("\n".join(lines))
+            except SyntaxError as error:
+                index = (error.lineno or 0) - 1
+                # Only unindented lines can be stray prose; anything else is broken code
+                if not 0 <= index < len(lines) or lines[index][:1].isspace():
+                    break
+                del lines[index]
+        print("Skipping a code chunk that does not parse")
+        return None
+
+    def _merge_helpers(self, helpers, chunk_helpers, prefix):
+        """
+        Add a chunk's top-level helpers to helpers ({key: (node, renames)}).
+        Returns {name: new name} for helpers renamed because an earlier
+        chunk defined the same name differently.
+        """
+        keyed = [(_helper_key(node), node) for node in chunk_helpers]
+        renames = {
+            key: f"{prefix}_{key}" for key, node in keyed
+            if key.isidentifier() and key in helpers and ast.dump(helpers[key][0]) != ast.dump(node)
+        }
+        # A helper using a renamed one differs too, even when its own code is identical
+        changed = True
+        while changed:
+            changed = False
+            for key, node in keyed:
+                if key.isidentifier() and key in helpers and key not in renames and _uses_any(node, renames):
+                    renames[key] = f"{prefix}_{key}"
+                    changed = True
+        for key, node in keyed:
+            if key in renames:
+                # Only the definition's own name; references follow through SceneFixer
+                if isinstance(node, ast.Assign):
+                    node.targets = [ast.Name(id=renames[key], ctx=ast.Store())]
+                else:
+                    node.name = renames[key]
+                print(f"Helper {key} differs from an earlier chunk's; renamed to {renames[key]}")
+                key = renames[key]
+            # Helpers shared between chunks are usually repeated verbatim; keep the first
+            helpers.setdefault(key, (node, renames))
+        return renames
+
+    def _fix_scene(self, scene, name, renames=None):
+        """Rename a scene class, make it a Scene and apply the fix-ups"""
+        old_name = scene.name
+        scene.name = name
+        if not scene.bases:
+            # Add proper Scene inheritance if missing
+            scene.bases = [ast.Name(id="Scene", ctx=ast.Load())]
+        if self._uses_forbidden(scene):
+            self._replace_construct(scene)
+        return ast.fix_missing_locations(SceneFixer({**(renames or {}), old_name: name}).visit(scene))
+
+    def _uses_forbidden(self, scene):
+        return any(
+            isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in FORBIDDEN_CLASSES
+            for node in ast.walk(scene)
+        )
+
+    def _replace_construct(self, scene):
+        """Replace a construct() that uses Tree/Node with basic shapes, keeping its first caption"""
+        for i, item in enumerate(scene.body):
+            if isinstance(item, ast.FunctionDef) and item.name == "construct":
+                subtitle = next((
+                    node.args[0].value for node in ast.walk(item)
+                    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "Text"
+                    and node.args and isinstance(node.args[0], ast.Constant) and isinstance(node.args[0].value, str)
+                ), "Basic Visualization")
+                scene.body[i] = ast.parse(STAND_IN_CONSTRUCT.format(subtitle=subtitle)).body[0]
 
     def save_to_file(self, folder="generated_manim", filename="manim.py"):
         if not os.path.exists(folder):
@@ -162,3 +262,71 @@ class LSTMScene(Scene):
         with open(filepath, "w", encoding="utf-8") as f:
             f.write(combined_code)
         return filepath
+
+
+def _helper_key(node):
+    """Name a top-level helper is merged under: its def/class name, or its assignment targets"""
+    if isinstance(node, ast.Assign):
+        return ast.unparse(node.targets)
+    return node.name
+
+
+def _uses_any(node, names):
+    return any(isinstance(child, ast.Name) and child.id in names for child in ast.walk(node))
+
+
+def read_manifest(script_file):
+    """Scene names listed in a combined script's SCENE_MANIFEST, or [] if it has none"""
+    try:
+        with open(script_file, "r", encoding="utf-8") as f:
+            source = f.read()
+    except OSError:
+        return []
+    # Cheap check first; the manifest is always the last statement
+    match = re.search(rf"^{MANIFEST_NAME} = (\[.*\])$", source, re.MULTILINE)
+    if not match:
+        return []
+    try:
+        names = ast.literal_eval(match.group(1))
+    except (ValueError, SyntaxError):
+        return []
+    return [name for name in names if isinstance(name, str)]
+
+
+def scene_fingerprints(source):
+    """
+    {scene name: hash of its normalized code} for every scene in a script.
+
+    A scene's code is normalized by parsing and unparsing it (so comments
+    and formatting do not matter) under a fixed class name, so the same
+    chunk hashes alike whichever position it was combined at. The module's
+    other top-level code (imports, helpers) is included, as the scene may
+    use it. Returns {} if the source does not parse.
+    """
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return {}
+    shared = "\n".join(
+        ast.unparse(node) for node in tree.body
+        if not _is_scene(node) and not (
+            isinstance(node, ast.Assign) and any(isinstance(t, ast.Name) and t.id == MANIFEST_NAME for t in node.targets)
+        )
+    )
+    fingerprints = {}
+    for node in tree.body:
+        if _is_scene(node):
+            scene = SceneFixer({node.name: "Scene_"}).visit(copy.deepcopy(node))
+            scene.name = "Scene_"
+            code = shared + "\n" + ast.unparse(scene)
+            fingerprints[node.name] = hashlib.sha256(code.encode("utf-8")).hexdigest()
+    return fingerprints
+
+
+def scene_fingerprints_file(script_file):
+    """scene_fingerprints for a script on disk; {} if it cannot be read"""
+    try:
+        with open(script_file, "r", encoding="utf-8") as f:
+            return scene_fingerprints(f.read())
+    except OSError:
+        return {}
@@ -0,0 +1,128 @@
+import json
+import os
+import shutil
+import subprocess
+
+# Package finished videos as HLS as well as a single mp4
+HLS_ENABLED = os.getenv("VIDEO_HLS", "").strip().lower() in ("1", "true", "yes")
+HLS_SEGMENT_SECONDS = int(os.getenv("HLS_SEGMENT_SECONDS", "4"))
+# Bitrate ladder as height:video kbps pairs, highest rung first
+HLS_LADDER = os.getenv("HLS_LADDER", "1080:5000,720:2800,360:800")
+HLS_AUDIO_BITRATE = "128k"
+
+MASTER_PLAYLIST = "master.m3u8"
+
+
+def parse_ladder(spec):
+    """Turn "1080:5000,720:2800" into [(1080, 5000), (720, 2800)], highest first"""
+    rungs = []
+    for rung in spec.split(","):
+        rung = rung.strip()
+        if not rung:
+            continue
+        height, kbps = rung.split(":")
+        rungs.append((int(height), int(kbps)))
+    return sorted(rungs, reverse=True)
+
+
+def probe(video_path):
+    """Return (height, has_audio) of a video, or (None, False) if ffprobe fails"""
+    cmd = [
+        "ffprobe", "-v", "error",
+        "-show_entries", "stream=codec_type,height",
+        "-of", "json",
+        video_path,
+    ]
+    try:
+        process = subprocess.run(cmd, check=False, capture_output=True)
+        streams = json.loads(process.stdout or b"{}").get("streams", [])
+    except Exception as e:
+        print(f"Error probing video: {e}")
+        return None, False
+    height = next((s.get("height") for s in streams if s.get("codec_type") == "video"), None)
+    has_audio = any(s.get("codec_type") == "audio" for s in streams)
+    return height, has_audio
+
+
+def ladder_for(source_height, ladder):
+    """Drop rungs taller than the source; never upscale, but keep at least one rung"""
+    if not source_height:
+        return ladder
+    fitting = [rung for rung in ladder if rung[0] <= source_height]
+    return fitting or [(source_height, ladder[-1][1])]
+
+
+def build_command(video_path, output_dir, ladder, has_audio):
+    """One ffmpeg run that encodes every rung and writes the playlists"""
+    count = len(ladder)
+    splits = "".join(f"[s{i}]" for i in range(count))
+    filters = [f"[0:v]split={count}{splits}"]
+    filters += [f"[s{i}]scale=-2:{height}[v{i}]" for i, (height, _) in enumerate(ladder)]
+
+    cmd = ["ffmpeg", "-y", "-i", video_path, "-filter_complex", ";".join(filters)]
+    for i, (_, kbps) in enumerate(ladder):
+        cmd += [
+            "-map", f"[v{i}]",
+            f"-c:v:{i}", "libx264",
+            f"-b:v:{i}", f"{kbps}k",
+            f"-maxrate:v:{i}", f"{int(kbps * 1.07)}k",
+            f"-bufsize:v:{i}", f"{int(kbps * 1.5)}k",
+        ]
+    if has_audio:
+        for _ in ladder:
+            cmd += ["-map", "0:a:0"]
+        cmd += ["-c:a", "aac", "-b:a", HLS_AUDIO_BITRATE]
+
+    if has_audio:
+        stream_map = " ".join(f"v:{i},a:{i}" for i in range(count))
+    else:
+        stream_map = " ".join(f"v:{i}" for i in range(count))
+
+    cmd += [
+        "-preset", "veryfast",
+        "-pix_fmt", "yuv420p",
+        # A keyframe at every segment boundary so each segment starts cleanly
+        "-force_key_frames", f"expr:gte(t,n_forced*{HLS_SEGMENT_SECONDS})",
+        "-sc_threshold", "0",
+        "-f", "hls",
+        "-hls_time", str(HLS_SEGMENT_SECONDS),
+        "-hls_playlist_type", "vod",
+        "-hls_flags", "independent_segments",
+        "-hls_segment_filename", os.path.join(output_dir, "v%v", "seg_%03d.ts"),
+        "-master_pl_name", MASTER_PLAYLIST,
+        "-var_stream_map", stream_map,
+        os.path.join(output_dir, "v%v", "index.m3u8"),
+    ]
+    return cmd
+
+
+def package_hls(video_path, output_dir, ladder=None):
+    """
+    Package video_path as HLS in output_dir.
+
+    Writes one variant playlist and its segments per rung under v<N>/ and a
+    master playlist referring to them by relative path, so the directory
+    can be served from anywhere. Returns the master playlist path, or None
+    if packaging failed.
+    """
+    ladder = parse_ladder(HLS_LADDER) if ladder is None else ladder
+    height, has_audio = probe(video_path)
+    ladder = ladder_for(height, ladder)
+
+    if os.path.exists(output_dir):
+        shutil.rmtree(output_dir)
+    for i in range(len(ladder)):
+        os.makedirs(os.path.join(output_dir, f"v{i}"), exist_ok=True)
+
+    try:
+        process = subprocess.run(build_command(video_path, output_dir, ladder, has_audio),
+                                 check=False, capture_output=True)
+    except Exception as e:
+        print(f"Error packaging HLS: {e}")
+        return None
+
+    master_path = os.path.join(output_dir, MASTER_PLAYLIST)
+    if process.returncode != 0 or not os.path.exists(master_path):
+        print(f"FFmpeg error: {process.stderr.decode('utf-8', errors='replace')}")
+        return None
+    return master_path
@@ -0,0 +1,86 @@
+import os
+import re
+import subprocess
+
+# Put the moov atom at the front of the file so browsers can start playing
+# before the whole video has downloaded
+FASTSTART = ["-movflags", "+faststart"]
+
+POSTER_WIDTH = 640
+# Seconds into the video the poster frame is taken from; Manim scenes often
+# open on an empty frame
+POSTER_AT = 1.0
+
+_PROGRESS_TIME = re.compile(r"time=(\d+):(\d+):(\d+(?:\.\d+)?)")
+
+
+def poster_path_for(video_path):
+    return os.path.splitext(video_path)[0] + "_poster.jpg"
+
+
+def poster_output(poster_path, input_index=0):
+    """
+    ffmpeg arguments for an extra output: one scaled JPEG frame.
+
+    Appended after the main output so the poster comes from the same run
+    that writes the video. Videos shorter than POSTER_AT get no poster.
+    """
+    return [
+        "-map", f"{input_index}:v:0",
+        "-vf", f"select=gte(t\\,{POSTER_AT}),scale={POSTER_WIDTH}:-2",
+        "-frames:v", "1",
+        "-update", "1",
+        "-q:v", "4",
+        "-an",
+        poster_path,
+    ]
+
+
+def parse_duration(stderr):
+    """Seconds written by an ffmpeg run, from the last progress line of its stderr"""
+    if isinstance(stderr, bytes):
+        stderr = stderr.decode("utf-8", errors="replace")
+    matches = _PROGRESS_TIME.findall(stderr or "")
+    if not matches:
+        return None
+    hours, minutes, seconds = matches[-1]
+    return round(int(hours) * 3600 + int(minutes) * 60 + float(seconds), 2)
+
+
+def existing_poster(poster_path):
+    return poster_path if os.path.exists(poster_path) and os.path.getsize(poster_path) > 0 else None
+
+
+def finish_video(video_path):
+    """
+    Rewrite video_path as fast-start MP4 and extract its poster frame.
+
+    Streams are copied, not re-encoded, so this costs one read and one write
+    of the file. Returns (video_path, poster_path or None, duration or None);
+    on failure the original file is left as it was.
+    """
+    temp_path = os.path.splitext(video_path)[0] + "_faststart.mp4"
+    poster_path = poster_path_for(video_path)
+    cmd = [
+        "ffmpeg", "-y",
+        "-i", video_path,
+        "-map", "0",
+        "-c", "copy",
+        *FASTSTART,
+        temp_path,
+        *poster_output(poster_path),
+    ]
+    try:
+        process = subprocess.run(cmd, check=False, capture_output=True)
+    except Exception as e:
+        print(f"Error finishing video: {e}")
+        return video_path, None, None
+
+    if process.returncode != 0 or not os.path.exists(temp_path):
+        print(f"FFmpeg error: {process.stderr.decode('utf-8', errors='replace')}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return video_path, None, None
+
+    os.replace(temp_path, video_path)
+    return video_path, existing_poster(poster_path), parse_duration(process.stderr)
@@ -0,0 +1,299 @@
+import ast
+import os
+import threading
+from app.services import metrics
+from app.controllers.static_elision import ELISION_MIN_WAIT, STATIC_ELISION
+
+# Frame size and rate Manim renders at for each quality flag
+QUALITY_FORMATS = {
+    "l": (854, 480, 15),
+    "m": (1280, 720, 30),
+    "h": (1920, 1080, 60),
+}
+# Manim's defaults for self.play(...) run_time and self.wait()
+DEFAULT_RUN_TIME = 1.0
+DEFAULT_WAIT = 1.0
+# Iterations assumed for loops whose length cannot be read from the code
+LOOP_GUESS = 3
+
+# Rough Cairo renderer figures; the scale below is corrected from real renders
+STARTUP_SECONDS = 5.0
+TEX_SECONDS = 1.5
+FRAME_SECONDS_PER_MEGAPIXEL = 0.02
+OBJECT_SECONDS_PER_MEGAPIXEL = 0.002
+# A wait without updaters repeats a frozen frame, so it costs little beyond encoding
+WAIT_FRAME_FRACTION = 0.1
+
+# Timeout = this many times the estimate, but never under MIN_RENDER_TIMEOUT
+RENDER_TIMEOUT_FACTOR = float(os.getenv("RENDER_TIMEOUT_FACTOR", "3"))
+MIN_RENDER_TIMEOUT = 60
+
+# Constructors that build animations rather than mobjects
+ANIMATIONS = {
+    "AnimationGroup", "ApplyMethod", "Circumscribe", "Create", "DrawBorderThenFill", "FadeIn",
+    "FadeOut", "Flash", "FocusOn", "GrowArrow", "GrowFromCenter", "GrowFromPoint", "Indicate",
+    "LaggedStart", "MoveToTarget", "ReplacementTransform", "Rotate", "ShowCreation",
+    "SpinInFromNothing", "Succession", "Transform", "TransformMatchingShapes",
+    "TransformMatchingTex", "Uncreate", "Unwrite", "Wiggle", "Write",
+}
+# Mobjects that need a LaTeX compile before the first frame
+TEX_MOBJECTS = {"MathTex", "Tex", "Matrix", "DecimalMatrix", "IntegerMatrix", "BulletedList", "Title"}
+
+
+class RenderEstimate:
+    """Predicted length, frame count and render time of one scene at one quality"""
+
+    def __init__(self, play_seconds, wait_seconds, objects, tex_objects, quality, held_seconds=0.0):
+        self.play_seconds = play_seconds
+        self.wait_seconds = wait_seconds
+        # Waits that static-frame elision renders as a single frame
+        self.held_seconds = held_seconds
+        self.objects = objects
+        self.tex_objects = tex_objects
+        self.quality = quality if quality in QUALITY_FORMATS else "h"
+        width, height, self.fps = QUALITY_FORMATS[self.quality]
+        self.megapixels = width * height / 1e6
+        self.frames = round((play_seconds + wait_seconds + held_seconds) * self.fps)
+
+    def raw_seconds(self):
+        """Render time from the cost model alone, before calibration"""
+        frame_seconds = self.megapixels * (FRAME_SECONDS_PER_MEGAPIXEL + OBJECT_SECONDS_PER_MEGAPIXEL * self.objects)
+        played = self.play_seconds * self.fps * frame_seconds
+        waited = self.wait_seconds * self.fps * frame_seconds * WAIT_FRAME_FRACTION
+        # An elided hold still renders its first frame
+        held = frame_seconds if self.held_seconds else 0.0
+        return STARTUP_SECONDS + held + self.tex_objects * TEX_SECONDS + played + waited
+
+    @property
+    def render_seconds(self):
+        return self.raw_seconds() * calibration.scale
+
+    def timeout(self, ceiling):
+        """Seconds to allow the render: proportional to the estimate, capped at ceiling"""
+        return min(ceiling, max(MIN_RENDER_TIMEOUT, RENDER_TIMEOUT_FACTOR * self.render_seconds))
+
+    def __repr__(self):
+        return (f"RenderEstimate({self.play_seconds + self.wait_seconds + self.held_seconds:.1f}s, {self.frames} frames, "
+                f"{self.objects} objects, ~{self.render_seconds:.0f}s to render)")
+
+
+class RenderCalibration:
+    """
+    Correction factor between the cost model and measured render times.
+
+    Kept as an exponential moving average of actual / predicted seconds,
+    so the constants above only need to be in the right order of magnitude.
+    """
+
+    def __init__(self):
+        self.scale = 1.0
+        self._lock = threading.Lock()
+
+    def record(self, estimate, seconds):
+        ratio = seconds / max(1e-6, estimate.raw_seconds())
+        with self._lock:
+            self.scale = 0.8 * self.scale + 0.2 * ratio
+        metrics.set_gauge("render_cost.scale", round(self.scale, 3))
+
+
+calibration = RenderCalibration()
+
+
+def _constant(node, default):
+    """Numeric value of a literal node, or default for anything computed"""
+    try:
+        value = ast.literal_eval(node)
+    except (ValueError, TypeError, SyntaxError):
+        return default
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else default
+
+
+def _keyword(call, name):
+    for keyword in call.keywords:
+        if keyword.arg == name:
+            return keyword.value
+    return None
+
+
+def _iterations(node):
+    """Loop length when it is a literal range() or sequence"""
+    if isinstance(node, (ast.List, ast.Tuple)):
+        return len(node.elts)
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "range":
+        bounds = [_constant(arg, None) for arg in node.args]
+        if bounds and None not in bounds:
+            start, stop, step = (0.0, bounds[0], 1.0) if len(bounds) == 1 else (bounds + [1.0])[:3]
+            if step:
+                return max(0, int((stop - start) / step))
+    return LOOP_GUESS
+
+
+def _self_call(node):
+    """Name of the method in a self.<name>(...) call, else None"""
+    if (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+            and isinstance(node.func.value, ast.Name) and node.func.value.id == "self"):
+        return node.func.attr
+    return None
+
+
+class _SceneCost:
+    """Walks construct() (and the helper methods it calls) adding up timeline and objects"""
+
+    def __init__(self, methods, elide=False):
+        self.methods = methods
+        self.elide = elide
+        self.play_seconds = 0.0
+        self.wait_seconds = 0.0
+        self.held_seconds = 0.0
+        self.objects = 0.0
+        self.tex_objects = 0.0
+        # self.play and self.wait calls, Manim's animation numbering
+        self.animations = 0.0
+        self._active = set()
+
+    def _totals(self):
+        return (self.play_seconds, self.wait_seconds, self.held_seconds, self.objects, self.tex_objects, self.animations)
+
+    def _restore(self, totals):
+        self.play_seconds, self.wait_seconds, self.held_seconds, self.objects, self.tex_objects, self.animations = totals
+
+    def method(self, name, repeat):
+        if name in self._active or name not in self.methods:
+            return
+        self._active.add(name)
+        self.block(self.methods[name].body, repeat)
+        self._active.discard(name)
+
+    def block(self, statements, repeat):
+        for statement in statements:
+            self.statement(statement, repeat)
+
+    def statement(self, node, repeat):
+        if isinstance(node, (ast.For, ast.AsyncFor)):
+            self.expressions(node.iter, repeat)
+            self.block(node.body, repeat * _iterations(node.iter))
+            self.block(node.orelse, repeat)
+        elif isinstance(node, ast.While):
+            self.block(node.body, repeat * LOOP_GUESS)
+        elif isinstance(node, ast.If):
+            # Count whichever branch costs more
+            before = self._totals()
+            self.block(node.body, repeat)
+            body = self._totals()
+            self._restore(before)
+            self.block(node.orelse, repeat)
+            if body[0] + body[1] > self.play_seconds + self.wait_seconds:
+                self._restore(body)
+        elif isinstance(node, (ast.With, ast.AsyncWith)):
+            self.block(node.body, repeat)
+        elif isinstance(node, ast.Try):
+            self.block(node.body, repeat)
+            self.block(node.finalbody, repeat)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            return
+        else:
+            self.expressions(node, repeat)
+
+    def expressions(self, node, repeat):
+        for child in ast.walk(node):
+            if not isinstance(child, ast.Call):
+                continue
+            name = _self_call(child)
+            if name in ("play", "wait"):
+                self.animations += repeat
+            if name == "play":
+                self.play_seconds += repeat * self.run_time(child)
+            elif name == "wait":
+                duration = child.args[0] if child.args else _keyword(child, "duration")
+                duration = DEFAULT_WAIT if duration is None else _constant(duration, DEFAULT_WAIT)
+                if self.elide and duration >= ELISION_MIN_WAIT:
+                    self.held_seconds += repeat * duration
+                else:
+                    self.wait_seconds += repeat * duration
+            elif name is not None:
+                self.method(name, repeat)
+            elif isinstance(child.func, ast.Name) and child.func.id[:1].isupper() and child.func.id not in ANIMATIONS:
+                self.objects += repeat
+                if child.func.id in TEX_MOBJECTS:
+                    self.tex_objects += repeat
+            elif isinstance(child.func, ast.Attribute) and child.func.attr in ("plot", "get_graph"):
+                self.objects += repeat
+
+    @staticmethod
+    def run_time(play):
+        """run_time of a self.play call, or the longest run_time among its animations"""
+        run_time = _keyword(play, "run_time")
+        if run_time is not None:
+            return _constant(run_time, DEFAULT_RUN_TIME)
+        times = [_constant(_keyword(arg, "run_time"), DEFAULT_RUN_TIME)
+                 for arg in play.args if isinstance(arg, ast.Call) and _keyword(arg, "run_time") is not None]
+        return max(times, default=DEFAULT_RUN_TIME)
+
+
+def _scenes(tree):
+    """Top-level classes with a construct() method"""
+    return [node for node in tree.body if isinstance(node, ast.ClassDef)
+            and any(isinstance(stmt, ast.FunctionDef) and stmt.name == "construct" for stmt in node.body)]
+
+
+def _scene_cost(scene, elide=False):
+    methods = {stmt.name: stmt for stmt in scene.body if isinstance(stmt, ast.FunctionDef)}
+    cost = _SceneCost(methods, elide)
+    cost.method("construct", 1)
+    return cost
+
+
+def estimate_source(source, scene_name=None, quality="h", elide=STATIC_ELISION):
+    """
+    Estimate the render cost of a Manim scene from its source without running it.
+
+    Sums self.play run_times and self.wait durations along construct()
+    (loops multiplied out, the costlier branch of an if) and counts mobject
+    constructions. With elide, waits of at least ELISION_MIN_WAIT count
+    toward the length but cost a single frame. scene_name is one scene or a
+    list of them, whose costs are summed; without a match every scene in
+    the file is summed, as a multi-scene script renders them all. Returns a
+    RenderEstimate, or None if the code does not parse or has no Scene class.
+    """
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return None
+    names = [scene_name] if isinstance(scene_name, str) else list(scene_name or [])
+    scenes = _scenes(tree)
+    scenes = [node for node in scenes if node.name in names] or scenes
+    if not scenes:
+        return None
+    totals = [0.0] * 6
+    for scene in scenes:
+        totals = [total + value for total, value in zip(totals, _scene_cost(scene, elide)._totals())]
+    play_seconds, wait_seconds, held_seconds, objects, tex_objects, _ = totals
+    return RenderEstimate(play_seconds, wait_seconds, int(objects), int(tex_objects), quality,
+                          held_seconds=held_seconds)
+
+
+def estimate_file(script_file, scene_name=None, quality="h", elide=STATIC_ELISION):
+    """estimate_source for a script on disk; None if it cannot be read"""
+    try:
+        with open(script_file, "r", encoding="utf-8") as f:
+            return estimate_source(f.read(), scene_name, quality, elide)
+    except OSError:
+        return None
+
+
+def animation_counts(source):
+    """Expected number of animations (self.play and self.wait calls) per scene class; {} if it does not parse"""
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return {}
+    return {scene.name: round(_scene_cost(scene).animations) for scene in _scenes(tree)}
+
+
+def animation_counts_file(script_file):
+    """animation_counts for a script on disk"""
+    try:
+        with open(script_file, "r", encoding="utf-8") as f:
+            return animation_counts(f.read())
+    except OSError:
+        return {}
@@ -0,0 +1,70 @@
+import os
+import time
+import queue
+import itertools
+import threading
+import traceback
+from app.services import metrics
+
+
+class RenderQueue:
+    """
+    Background workers for renders that must not hold up a response, such
+    as the HD pass that replaces a draft video.
+
+    Jobs are plain callables run by `workers` daemon threads, shortest
+    expected job first: each is ranked by its estimated cost in seconds
+    plus the time it was submitted, so a long job is passed by a short one
+    only if the short one arrived less than the difference in cost later
+    and nothing starves. Jobs without a cost run in submission order. A
+    failing job is logged and does not stop the queue.
+    """
+
+    def __init__(self, workers=1, name="render"):
+        self.workers = workers
+        self.name = name
+        self._jobs = queue.PriorityQueue()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._sequence = itertools.count()
+
+    def submit(self, label, fn, *args, cost=0.0, **kwargs):
+        """Queue fn(*args, **kwargs) to run in the background; cost is its expected seconds"""
+        rank = time.monotonic() + (cost or 0.0)
+        self._jobs.put((rank, next(self._sequence), label, fn, args, kwargs))
+        metrics.set_gauge(f"{self.name}_queue.pending", self._jobs.qsize())
+        self._start()
+
+    def pending(self):
+        return self._jobs.qsize()
+
+    def join(self):
+        """Block until every queued job has finished (used by tests and shutdown)"""
+        self._jobs.join()
+
+    def _start(self):
+        with self._lock:
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._run, name=f"{self.name}-worker", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _run(self):
+        while True:
+            _, _, label, fn, args, kwargs = self._jobs.get()
+            metrics.set_gauge(f"{self.name}_queue.pending", self._jobs.qsize())
+            try:
+                print(f"Starting background job: {label}")
+                fn(*args, **kwargs)
+                metrics.incr(f"{self.name}_queue.completed")
+            except Exception as e:
+                print(f"Background job {label} failed: {e}")
+                traceback.print_exc()
+                metrics.incr(f"{self.name}_queue.failed")
+            finally:
+                self._jobs.task_done()
+
+
+# HD upgrades of draft videos; one worker by default since a render uses every core
+hd_render_queue = RenderQueue(workers=int(os.getenv("HD_RENDER_WORKERS", "1")), name="hd_render")
@@ -0,0 +1,92 @@
+import os
+import json
+
+# Render long static waits as a single frame and stretch them back during assembly
+STATIC_ELISION = os.getenv("STATIC_ELISION", "1").strip().lower() in ("1", "true", "yes")
+# Waits shorter than this (seconds) are rendered normally
+ELISION_MIN_WAIT = float(os.getenv("ELISION_MIN_WAIT", "1.0"))
+
+# Prepended to the generated script. Scene.wait is wrapped so that a wait
+# with nothing moving (no updaters, no stop condition) renders one frame and
+# records (scene, position in that scene's clip, seconds still to hold); the
+# list is written to ELIDED_HOLDS_FILE when Manim exits. Under -n a,b the
+# renderer's clock also runs through the skipped animations, so positions
+# are taken relative to the first frame the render actually writes.
+PRELUDE = '''# --- static-frame elision, inserted by the render pipeline ---
+import atexit as _elision_atexit
+import json as _elision_json
+import os as _elision_os
+from manim import Scene as _ElisionScene, config as _elision_config
+
+_ELIDED_HOLDS = []
+_ELIDED_HOLDS_FILE = _elision_os.environ.get("ELIDED_HOLDS_FILE")
+_ELISION_MIN_WAIT = float(_elision_os.environ.get("ELISION_MIN_WAIT", "1.0"))
+_elision_scene_wait = _ElisionScene.wait
+_elision_scene_play = _ElisionScene.play
+
+def _elided_play(self, *args, **kwargs):
+    renderer = getattr(self, "renderer", None)
+    before = getattr(renderer, "time", None)
+    result = _elision_scene_play(self, *args, **kwargs)
+    # Time spent in animations -n skipped is not in this render's clip
+    if before is not None and getattr(renderer, "skip_animations", False):
+        self._elision_skipped = getattr(self, "_elision_skipped", 0.0) + renderer.time - before
+    return result
+
+def _elided_wait(self, duration=1.0, *args, **kwargs):
+    renderer = getattr(self, "renderer", None)
+    if (not _ELIDED_HOLDS_FILE or args or kwargs.get("stop_condition") is not None
+            or kwargs.get("frozen_frame") is False or duration < _ELISION_MIN_WAIT
+            or getattr(renderer, "time", None) is None or self.should_update_mobjects()):
+        return _elision_scene_wait(self, duration, *args, **kwargs)
+    frame = 1.0 / _elision_config.frame_rate
+    before = renderer.time
+    result = _elision_scene_wait(self, frame, **kwargs)
+    # Waits skipped by -n section rendering write no frame and need no hold
+    if renderer.time > before and not getattr(renderer, "skip_animations", False):
+        position = renderer.time - getattr(self, "_elision_skipped", 0.0)
+        _ELIDED_HOLDS.append([type(self).__name__, position, duration - frame])
+    return result
+
+def _write_elided_holds():
+    with open(_ELIDED_HOLDS_FILE, "w") as holds_file:
+        _elision_json.dump(_ELIDED_HOLDS, holds_file)
+
+_ElisionScene.play = _elided_play
+_ElisionScene.wait = _elided_wait
+if _ELIDED_HOLDS_FILE:
+    _elision_atexit.register(_write_elided_holds)
+# --- end of static-frame elision ---
+
+'''
+
+
+def elide_script(script_file, output_file):
+    """Write a copy of script_file whose long static waits render as one frame"""
+    with open(script_file, "r", encoding="utf-8") as f:
+        source = f.read()
+    with open(output_file, "w", encoding="utf-8") as f:
+        f.write(PRELUDE + source)
+    return output_file
+
+
+def render_env(holds_file):
+    """Environment for the Manim process rendering an elided script"""
+    return {**os.environ, "ELIDED_HOLDS_FILE": holds_file, "ELISION_MIN_WAIT": str(ELISION_MIN_WAIT)}
+
+
+def read_holds(holds_file):
+    """
+    The holds recorded by a render as {scene: [(position, seconds)]}, each
+    list sorted by position; empty if the render wrote none.
+    """
+    try:
+        with open(holds_file, "r") as f:
+            recorded = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    holds = {}
+    for scene, position, seconds in recorded:
+        if seconds > 0:
+            holds.setdefault(scene, []).append((float(position), float(seconds)))
+    return {scene: sorted(scene_holds) for scene, scene_holds in holds.items()}
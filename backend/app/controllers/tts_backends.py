@@ -0,0 +1,245 @@
+import os
+import shutil
+import subprocess
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from app.services import metrics
+from app.services.audio_cache import cache_key, create_audio_cache, split_sentences
+
+try:
+    from gtts import gTTS
+except ImportError:  # Render nodes may only have a local engine
+    gTTS = None
+
+# Backends to use, in preference order: any of gtts, espeak, coqui
+TTS_BACKENDS = os.getenv("TTS_BACKENDS", "gtts,espeak,coqui")
+# "latency" tries the fastest measured backend first; "fixed" keeps TTS_BACKENDS order
+TTS_ORDER = os.getenv("TTS_ORDER", "latency").strip().lower()
+# Coqui model; it must already be in the local model cache on isolated nodes
+TTS_COQUI_MODEL = os.getenv("TTS_COQUI_MODEL", "tts_models/en/ljspeech/tacotron2-DDC")
+# How long a backend that failed is moved to the back of the order
+FAILURE_COOLDOWN = 300.0
+
+
+class TTSBackend:
+    """
+    One speech engine. synthesize() writes text to path (which has the
+    backend's extension) and raises on failure.
+    """
+
+    name = None
+    extension = None
+
+    def available(self):
+        return True
+
+    def synthesize(self, text, path, lang="en", tld="us", slow=False):
+        raise NotImplementedError
+
+
+class GTTSBackend(TTSBackend):
+    """Google Translate TTS; needs network access, one request per ~100 characters"""
+
+    name = "gtts"
+    extension = ".mp3"
+
+    def available(self):
+        return gTTS is not None
+
+    def synthesize(self, text, path, lang="en", tld="us", slow=False):
+        gTTS(text=text, lang=lang, tld=tld, slow=slow).save(path)
+
+
+class EspeakBackend(TTSBackend):
+    """espeak-ng (or espeak) run locally; robotic but fast and fully offline"""
+
+    name = "espeak"
+    extension = ".wav"
+
+    def __init__(self):
+        self.executable = shutil.which("espeak-ng") or shutil.which("espeak")
+
+    def available(self):
+        return self.executable is not None
+
+    def synthesize(self, text, path, lang="en", tld="us", slow=False):
+        voice = f"{lang}-{tld}" if lang == "en" and tld in ("us", "gb") else lang
+        cmd = [self.executable, "-v", voice, "-s", "130" if slow else "165", "-w", path, text]
+        process = subprocess.run(cmd, check=False, capture_output=True)
+        if process.returncode != 0 or not os.path.exists(path):
+            raise RuntimeError(f"espeak failed: {process.stderr.decode('utf-8', errors='replace')}")
+
+
+class CoquiBackend(TTSBackend):
+    """Coqui TTS neural model run locally; the model is loaded once per process"""
+
+    name = "coqui"
+    extension = ".wav"
+
+    def __init__(self, model_name=TTS_COQUI_MODEL):
+        self.model_name = model_name
+        self._model = None
+        # The model is not safe to call from several threads at once
+        self._lock = threading.Lock()
+
+    def available(self):
+        try:
+            import TTS  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def synthesize(self, text, path, lang="en", tld="us", slow=False):
+        with self._lock:
+            if self._model is None:
+                from TTS.api import TTS
+                self._model = TTS(self.model_name, progress_bar=False)
+            self._model.tts_to_file(text=text, file_path=path)
+
+
+BACKEND_TYPES = {
+    "gtts": GTTSBackend,
+    "espeak": EspeakBackend,
+    "coqui": CoquiBackend,
+}
+
+
+class TTSRegistry:
+    """
+    The configured backends plus their measured speed.
+
+    Latency is tracked per character of text (an exponential moving average)
+    so short and long clips compare fairly. With order "latency" the
+    fastest backend is tried first; backends not measured yet keep their
+    configured position ahead of measured ones so each gets a first try,
+    and a backend that failed drops to the back for FAILURE_COOLDOWN seconds.
+    """
+
+    def __init__(self, backends, order="latency"):
+        self.backends = backends
+        self.order = order
+        self._latency = {}
+        self._failed_at = {}
+        self._lock = threading.Lock()
+
+    def ordered(self):
+        """Available backends, most preferred first"""
+        backends = [backend for backend in self.backends if backend.available()]
+        now = time.monotonic()
+        with self._lock:
+            def rank(item):
+                position, backend = item
+                failed = now - self._failed_at.get(backend.name, -FAILURE_COOLDOWN) < FAILURE_COOLDOWN
+                if self.order != "latency":
+                    return (failed, position)
+                latency = self._latency.get(backend.name)
+                return (failed, latency is not None, latency or 0.0, position)
+            return [backend for _, backend in sorted(enumerate(backends), key=rank)]
+
+    def record(self, backend, seconds, characters):
+        per_char = seconds / max(1, characters)
+        with self._lock:
+            previous = self._latency.get(backend.name)
+            self._latency[backend.name] = per_char if previous is None else 0.7 * previous + 0.3 * per_char
+            self._failed_at.pop(backend.name, None)
+        metrics.set_gauge(f"tts.{backend.name}.ms_per_char", round(self._latency[backend.name] * 1000, 3))
+
+    def record_failure(self, backend):
+        with self._lock:
+            self._failed_at[backend.name] = time.monotonic()
+        metrics.incr(f"tts.{backend.name}.failures")
+
+    def synthesize(self, backend, text, base_path, **voice):
+        """Write text with one backend to base_path + its extension and return that path"""
+        path = base_path + backend.extension
+        started = time.monotonic()
+        try:
+            backend.synthesize(text, path, **voice)
+        except Exception:
+            self.record_failure(backend)
+            raise
+        self.record(backend, time.monotonic() - started, len(text))
+        return path
+
+
+def create_registry():
+    """Build the registry described by TTS_BACKENDS and TTS_ORDER"""
+    backends = []
+    for name in TTS_BACKENDS.split(","):
+        name = name.strip().lower()
+        if not name:
+            continue
+        if name not in BACKEND_TYPES:
+            print(f"Unknown TTS backend {name!r}; choose from {', '.join(BACKEND_TYPES)}")
+            continue
+        backends.append(BACKEND_TYPES[name]())
+    return TTSRegistry(backends, order=TTS_ORDER)
+
+
+registry = create_registry()
+
+_audio_cache = None
+_audio_cache_lock = threading.Lock()
+
+
+def get_audio_cache():
+    """The process-wide sentence cache, created on first use"""
+    global _audio_cache
+    with _audio_cache_lock:
+        if _audio_cache is None:
+            _audio_cache = create_audio_cache()
+        return _audio_cache
+
+
+def synthesize_cached(backend, text, base_path, lang="en", tld="us", slow=False, max_workers=4):
+    """
+    Write text with one backend to base_path + its extension, sentence by
+    sentence through the audio cache.
+
+    Sentences already synthesized with the same voice and backend are
+    reused, so narrations that overlap only partly still share clips;
+    missing sentences are synthesized in parallel and added to the cache.
+    """
+    cache = get_audio_cache()
+    voice = {"lang": lang, "tld": tld, "slow": slow}
+    sentences = split_sentences(text) or [text]
+    keys = [cache_key(sentence, lang, tld, slow, backend.name) for sentence in sentences]
+    clips = [cache.get(key, backend.extension) for key in keys]
+
+    def fill(index):
+        fresh = registry.synthesize(backend, sentences[index], f"{base_path}.s{index:03d}", **voice)
+        return cache.put(keys[index], backend.extension, fresh)
+
+    missing = [i for i, clip in enumerate(clips) if clip is None]
+    if missing:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(missing))) as executor:
+            for index, clip in zip(missing, executor.map(fill, missing)):
+                clips[index] = clip
+
+    output_path = base_path + backend.extension
+    try:
+        return join_clips(clips, output_path)
+    except FileNotFoundError:
+        # A clip was evicted between lookup and join; synthesize uncached
+        return registry.synthesize(backend, text, base_path, **voice)
+
+
+def join_clips(clip_paths, output_path):
+    """Join clips written by one backend, in order, into output_path"""
+    if output_path.endswith(".wav"):
+        with wave.open(output_path, "wb") as track:
+            for i, clip in enumerate(clip_paths):
+                with wave.open(clip, "rb") as source:
+                    if i == 0:
+                        track.setparams(source.getparams())
+                    track.writeframes(source.readframes(source.getnframes()))
+        return output_path
+
+    # MP3 is a plain sequence of frames, so the clips join by concatenation
+    with open(output_path, "wb") as track:
+        for clip in clip_paths:
+            with open(clip, "rb") as source:
+                shutil.copyfileobj(source, track)
+    return output_path
@@ -6,19 +6,55 @@ import os
 from datetime import datetime
 import tempfile
 import re
+import time
+import uuid
 from PIL import Image, ImageDraw, ImageFont
 import textwrap
+from concurrent.futures import ThreadPoolExecutor
 from app.controllers.voiceover_maker import VoiceOverMaker
+from app.controllers.media_finish import FASTSTART, finish_video
+from app.controllers.assembler import Assembly, concat_copy, probe_duration
+from app.controllers.combiner import read_manifest, scene_fingerprints_file
+from app.controllers import render_cost, static_elision
+from app.controllers.static_elision import ELISION_MIN_WAIT, STATIC_ELISION
+from app.services.fileops import place_file
+from app.services.scene_cache import get_scene_cache, scene_key
+from app.services.text_cache import get_text_cache, shared_text_script, warmup_source
+
+# Manim flags per quality: "l" is the quick draft, "h" the final 1080p render
+QUALITY_FLAGS = {
+    "l": ["-q", "l"],
+    "m": ["-q", "m"],
+    "h": ["-q", "h", "--resolution", "1920,1080"],
+}
+# Upper bounds on a Manim render; the actual timeout scales with the estimated cost
+RENDER_TIMEOUTS = {
+    "l": 300,
+    "m": 600,
+    "h": int(os.getenv("HD_RENDER_TIMEOUT", "900")),
+}
+# Manim processes one render may use; scenes are split by animation index across them
+RENDER_PROCESSES = max(1, int(os.getenv("RENDER_PROCESSES", "1")))
+# Fewer animations than this per process is not worth another Manim start-up
+MIN_ANIMATIONS_PER_PART = 4
 
 class VideoMaker:
-    def __init__(self, script_file, scene_name="MainScene", quality="l", preview=True, session_id=None):
+    def __init__(self, script_file, scene_name="MainScene", quality="l", preview=True, session_id=None, narration=None):
         self.script_file = script_file
+        # Per-scene narration texts (the director's subtitle_script values)
+        self.narration = narration
         self.scene_name = scene_name
         self.quality = quality
         self.preview = preview
         self.session_id = session_id
         # Store AI response for fallback mechanism
         self.ai_response = self._extract_ai_response()
+        # Poster frame and duration of the final video, set by render_video
+        self.poster_path = None
+        self.duration = None
+        self._finished_path = None
+        # Frame holds elided from the Manim render, re-expanded during assembly
+        self._holds = []
 
     def _extract_ai_response(self):
         """Extract the AI explanation from the generated Manim script comments"""
@@ -45,57 +81,145 @@ class VideoMaker:
             return "Advanced mathematical concepts visualization."
 
     def render_video(self, add_voiceover=True):
-        # First try the standard Manim approach
-        video_path = self._try_manim_render()
-        if video_path and os.path.exists(video_path):
+        # With per-scene narration the voiceover is synthesized while we render
+        voiceover = self._start_voiceover() if add_voiceover else None
+
+        # First try the standard Manim approach; scene clips, holds and
+        # narration are then assembled in a single ffmpeg pass
+        clips = self._try_manim_render()
+        if clips and all(os.path.exists(clip) for clip in clips):
             if add_voiceover:
-                video_path = self._add_voiceover_to_video(video_path)
-            return video_path
+                video_path = self._add_voiceover_to_video(clips, self._narration(voiceover))
+            else:
+                video_path = self._assemble(clips)
+            return self._finish(video_path)
             
-        # If Manim fails, fall back to automatic video generation
+        # If Manim fails, fall back to automatic video generation; the slides
+        # are encoded together with the narration in a single pass
         print("Manim rendering failed. Generating automatic video instead.")
-        video_path = self._generate_auto_video()
-        if add_voiceover and video_path:
-            video_path = self._add_voiceover_to_video(video_path)
+        voiceover_maker = self._narration(voiceover) if add_voiceover else None
+        video_path = self._generate_auto_video(voiceover_maker)
+        if voiceover_maker and video_path and video_path != self._finished_path:
+            # The last-resort fallback clip still needs its narration
+            video_path = self._add_voiceover_to_video([video_path], voiceover_maker)
+        return self._finish(video_path)
+
+    def _start_voiceover(self):
+        """Start synthesizing the per-scene narration in the background"""
+        if not self.narration:
+            return None
+        voiceover_maker = VoiceOverMaker()
+        executor = ThreadPoolExecutor(max_workers=1)
+        future = executor.submit(voiceover_maker.generate_scene_voiceovers, self.narration)
+        executor.shutdown(wait=False)
+        return voiceover_maker, future
+
+    def _finish(self, video_path):
+        """Make sure the final video is fast-start and has a poster frame"""
+        if not video_path or not os.path.exists(video_path):
+            return video_path
+        if video_path != self._finished_path:
+            # Not written by one of our own ffmpeg runs (e.g. Manim's output)
+            video_path, self.poster_path, self.duration = finish_video(video_path)
+            self._finished_path = video_path
         return video_path
+
+    def _finished(self, video_path, poster_path, duration):
+        self._finished_path = video_path
+        self.poster_path = poster_path
+        self.duration = duration
     
-    def _add_voiceover_to_video(self, video_path):
-        """Add voiceover to the video using VoiceOverMaker"""
+    def _narration(self, voiceover=None):
+        """A VoiceOverMaker holding the finished narration track, or None"""
         try:
-            # Create voiceover maker instance
-            voiceover_maker = VoiceOverMaker()
-            
-            # Extract text from script
-            voiceover_maker.set_text_from_script(self.script_file)
-            
-            # If no text extracted from script, use AI response
-            if not voiceover_maker.text or len(voiceover_maker.text) < 10:
-                voiceover_maker.set_text(self.ai_response)
-            
-            # Generate voiceover audio
-            voiceover_maker.generate_voiceover()
-            
-            # Combine with video
+            voiceover_maker = None
+            if voiceover:
+                # Narration started in _start_voiceover; normally done by now
+                voiceover_maker, future = voiceover
+                if not future.result():
+                    voiceover_maker = None
+
+            if voiceover_maker is None:
+                # Create voiceover maker instance
+                voiceover_maker = VoiceOverMaker()
+                
+                # Extract text from script
+                voiceover_maker.set_text_from_script(self.script_file)
+                
+                # If no text extracted from script, use AI response
+                if not voiceover_maker.text or len(voiceover_maker.text) < 10:
+                    voiceover_maker.set_text(self.ai_response)
+                
+                # Generate voiceover audio
+                voiceover_maker.generate_voiceover()
+
             if voiceover_maker.output_path and os.path.exists(voiceover_maker.output_path):
-                # Generate output filename with session_id for uniqueness
-                if self.session_id:
-                    output_dir = os.path.dirname(video_path)
-                    timestamp = int(datetime.now().timestamp())
-                    basename = f"video_{self.session_id}_{timestamp}_with_audio.mp4"
-                    output_path = os.path.join(output_dir, basename)
-                else:
-                    output_path = None
-                    
-                return voiceover_maker.combine_with_video(video_path, output_path)
+                return voiceover_maker
+            return None
+            
+        except Exception as e:
+            print(f"Error generating voiceover: {e}")
+            return None
+    
+    def _add_voiceover_to_video(self, clips, voiceover_maker):
+        """Join the clips and mux a finished narration into them using VoiceOverMaker"""
+        if voiceover_maker is None:
+            return self._assemble(clips)
+        try:
+            # Generate output filename with session_id for uniqueness
+            if self.session_id:
+                output_dir = os.path.dirname(clips[0])
+                timestamp = int(datetime.now().timestamp())
+                basename = f"video_{self.session_id}_{timestamp}_with_audio.mp4"
+                output_path = os.path.join(output_dir, basename)
+            else:
+                output_path = None
                 
-            return video_path
+            combined_path = voiceover_maker.combine_with_video(clips, output_path, holds=self._holds)
+            if combined_path != clips:
+                self._finished(combined_path, voiceover_maker.poster_path, voiceover_maker.duration)
+                return combined_path
             
         except Exception as e:
             print(f"Error adding voiceover: {e}")
-            return video_path
+        return self._assemble(clips)
         
+    def _assemble(self, clips):
+        """Join the clips and stretch elided waits back to full length, with no narration"""
+        if len(clips) == 1 and not self._holds:
+            return clips[0]
+        name, ext = os.path.splitext(clips[0])
+        result = Assembly(f"{name}_held{ext}", clips=clips, holds=self._holds).run()
+        if result is None:
+            # Without the joined video only the first scene can be shown
+            return clips[0]
+        self._finished(*result)
+        return result[0]
+
+    def _scenes(self):
+        """Scenes to render: scene_name if the script has it, else every scene in its manifest"""
+        manifest = read_manifest(self.script_file)
+        if not manifest or self.scene_name in manifest:
+            return [self.scene_name]
+        return manifest
+
+    def _timeline_holds(self, clips, holds):
+        """Each scene's holds moved onto the timeline of the clips played back to back"""
+        if len(clips) == 1:
+            return holds.get(clips[0][0], [])
+        joined_holds = []
+        offset = 0.0
+        for scene, clip in clips:
+            joined_holds += [(offset + position, seconds) for position, seconds in holds.get(scene, [])]
+            duration = probe_duration(clip)
+            if duration is None:
+                print(f"Could not read the length of {clip}; joining without holds")
+                return []
+            offset += duration
+        return joined_holds
+
     def _try_manim_render(self):
-        """Try to render with Manim first"""
+        """Try to render with Manim first; returns the scene clips in play order, or None"""
         try:
             # Check if manim is installed
             process = subprocess.run(["manim", "--version"], 
@@ -108,66 +232,233 @@ class VideoMaker:
             if process.returncode != 0:
                 print("Manim check failed. Using automatic video generation.")
                 return None
-                
-            # Improved command with higher resolution
-            command = ["manim", "render"]
-            
-            if self.preview:
-                command.append("-p")
-            
-            # Higher quality for better visibility
-            command.extend(["-q", "h"])  # Use higher quality
-            
-            # Use a larger resolution
-            command.extend(["--resolution", "1920,1080"])
-            
-            # Add flags to avoid LaTeX issues
-            command.append("--disable_caching")
-            
-            # Append script file and scene name
-            command.append(self.script_file)
-            command.append(self.scene_name)
-            
-            print(f"Executing command: {' '.join(command)}")
-            
-            # Execute the command
-            process = subprocess.run(command, 
-                                   check=False, 
-                                   capture_output=True, 
-                                   text=True,
-                                   encoding='utf-8',
-                                   errors='replace',
-                                   timeout=120)  # 2-minute timeout
-            
-            if process.returncode != 0:
-                print(f"Manim error: {process.stderr}")
-                return None
-                
-            # Try to find the output video
-            media_dir = os.path.join(os.getcwd(), 'media', 'videos')
-            for root, dirs, files in os.walk(media_dir):
-                for file in files:
-                    if file.endswith('.mp4') and self.scene_name in file:
-                        return os.path.join(root, file)
-                        
-            # Look in standard locations
-            standard_path = os.path.join(media_dir, 'manim', '480p15', f"{self.scene_name}.mp4")
-            if os.path.exists(standard_path):
-                return standard_path
-                
-            # Find any mp4 file
-            for root, dirs, files in os.walk(media_dir):
-                for file in files:
-                    if file.endswith('.mp4'):
-                        return os.path.join(root, file)
-                        
-            return None
+            manim_version = process.stdout.strip()
+            
+            # Each render gets its own media directory, so concurrent draft
+            # and HD renders of the same script never pick up each other's files
+            render_dir = os.path.join(os.getcwd(), 'media', 'renders', uuid.uuid4().hex[:12])
+            os.makedirs(render_dir, exist_ok=True)
+            
+            # Text SVGs go to the shared text cache
+            script_file = shared_text_script(self.script_file, os.path.join(render_dir, os.path.basename(self.script_file)))
+            # Long static waits render as one frame each; assembly holds them again
+            if STATIC_ELISION:
+                script_file = static_elision.elide_script(script_file, script_file)
+            
+            scenes = self._scenes()
+            
+            # Scenes unchanged since an earlier request come from the scene cache
+            keys = self._scene_keys(scenes, manim_version)
+            outputs, holds = self._cached_scenes(keys, render_dir)
+            to_render = [scene for scene in scenes if scene not in outputs]
+            if to_render:
+                rendered, rendered_holds = self._render_scenes(script_file, to_render, render_dir)
+                if not rendered:
+                    return None
+                outputs.update(rendered)
+                holds.update(rendered_holds)
+                self._store_scenes(keys, rendered, rendered_holds)
+            
+            clips = [(scene, outputs[scene]) for scene in scenes if scene in outputs]
+            if not clips:
+                # Manim named the file differently; take whatever it wrote
+                clips = [(scenes[0], next(iter(outputs.values())))]
+            self._holds = self._timeline_holds(clips, holds)
+            return [clip for _, clip in clips]
             
         except Exception as e:
             print(f"Error in Manim rendering: {e}")
             return None
-            
-    def _generate_auto_video(self):
+
+    def _render_scenes(self, script_file, scenes, render_dir):
+        """Render scenes with Manim; returns ({scene: video path}, {scene: holds}) or (None, {})"""
+        # Long scenes get proportionally longer before we give up on them
+        ceiling = RENDER_TIMEOUTS.get(self.quality, RENDER_TIMEOUTS["h"])
+        estimate = render_cost.estimate_file(self.script_file, scenes, self.quality)
+        timeout = estimate.timeout(ceiling) if estimate else ceiling
+        print(f"Render estimate: {estimate}; timeout {timeout:.0f}s")
+        
+        outputs = None
+        parts = self._render_parts(scenes)
+        if RENDER_PROCESSES > 1 and len(parts) > 1:
+            outputs, holds = self._render_parallel(script_file, parts, render_dir, timeout)
+        if outputs is None:
+            started = time.monotonic()
+            outputs, holds = self._run_manim(script_file, scenes, render_dir, timeout)
+            if outputs and estimate:
+                render_cost.calibration.record(estimate, time.monotonic() - started)
+        return outputs, holds
+
+    def _scene_keys(self, scenes, manim_version):
+        """Scene cache key per scene, or {} when the cache is off"""
+        if get_scene_cache() is None:
+            return {}
+        fingerprints = scene_fingerprints_file(self.script_file)
+        # Everything besides the code that changes the rendered clip
+        profile = {
+            "manim": manim_version,
+            "flags": QUALITY_FLAGS.get(self.quality, QUALITY_FLAGS["h"]),
+            "elision": ELISION_MIN_WAIT if STATIC_ELISION else None,
+        }
+        return {scene: scene_key(fingerprints[scene], profile, self.session_id)
+                for scene in scenes if scene in fingerprints}
+
+    def _cached_scenes(self, keys, render_dir):
+        """Clips and holds of the scenes already in the cache, placed into render_dir"""
+        outputs = {}
+        holds = {}
+        cache = get_scene_cache()
+        for scene, key in keys.items():
+            cached = cache.get_scene(key)
+            if cached is None:
+                continue
+            # Later steps may rewrite the clip in place, so never hand out the cache's own path
+            clip = os.path.join(render_dir, f"cached_{scene}.mp4")
+            place_file(cached[0], clip)
+            outputs[scene] = clip
+            holds[scene] = cached[1]
+            print(f"Reusing cached render of {scene}")
+        return outputs, holds
+
+    def _store_scenes(self, keys, outputs, holds):
+        for scene, clip in outputs.items():
+            if scene in keys:
+                try:
+                    get_scene_cache().put_scene(keys[scene], clip, holds.get(scene, []))
+                except OSError as e:
+                    print(f"Could not cache the render of {scene}: {e}")
+
+    def _run_manim(self, script_file, scenes, media_dir, timeout, animations=None, dry_run=False):
+        """
+        One Manim process rendering scenes (optionally only an animation
+        range, as start and end, end None for open-ended) into media_dir.
+        Returns ({scene: video path}, {scene: holds}), or (None, {}) on failure.
+        """
+        # Text SVGs are read from and written to the shared text cache (the
+        # script's prelude makes the writes atomic); LaTeX keeps its own directory
+        text_cache = get_text_cache()
+        os.makedirs(media_dir, exist_ok=True)
+        config_file = os.path.join(media_dir, 'manim.cfg')
+        with open(config_file, 'w', encoding='utf-8') as f:
+            f.write(f"[CLI]\ntext_dir = {text_cache.directory}\ntex_dir = {os.path.join(media_dir, 'tex')}\n")
+
+        # Improved command with higher resolution
+        command = ["manim", "render"]
+        
+        if self.preview:
+            command.append("-p")
+        
+        # Draft ("l") renders 480p15 in a fraction of the time; "h" is the full 1080p pass
+        command.extend(QUALITY_FLAGS.get(self.quality, QUALITY_FLAGS["h"]))
+        command.extend(["--media_dir", media_dir, "--config_file", config_file])
+        if dry_run:
+            command.append("--dry_run")
+        
+        # Add flags to avoid LaTeX issues
+        command.append("--disable_caching")
+        
+        if animations:
+            start, end = animations
+            command.extend(["-n", f"{start},{end}" if end is not None else str(start)])
+        
+        env = None
+        holds_file = None
+        if STATIC_ELISION:
+            os.makedirs(media_dir, exist_ok=True)
+            holds_file = os.path.join(media_dir, "holds.json")
+            env = static_elision.render_env(holds_file)
+        
+        # Append script file and scene names
+        command.append(script_file)
+        command.extend(scenes)
+        
+        print(f"Executing command: {' '.join(command)}")
+        
+        # Execute the command
+        process = subprocess.run(command, 
+                               check=False, 
+                               capture_output=True, 
+                               text=True,
+                               encoding='utf-8',
+                               errors='replace',
+                               timeout=timeout,
+                               env=env)
+        
+        text_cache.refresh()
+        if process.returncode != 0:
+            print(f"Manim error: {process.stderr}")
+            return None, {}
+        
+        # Find the output videos; partial movie files live under partial_movie_files
+        outputs = {}
+        for root, dirs, files in os.walk(os.path.join(media_dir, 'videos')):
+            if 'partial_movie_files' in root:
+                continue
+            for file in files:
+                if file.endswith('.mp4'):
+                    outputs[os.path.splitext(file)[0]] = os.path.join(root, file)
+        holds = static_elision.read_holds(holds_file) if holds_file else {}
+        return outputs or None, holds
+
+    def _render_parts(self, scenes):
+        """
+        Split the render into (scene, animation range) jobs for RENDER_PROCESSES
+        workers. Scenes are cut by animation index into ranges of at least
+        MIN_ANIMATIONS_PER_PART; the last range of a scene is open-ended so an
+        under-counted scene still renders to the end.
+        """
+        counts = render_cost.animation_counts_file(self.script_file)
+        parts = []
+        for scene in scenes:
+            count = counts.get(scene, 0)
+            pieces = max(1, min(RENDER_PROCESSES, count // MIN_ANIMATIONS_PER_PART))
+            size = -(-count // pieces) if count else 0
+            for i in range(pieces):
+                end = (i + 1) * size - 1 if i < pieces - 1 else None
+                parts.append((scene, (i * size, end) if pieces > 1 else None))
+        return parts
+
+    def _render_parallel(self, script_file, parts, render_dir, timeout):
+        """
+        Render the parts in separate Manim processes and stitch each scene's
+        ranges back together without re-encoding. Returns the same as
+        _run_manim, or (None, {}) if any part failed.
+        """
+        def render(indexed):
+            i, (scene, animations) = indexed
+            media_dir = os.path.join(render_dir, f"part{i:03d}")
+            outputs, holds = self._run_manim(script_file, [scene], media_dir, timeout, animations)
+            return (outputs or {}).get(scene), holds.get(scene, [])
+
+        with ThreadPoolExecutor(max_workers=RENDER_PROCESSES) as executor:
+            results = list(executor.map(render, enumerate(parts)))
+        if any(clip is None for clip, _ in results):
+            print("Parallel render failed; rendering serially")
+            return None, {}
+
+        ranges = {}
+        for (scene, _), result in zip(parts, results):
+            ranges.setdefault(scene, []).append(result)
+        outputs = {}
+        holds = {}
+        for scene, pieces in ranges.items():
+            scene_holds = []
+            offset = 0.0
+            for clip, piece_holds in pieces:
+                scene_holds += [(offset + position, seconds) for position, seconds in piece_holds]
+                duration = probe_duration(clip)
+                if duration is None:
+                    print(f"Could not read the length of {clip}; rendering serially")
+                    return None, {}
+                offset += duration
+            clips = [clip for clip, _ in pieces]
+            outputs[scene] = clips[0] if len(clips) == 1 else concat_copy(clips, os.path.join(render_dir, f"{scene}.mp4"))
+            if outputs[scene] is None:
+                return None, {}
+            holds[scene] = scene_holds
+        return outputs, holds
+            
+    def _generate_auto_video(self, voiceover_maker=None):
         """Generate a video automatically from AI response without requiring Manim"""
         try:
             # Create temporary directory for our assets
@@ -205,9 +496,8 @@ class VideoMaker:
             slide_duration = total_duration / len(slides)
             
             # Create video using ffmpeg
-            self._create_video_from_images(image_files, output_video, slide_duration)
-            
-            return output_video
+            narration = voiceover_maker.output_path if voiceover_maker else None
+            return self._create_video_from_images(image_files, output_video, slide_duration, narration)
             
         except Exception as e:
             print(f"Error in automatic video generation: {e}")
@@ -266,6 +556,7 @@ class VideoMaker:
                 "-f", "lavfi", 
                 "-i", "color=c=blue:s=1280x720:d=10",
                 "-vf", f"drawtext=fontfile=/Windows/Fonts/arial.ttf:textfile={text_path}:fontcolor=white:fontsize=30:x=(w-text_w)/2:y=(h-text_h)/2",
+                *FASTSTART,
                 fallback_path
             ]
             
@@ -279,6 +570,7 @@ class VideoMaker:
                 "ffmpeg", "-y",
                 "-f", "lavfi", 
                 "-i", "color=c=blue:s=640x480:d=5",
+                *FASTSTART,
                 fallback_path
             ]
             
@@ -373,46 +665,42 @@ class VideoMaker:
             image.save(output_path)
             return False
             
-    def _create_video_from_images(self, image_files, output_path, slide_duration=5.0):
-        """Create video from images using ffmpeg"""
+    def _create_video_from_images(self, image_files, output_path, slide_duration=5.0, narration=None):
+        """
+        Create video from images using ffmpeg, muxing in the narration track
+        (if any) in the same encode
+        """
         try:
-            # Ensure output directory exists
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            
-            # Create temporary text file listing images
-            list_file = os.path.join(os.path.dirname(image_files[0]), "files.txt")
-            with open(list_file, 'w') as f:
-                for img in image_files:
-                    f.write(f"file '{os.path.basename(img)}'\n")
-                    f.write(f"duration {slide_duration}\n")
-                # Add last image again to handle last duration
-                f.write(f"file '{os.path.basename(image_files[-1])}'\n")
-            
-            # Run ffmpeg to create video
-            cmd = [
-                "ffmpeg", "-y",
-                "-f", "concat",
-                "-safe", "0",
-                "-i", list_file,
-                "-vsync", "vfr",
-                "-pix_fmt", "yuv420p",
-                "-c:v", "libx264",
-                "-crf", "18",  # Higher quality (lower is better, 18-23 is good)
-                "-preset", "slow",  # Better compression
-                output_path
-            ]
-            
-            process = subprocess.run(cmd, 
-                                    check=False, 
-                                    capture_output=True, 
-                                    cwd=os.path.dirname(image_files[0]))
-            
-            if process.returncode != 0:
-                print(f"FFmpeg error: {process.stderr.decode('utf-8')}")
+            assembly = Assembly(
+                output_path,
+                slides=image_files,
+                slide_duration=slide_duration,
+                narration=[narration] if narration else (),
+                crf="18",  # Higher quality (lower is better, 18-23 is good)
+                preset="slow",  # Better compression
+            )
+            result = assembly.run()
+            if result is None:
                 return self._create_simple_fallback_video()
                 
+            self._finished(*result)
             return output_path
             
         except Exception as e:
             print(f"Error creating video from images: {e}")
             return self._create_simple_fallback_video()
+
+
+def warm_up_text_cache():
+    """Render the common labels into the shared text cache (a dry run: no video is written)"""
+    try:
+        render_dir = os.path.join(os.getcwd(), 'media', 'renders', f"warmup_{uuid.uuid4().hex[:12]}")
+        os.makedirs(render_dir, exist_ok=True)
+        script_file = os.path.join(render_dir, 'text_warmup.py')
+        with open(script_file, 'w', encoding='utf-8') as f:
+            f.write(warmup_source())
+        maker = VideoMaker(script_file, "TextWarmup", quality="l", preview=False)
+        maker._run_manim(script_file, ["TextWarmup"], render_dir, RENDER_TIMEOUTS["l"], dry_run=True)
+        print(f"Text cache warmed up: {len(os.listdir(get_text_cache().directory))} entries")
+    except Exception as e:
+        print(f"Text cache warm-up failed: {e}")
@@ -1,13 +1,17 @@
 import os
 import tempfile
-from gtts import gTTS
 import subprocess
 import re
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from app.controllers.assembler import Assembly
+from app.controllers import tts_backends
 
 class VoiceOverMaker:
     """
-    Class to generate voice narrations for videos using Google Text-to-Speech (gTTS)
+    Class to generate voice narrations for videos, using the TTS backends
+    configured in tts_backends (gTTS, espeak-ng, Coqui)
     """
     
     def __init__(self, text=None, lang='en', tld='us', slow=False):
@@ -25,6 +29,9 @@ class VoiceOverMaker:
         self.tld = tld
         self.slow = slow
         self.output_path = None
+        # Set by combine_with_video: poster frame and duration of the muxed video
+        self.poster_path = None
+        self.duration = None
         
     def set_text(self, text):
         """Set the text to be converted to speech"""
@@ -91,32 +98,84 @@ class VoiceOverMaker:
             
             # Generate timestamp for unique filename
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            self.output_path = os.path.join(temp_dir, f"voiceover_{timestamp}.mp3")
+            base_path = os.path.join(temp_dir, f"voiceover_{timestamp}_{uuid.uuid4().hex[:6]}")
             
-            # Create gTTS object
-            tts = gTTS(text=self.text, lang=self.lang, tld=self.tld, slow=self.slow)
+            # Try each backend in turn, fastest measured first
+            for backend in tts_backends.registry.ordered():
+                try:
+                    self.output_path = tts_backends.synthesize_cached(backend, self.text, base_path, **self._voice())
+                    print(f"Voiceover saved to {self.output_path} ({backend.name})")
+                    return self.output_path
+                except Exception as e:
+                    print(f"TTS backend {backend.name} failed: {e}")
             
-            # Save to file
-            tts.save(self.output_path)
-            print(f"Voiceover saved to {self.output_path}")
-            
-            return self.output_path
+            print("No TTS backend could generate the voiceover")
+            return None
             
         except Exception as e:
             print(f"Error generating voiceover: {e}")
             return None
+
+    def generate_scene_voiceovers(self, scene_texts, max_workers=4):
+        """
+        Generate the voiceover from per-scene narration.
+
+        Each scene's text is synthesized as its own clip, in parallel, and
+        the clips are joined in scene order into one track at
+        self.output_path. Meant to run while the video is still rendering.
+        """
+        texts = [text.strip() for text in scene_texts if text and text.strip()]
+        if not texts:
+            print("No scene narration provided for voiceover generation")
+            return None
+
+        temp_dir = os.path.join(os.getcwd(), 'temp')
+        os.makedirs(temp_dir, exist_ok=True)
+        batch = uuid.uuid4().hex[:12]
+        base_paths = [os.path.join(temp_dir, f"voiceover_{batch}_{i:02d}") for i in range(len(texts))]
+
+        # Every clip of a track comes from one backend so they join cleanly;
+        # if any scene fails, the whole batch moves to the next backend
+        for backend in tts_backends.registry.ordered():
+            def synthesize(index):
+                return tts_backends.synthesize_cached(backend, texts[index], base_paths[index], **self._voice())
+
+            clips = []
+            try:
+                with ThreadPoolExecutor(max_workers=min(max_workers, len(texts))) as executor:
+                    futures = [executor.submit(synthesize, i) for i in range(len(texts))]
+                    for future in futures:
+                        clips.append(future.result())
+            except Exception as e:
+                print(f"TTS backend {backend.name} failed: {e}")
+                _remove_all(base_path + backend.extension for base_path in base_paths)
+                continue
+
+            self.output_path = tts_backends.join_clips(clips, os.path.join(temp_dir, f"voiceover_{batch}{backend.extension}"))
+            _remove_all(clips)
+            self.text = " ".join(texts)
+            print(f"Voiceover for {len(clips)} scene(s) saved to {self.output_path} ({backend.name})")
+            return self.output_path
+
+        print("No TTS backend could generate the scene voiceovers")
+        return None
+
+    def _voice(self):
+        return {"lang": self.lang, "tld": self.tld, "slow": self.slow}
     
-    def combine_with_video(self, video_path, output_path=None):
+    def combine_with_video(self, video_path, output_path=None, holds=()):
         """
         Combine the voiceover audio with a video file
         
         Parameters:
-        - video_path: Path to the input video file
+        - video_path: Path to the input video file, or a list of clips to join
         - output_path: Path for the output video with audio (optional)
+        - holds: (position, seconds) frame holds to re-expand (optional)
         
         Returns:
-        - Path to the output video file with audio
+        - Path to the output video file with audio (video_path unchanged on failure)
         """
+        clips = [video_path] if isinstance(video_path, str) else list(video_path)
         if not self.output_path:
             self.generate_voiceover()
             
@@ -126,31 +185,26 @@ class VoiceOverMaker:
             
         if not output_path:
             # Generate output path if not provided
-            video_dir = os.path.dirname(video_path)
-            video_name = os.path.basename(video_path)
+            video_dir = os.path.dirname(clips[0])
+            video_name = os.path.basename(clips[0])
             name, ext = os.path.splitext(video_name)
             output_path = os.path.join(video_dir, f"{name}_with_audio{ext}")
         
         try:
-            # Use ffmpeg to combine video with audio
-            cmd = [
-                "ffmpeg", "-y",
-                "-i", video_path,     # Input video
-                "-i", self.output_path,  # Input audio
-                "-c:v", "copy",       # Copy video stream without re-encoding
-                "-c:a", "aac",        # Convert audio to AAC format
-                "-shortest",          # End when the shortest input ends
-                output_path
-            ]
-            
-            process = subprocess.run(cmd, check=False, capture_output=True)
-            
-            if process.returncode != 0:
-                print(f"FFmpeg error: {process.stderr.decode('utf-8')}")
+            # One ffmpeg run muxes the narration (padding whichever side is
+            # shorter), writes fast-start output and extracts the poster
+            result = Assembly(output_path, clips=clips, narration=[self.output_path], holds=holds).run()
+            if result is None:
                 return video_path
                 
+            output_path, self.poster_path, self.duration = result
             return output_path
             
         except Exception as e:
             print(f"Error combining video and audio: {e}")
             return video_path
+
+def _remove_all(paths):
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
@@ -1,7 +1,10 @@
 # app/langgraph_nodes/context.py
 
 from app.controllers.chunky import Chunky
-from app.services.supabase import get_chat_histories
+from app.services.supabase import get_chat_histories_page
+
+# Only the most recent messages go into the summary prompt
+CONTEXT_MESSAGES = 6
 
 def load_context(state):
     session_id = state.get("session_id")
@@ -10,7 +13,7 @@ def load_context(state):
         print("No session_id provided")
         return {"chat_history": [], "chat_summary": ""}
     
-    messages = get_chat_histories(session_id)
+    messages, _ = get_chat_histories_page(session_id, limit=CONTEXT_MESSAGES)
     print("Messages:", messages)
     if isinstance(messages, dict) and "error" in messages:
         print("Error fetching chat history:", messages)
@@ -20,7 +23,7 @@ def load_context(state):
     cleaned = [{"role": msg["sender"], "content": msg["message"]} for msg in messages]
     print("Cleaned chat history:", cleaned)
     
-    recent_msgs = cleaned[-6:]
+    recent_msgs = cleaned[-CONTEXT_MESSAGES:]
     print("Recent messages:", recent_msgs)
     
     conversation_text = "\n".join([f"{m['role']}: {m['content']}" for m in recent_msgs])
@@ -1,13 +1,40 @@
 import os
 from dotenv import load_dotenv
 import requests
+from requests.adapters import HTTPAdapter
 import mimetypes
-import shutil
 import time
+import base64
+import hashlib
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from flask import url_for
+from app.services.fileops import place_file
+from app.services.supabase import local_store
 
 load_dotenv()
 
+# Streaming buffer and resumable-upload part size. Supabase's resumable
+# (TUS) endpoint expects 6 MB chunks.
+CHUNK_SIZE = int(os.getenv("STORAGE_CHUNK_SIZE", str(6 * 1024 * 1024)))
+# Files at least this large use a resumable chunked upload
+RESUMABLE_THRESHOLD = int(os.getenv("STORAGE_RESUMABLE_THRESHOLD", str(20 * 1024 * 1024)))
+PART_RETRIES = int(os.getenv("STORAGE_PART_RETRIES", "3"))
+UPLOAD_WORKERS = int(os.getenv("STORAGE_UPLOAD_WORKERS", "4"))
+# (connect, read) timeout for storage requests
+TIMEOUT = (float(os.getenv("SUPABASE_CONNECT_TIMEOUT", "3")), float(os.getenv("STORAGE_READ_TIMEOUT", "60")))
+
+# HLS types, which not every platform's mimetypes table knows (or knows
+# correctly: .ts is sometimes mapped to TypeScript or Qt translations)
+mimetypes.add_type("application/vnd.apple.mpegurl", ".m3u8")
+mimetypes.add_type("video/mp2t", ".ts")
+
+# One keep-alive session shared by every SupabaseStorage instance
+_http = requests.Session()
+_http.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=UPLOAD_WORKERS * 2))
+_http.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=UPLOAD_WORKERS * 2))
+
+
 class SupabaseStorage:
     def __init__(self):
         self.supabase_url = os.getenv("supaurl")
@@ -18,44 +45,187 @@ class SupabaseStorage:
         if not os.path.exists(self.local_storage_path):
             os.makedirs(self.local_storage_path)
 
-    def upload_file(self, file_path, file_name=None):
+    def upload_file(self, file_path, file_name=None, session_id=None, move=False):
+        """
+        Store a file under its SHA-256 and return its URL.
+
+        Identical content is transferred and stored only once: a known hash
+        returns the existing URL straight from the reference index, and an
+        object already present in Supabase or local storage is not sent
+        again. file_name and session_id are kept as a reference to the
+        shared object. With move=True the caller hands file_path over, and
+        local storage may take it by rename instead of cloning or copying.
+        """
         if file_name is None:
             file_name = os.path.basename(file_path)
-        
+
+        digest = file_sha256(file_path)
+        extension = os.path.splitext(file_name)[1].lower() or os.path.splitext(file_path)[1].lower()
+        object_name = f"{digest}{extension}"
+
+        known = local_store.get_media_object(digest)
+        if known:
+            local_store.add_media_ref(digest, session_id, file_name)
+            if move:
+                os.remove(file_path)
+            return known["url"]
+
+        size = os.path.getsize(file_path)
+        url = self._upload_object(file_path, object_name, move)
+        # Left behind when the object was sent remotely or was already stored
+        if move and os.path.exists(file_path):
+            os.remove(file_path)
+        local_store.insert_media_object({
+            "sha256": digest,
+            "object_name": object_name,
+            "url": url,
+            "size": size,
+            "time_created": datetime.now().isoformat(),
+        })
+        local_store.add_media_ref(digest, session_id, file_name)
+        return url
+
+    def _upload_object(self, file_path, file_name, move=False):
         # Try to upload to Supabase first
         try:
             if self.supabase_url and self.supabase_key:
-                mime_type, _ = mimetypes.guess_type(file_path)
-                if mime_type is None:
-                    if file_path.lower().endswith(".mp4"):
-                        mime_type = "video/mp4"
-                    else:
-                        mime_type = "application/octet-stream"
-                upload_url = f"{self.supabase_url}/storage/v1/object/{self.bucket_name}/{file_name}?upsert=true"
-                with open(file_path, "rb") as file:
-                    file_data = file.read()
-                headers = {
-                    "Authorization": f"Bearer {self.supabase_key}",
-                    "Content-Type": mime_type,
-                }
-                response = requests.put(upload_url, headers=headers, data=file_data)
-                if response.status_code == 200:
-                    return f"{self.supabase_url}/storage/v1/object/public/{self.bucket_name}/{file_name}"
+                url = self._upload_remote(file_path, file_name)
+                if url:
+                    return url
         except Exception as e:
             print(f"Supabase upload failed: {str(e)}. Using local storage instead.")
-        
+
         # Fall back to local storage
-        return self._store_locally(file_path, file_name)
-    
-    def _store_locally(self, file_path, file_name):
+        return self._store_locally(file_path, file_name, move)
+
+    def _upload_remote(self, file_path, file_name):
+        """Send one file to the bucket; returns its public URL, or None if it was refused"""
+        if self._remote_exists(file_name):
+            return self._public_url(file_name)
+
+        mime_type = self._guess_mime_type(file_path)
+        if os.path.getsize(file_path) >= RESUMABLE_THRESHOLD:
+            upload = _TusUpload(self, file_name, os.path.getsize(file_path), mime_type)
+            return self._upload_in_parts(upload, file_path)
+
+        upload_url = f"{self.supabase_url}/storage/v1/object/{self.bucket_name}/{file_name}?upsert=true"
+        headers = {
+            "Authorization": f"Bearer {self.supabase_key}",
+            "Content-Type": mime_type,
+            "Content-Length": str(os.path.getsize(file_path)),
+        }
+        # Passing the open file streams it instead of reading it into memory
+        with open(file_path, "rb") as file:
+            response = _http.put(upload_url, headers=headers, data=file, timeout=TIMEOUT)
+        if response.status_code == 200:
+            return self._public_url(file_name)
+        return None
+
+    def upload_tree(self, local_dir, prefix, entry, move=False):
+        """
+        Store every file under local_dir as <prefix>/<relative path> and
+        return the URL of entry (e.g. an HLS master playlist).
+
+        Relative paths are kept so files can refer to each other. The tree
+        goes wholly to Supabase or wholly to local storage, never split.
+        """
+        relative_paths = []
+        for root, _, files in os.walk(local_dir):
+            for name in files:
+                relative_paths.append(os.path.relpath(os.path.join(root, name), local_dir).replace(os.sep, "/"))
+
+        try:
+            if self.supabase_url and self.supabase_key:
+                with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as executor:
+                    urls = list(executor.map(
+                        lambda rel: self._upload_remote(os.path.join(local_dir, rel), f"{prefix}/{rel}"),
+                        relative_paths,
+                    ))
+                if all(urls):
+                    return self._public_url(f"{prefix}/{entry}")
+        except Exception as e:
+            print(f"Supabase upload failed: {str(e)}. Using local storage instead.")
+
+        for rel in relative_paths:
+            local_path = os.path.join(self.local_storage_path, prefix, rel)
+            os.makedirs(os.path.dirname(local_path), exist_ok=True)
+            place_file(os.path.join(local_dir, rel), local_path, move=move)
+        return f"/api/media/{prefix}/{entry}"
+
+    def _remote_exists(self, file_name):
+        """True if the bucket already holds this (content-addressed) object"""
+        response = _http.head(self._public_url(file_name), timeout=TIMEOUT)
+        return response.status_code == 200
+
+    def _guess_mime_type(self, file_path):
+        mime_type, _ = mimetypes.guess_type(file_path)
+        if mime_type is None:
+            if file_path.lower().endswith(".mp4"):
+                mime_type = "video/mp4"
+            else:
+                mime_type = "application/octet-stream"
+        return mime_type
+
+    def _public_url(self, file_name):
+        return f"{self.supabase_url}/storage/v1/object/public/{self.bucket_name}/{file_name}"
+
+    def _upload_in_parts(self, upload, file_path):
+        """
+        Drive a chunked upload: read CHUNK_SIZE parts straight from disk and
+        send them, retrying each failed part on its own. Parts go out in
+        parallel when the backend accepts them out of order; at most
+        UPLOAD_WORKERS parts are held in memory at once.
+        """
+        size = os.path.getsize(file_path)
+        offsets = list(range(0, size, CHUNK_SIZE)) or [0]
+
+        def send(offset):
+            with open(file_path, "rb") as f:
+                f.seek(offset)
+                data = f.read(CHUNK_SIZE)
+            for attempt in range(1, PART_RETRIES + 1):
+                try:
+                    upload.upload_part(offset, data)
+                    return
+                except Exception as e:
+                    if attempt == PART_RETRIES:
+                        raise
+                    print(f"Upload part at offset {offset} failed ({e}); retrying ({attempt}/{PART_RETRIES})")
+                    time.sleep(0.5 * attempt)
+
+        try:
+            if upload.parallel:
+                with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as executor:
+                    for future in [executor.submit(send, offset) for offset in offsets]:
+                        future.result()
+            else:
+                for offset in offsets:
+                    send(offset)
+        except Exception:
+            upload.abort()
+            raise
+        return upload.complete()
+
+    def _store_locally(self, file_path, file_name, move=False):
         """Store file locally and return a relative URL for access"""
-        timestamp = int(time.time())
-        unique_filename = f"{timestamp}_{file_name}"
+        # file_name is content-addressed, so an existing file is the same media
+        unique_filename = file_name
         local_path = os.path.join(self.local_storage_path, unique_filename)
-        
-        # Copy the file to local storage
-        shutil.copy2(file_path, local_path)
-        
+
+        # Rename or reflink the file into local storage so no bytes
+        # are copied; across devices large files go through the same chunked
+        # protocol as Supabase, written in parallel parts
+        already_stored = os.path.exists(local_path) and os.path.getsize(local_path) == os.path.getsize(file_path)
+        if not already_stored:
+            if _same_device(file_path, self.local_storage_path):
+                place_file(file_path, local_path, move=move)
+            elif os.path.getsize(file_path) >= RESUMABLE_THRESHOLD:
+                self._upload_in_parts(_LocalChunkedUpload(local_path, os.path.getsize(file_path)), file_path)
+                if move:
+                    os.remove(file_path)
+            else:
+                place_file(file_path, local_path, move=move)
+
         # Return a relative URL path that can be accessed by the frontend
         # This assumes you have set up a route to serve files from local_storage
         # Create a relative URL that the frontend can access
@@ -63,25 +233,163 @@ class SupabaseStorage:
         return relative_url
 
     def retrieve_file(self, file_name, download_path=None):
+        """
+        Fetch a stored object.
+
+        With download_path the object is streamed to disk in CHUNK_SIZE
+        pieces and the path is returned; without it the bytes are returned,
+        which is only sensible for small objects.
+        """
+        if download_path:
+            with open(download_path + ".part", "wb") as f:
+                for chunk in self.iter_file(file_name):
+                    f.write(chunk)
+            os.replace(download_path + ".part", download_path)
+            return download_path
+        return b"".join(self.iter_file(file_name))
+
+    def iter_file(self, file_name, chunk_size=CHUNK_SIZE):
+        """Yield the contents of a stored object in bounded chunks"""
         # First try to get from Supabase
+        response = None
         try:
             if self.supabase_url:
                 url = f"{self.supabase_url}/storage/v1/object/public/{self.bucket_name}/{file_name}"
-                response = requests.get(url)
-                if response.status_code == 200:
-                    if download_path:
-                        with open(download_path, "wb") as f:
-                            f.write(response.content)
-                    return response.content
+                response = _http.get(url, stream=True, timeout=TIMEOUT)
+                if response.status_code != 200:
+                    response.close()
+                    response = None
         except Exception as e:
             print(f"Supabase retrieval failed: {str(e)}. Trying local storage.")
-        
+        if response is not None:
+            # Once bytes have been sent, errors propagate instead of mixing in local data
+            with response:
+                yield from response.iter_content(chunk_size)
+            return
+
         # Fall back to local storage
         local_path = os.path.join(self.local_storage_path, file_name)
         if os.path.exists(local_path):
-            if download_path:
-                shutil.copy2(local_path, download_path)
             with open(local_path, "rb") as f:
-                return f.read()
-        
-        raise Exception(f"File not found: {file_name}")
\ No newline at end of file
+                while True:
+                    chunk = f.read(chunk_size)
+                    if not chunk:
+                        return
+                    yield chunk
+
+        raise Exception(f"File not found: {file_name}")
+
+
+def _same_device(path, directory):
+    return os.stat(path).st_dev == os.stat(directory).st_dev
+
+
+def file_sha256(file_path):
+    """SHA-256 of a file, read in CHUNK_SIZE pieces"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class _TusUpload:
+    """
+    Resumable upload to Supabase Storage over the TUS protocol.
+
+    TUS appends at an offset, so parts are sent in order. A part that fails
+    is retried from the offset the server reports, not from the start.
+    """
+
+    parallel = False
+
+    def __init__(self, storage, file_name, size, mime_type):
+        self.storage = storage
+        self.file_name = file_name
+        self.headers = {
+            "Authorization": f"Bearer {storage.supabase_key}",
+            "Tus-Resumable": "1.0.0",
+            "x-upsert": "true",
+        }
+        metadata = {
+            "bucketName": storage.bucket_name,
+            "objectName": file_name,
+            "contentType": mime_type,
+        }
+        encoded = ",".join(f"{k} {base64.b64encode(v.encode()).decode()}" for k, v in metadata.items())
+        response = _http.post(
+            f"{storage.supabase_url}/storage/v1/upload/resumable",
+            headers={**self.headers, "Upload-Length": str(size), "Upload-Metadata": encoded},
+            timeout=TIMEOUT,
+        )
+        if response.status_code != 201:
+            raise Exception(f"Could not start resumable upload: {response.status_code} {response.text}")
+        self.location = response.headers["Location"]
+        self._resync = False
+
+    def upload_part(self, offset, data):
+        skip = 0
+        if self._resync:
+            # After a failed attempt the server may already hold part of this chunk
+            server_offset = self._server_offset()
+            if server_offset >= offset + len(data):
+                self._resync = False
+                return
+            skip = max(0, server_offset - offset)
+        self._resync = True
+        response = _http.patch(
+            self.location,
+            headers={
+                **self.headers,
+                "Upload-Offset": str(offset + skip),
+                "Content-Type": "application/offset+octet-stream",
+            },
+            data=data[skip:],
+            timeout=TIMEOUT,
+        )
+        if response.status_code != 204:
+            raise Exception(f"Part upload failed: {response.status_code} {response.text}")
+        self._resync = False
+
+    def _server_offset(self):
+        response = _http.head(self.location, headers=self.headers, timeout=TIMEOUT)
+        return int(response.headers.get("Upload-Offset", "0"))
+
+    def complete(self):
+        return self.storage._public_url(self.file_name)
+
+    def abort(self):
+        try:
+            _http.delete(self.location, headers=self.headers, timeout=TIMEOUT)
+        except Exception:
+            pass
+
+
+class _LocalChunkedUpload:
+    """
+    Local stand-in for chunked uploads: parts are written at their offsets
+    into a preallocated temp file, in any order, and renamed into place once
+    every part has arrived.
+    """
+
+    parallel = True
+
+    def __init__(self, local_path, size):
+        self.local_path = local_path
+        self.temp_path = local_path + ".upload"
+        self._fd = os.open(self.temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        os.ftruncate(self._fd, size)
+
+    def upload_part(self, offset, data):
+        os.pwrite(self._fd, data, offset)
+
+    def complete(self):
+        os.fsync(self._fd)
+        os.close(self._fd)
+        os.replace(self.temp_path, self.local_path)
+        return self.local_path
+
+    def abort(self):
+        os.close(self._fd)
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
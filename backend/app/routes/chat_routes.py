@@ -1,14 +1,27 @@
 from datetime import datetime
-from flask import Blueprint, jsonify, request, send_file
-from app.services.supabase import post_message, get_chat_histories, create_new_session
+from flask import Blueprint, Response, jsonify, request
+from app.services.supabase import post_message, get_chat_histories, get_chat_histories_page, create_new_session, get_artifact, get_message, update_message
+from app.services.pagination import parse_limit
+from app.services.fileops import place_file
 from app.controllers import Chunky, build_graph
 import os
+import shutil
+import tempfile
+import traceback
 import time
+import uuid
 import base64
-from .blawb import SupabaseStorage
+from .blawb import SupabaseStorage, file_sha256
+from app.controllers.hls_packager import HLS_ENABLED, MASTER_PLAYLIST, package_hls
+from app.controllers.render_queue import hd_render_queue
+from app.controllers.render_cost import estimate_file
+from .upload_routes import send_media_file
 
 chat_bp = Blueprint("chat", __name__)
 
+# Answer /api/chat with a quick 480p draft and replace it with an HD render in the background
+DRAFT_RENDER = os.getenv("DRAFT_RENDER", "1").strip().lower() in ("1", "true", "yes")
+
 @chat_bp.route("/create_new_session", methods=["POST"])
 def route_send_message():
     result = create_new_session()
@@ -26,17 +39,47 @@ def route_chat_histories():
     if not chat_session_id:
         return jsonify({"error": "Missing chat_session_id parameter"}), 400
 
+    # ?fields=a,b,c selects other columns; manim_code and image_summary come
+    # back as artifact references, resolved through /api/artifacts/<hash>
+    fields = request.args.get("fields")
+    columns = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+
+    try:
+        limit = parse_limit(request.args.get("limit"))
+        result, next_cursor = get_chat_histories_page(chat_session_id, limit, request.args.get("cursor"), columns)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     try:
-        result = get_chat_histories(chat_session_id)
         # Check if result is an error dictionary or an empty list
         if isinstance(result, dict) and "error" in result:
             return jsonify({"error": result["error"]}), 500
-        return jsonify(result), 200
+        response = jsonify(result)
+        # Older messages are fetched by passing this back as ?cursor=
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return response, 200
     except Exception as e:
         print(f"Error retrieving chat histories: {e}")
         return jsonify({"error": str(e)}), 500
 
 
+@chat_bp.route("/artifacts/<artifact_hash>", methods=["GET"])
+def route_artifact(artifact_hash):
+    """Lazily fetch a stored manim_code / image_summary by its SHA-256"""
+    if len(artifact_hash) != 64 or any(c not in "0123456789abcdef" for c in artifact_hash):
+        return jsonify({"error": "Invalid artifact hash"}), 400
+
+    content = get_artifact(artifact_hash)
+    if content is None:
+        return jsonify({"error": "Artifact not found"}), 404
+
+    response = Response(content, mimetype="text/plain")
+    # Content-addressed, so it can never change
+    response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response, 200
+
+
 @chat_bp.route("/get_chat", methods=["GET"])
 def get_chat():
     chat_session_id = request.args.get("chat_session_id")
@@ -99,17 +142,18 @@ def handle_chat():
                 image_summary = chunky.advanced_image_handling(user_input, encoded_image)
                 user_input += f"\n\nThe user also uploaded an image with these contents:\n\n{image_summary}"
                 
-                # Save the image to a temporary location
-                temp_dir = "/tmp"
-                temp_path = os.path.join(temp_dir, image_file.filename)
-                with open(temp_path, "wb") as temp_file:
+                # Save the image to a private temporary file; the upload takes it over
+                fd, temp_path = tempfile.mkstemp(suffix=os.path.splitext(image_file.filename)[1])
+                with os.fdopen(fd, "wb") as temp_file:
                     temp_file.write(file_bytes)
                     
                 # Upload the image to Supabase
                 storage = SupabaseStorage()
                 try:
-                    image_url = storage.upload_file(temp_path)
+                    image_url = storage.upload_file(temp_path, file_name=image_file.filename, session_id=session_id, move=True)
                 except Exception as e:
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
                     print("Error uploading image:", e)
                     # Store locally as fallback if upload fails
                     local_images_dir = os.path.join(os.getcwd(), "backend", "local_db", "images")
@@ -144,6 +188,10 @@ def handle_chat():
     
     # Initialize video_url as None
     video_url = None
+    hd_job = None
+    video_poster_url = None
+    video_duration = None
+    video_hls_url = None
     
     # Only attempt video rendering if we have code chunks
     if manim_code and code_chunks:
@@ -169,15 +217,18 @@ def handle_chat():
             
             print(f"Combined Manim script saved to: {combined_file}")
             
-            # Use simpler scene name without timestamp
+            # A single scene is LSTMScene; with several, VideoMaker renders every scene in the manifest
             scene_name = "LSTMScene"
+            narration = [scene.get("subtitle_script") for scene in result.get("scene_plan") or [] if isinstance(scene, dict)]
             
+            # Progressive rendering: answer with a quick draft, upgrade to HD in the background
             video_maker = VideoMaker(
                 script_file=combined_file,
                 scene_name=scene_name,
-                quality='l',
+                quality='l' if DRAFT_RENDER else 'h',
                 preview=False,
-                session_id=chat_session_id
+                session_id=chat_session_id,
+                narration=narration
             )
 
             # Get the video file path from render_video() with voiceover
@@ -185,30 +236,24 @@ def handle_chat():
             print(f"Video file path: {video_file}")
 
             if video_file and os.path.exists(video_file):
-                storage = SupabaseStorage()
-                try:
-                    print("Uploading video... named: ", video_file)
-                    video_url = storage.upload_file(video_file, file_name=f"video_{int(time.time())}.mp4")
-                    print(f"Video uploaded successfully. URL: {video_url}")
-                except Exception as e:
-                    print("Error uploading video: ", e)
-                    traceback.print_exc()
-                    # Store video locally as fallback
-                    local_videos_dir = os.path.join(os.getcwd(), "backend", "local_db", "videos")
-                    os.makedirs(local_videos_dir, exist_ok=True)
-                    local_video_path = os.path.join(local_videos_dir, f"video_{int(time.time())}.mp4")
-                    import shutil
-                    shutil.copy(video_file, local_video_path)
-                    video_url = f"local://{local_video_path}"
-                    print(f"Video saved locally at: {local_video_path}")
+                published = _publish_video(video_maker, video_file, chat_session_id)
+                video_url = published["video_url"]
+                video_poster_url = published["video_poster_url"]
+                video_duration = published["video_duration"]
+                video_hls_url = published["video_hls_url"]
+                if DRAFT_RENDER:
+                    # Keep a private copy: the next request overwrites combined_file
+                    hd_script = os.path.join(os.path.dirname(combined_file), f"hd_{uuid.uuid4().hex[:12]}.py")
+                    shutil.copyfile(combined_file, hd_script)
+                    hd_job = (hd_script, scene_name, narration)
             else:
                 print("No video file was created or found")
         except Exception as e:
             print(f"Error in video generation/rendering process: {str(e)}")
             traceback.print_exc()
 
-    # Save the user message
-    user_post_status = post_message("user", user_input, chat_session_id, image_url=image_url)
+    # Save the user message (written in the background together with the AI reply)
+    user_post_status = post_message("user", user_input, chat_session_id, image_url=image_url, defer=True)
     if isinstance(user_post_status, dict) and "error" in user_post_status:
         print(f"Error saving user message: {user_post_status}")
     elif isinstance(user_post_status, dict) and "success" in user_post_status:
@@ -224,17 +269,36 @@ def handle_chat():
         chat_session_id,
         manim_code=manim_code,
         image_summary=image_summary,
-        video_url=video_url
+        video_url=video_url,
+        defer=True
     )
+    ai_message_id = None
     if isinstance(ai_post_status, dict) and "error" in ai_post_status:
         print(f"Error saving AI message: {ai_post_status}")
     elif isinstance(ai_post_status, dict) and "success" in ai_post_status:
         print("AI message saved successfully")
+        saved = ai_post_status.get("data")
+        if isinstance(saved, list):
+            saved = saved[0] if saved else None
+        ai_message_id = saved.get("id") if isinstance(saved, dict) else None
+
+    if hd_job and ai_message_id:
+        hd_script, scene_name, narration = hd_job
+        estimate = estimate_file(hd_script, scene_name, quality='h')
+        hd_render_queue.submit(f"HD render for message {ai_message_id}", _upgrade_to_hd,
+                               hd_script, scene_name, narration, chat_session_id, ai_message_id,
+                               cost=estimate.render_seconds if estimate else None)
 
     # Return the response to the frontend
     response_data = {
         "message": ai_message,
-        "video_url": video_url
+        "video_url": video_url,
+        "video_poster_url": video_poster_url,
+        "video_duration": video_duration,
+        "video_hls_url": video_hls_url,
+        "message_id": ai_message_id,
+        # The draft's video_url is replaced once the HD render finishes
+        "video_upgrade_pending": bool(hd_job and ai_message_id)
     }
     
     # Add session_id to response if available
@@ -243,6 +307,91 @@ def handle_chat():
         
     return jsonify(response_data), 200
 
+def _publish_video(video_maker, video_file, session_id, extras=True):
+    """
+    Upload a rendered video and, with extras, its poster and HLS ladder;
+    returns their URLs, duration and HLS URL
+    """
+    published = {"video_url": None, "video_poster_url": None, "video_duration": None, "video_hls_url": None}
+    storage = SupabaseStorage()
+    if HLS_ENABLED and extras:
+        # Packaged before the mp4 upload, which may move the file
+        published["video_hls_url"] = _package_and_upload_hls(storage, video_file)
+    try:
+        print("Uploading video... named: ", video_file)
+        # The render output is not reused, so local storage may take it by rename
+        published["video_url"] = storage.upload_file(video_file, file_name=f"video_{int(time.time())}.mp4", session_id=session_id, move=True)
+        print(f"Video uploaded successfully. URL: {published['video_url']}")
+        published["video_duration"] = video_maker.duration
+        if video_maker.poster_path and extras:
+            try:
+                published["video_poster_url"] = storage.upload_file(video_maker.poster_path, file_name="poster.jpg", session_id=session_id, move=True)
+            except Exception as e:
+                print("Error uploading video poster: ", e)
+    except Exception as e:
+        print("Error uploading video: ", e)
+        traceback.print_exc()
+        # Store video locally as fallback
+        local_videos_dir = os.path.join(os.getcwd(), "backend", "local_db", "videos")
+        os.makedirs(local_videos_dir, exist_ok=True)
+        local_video_path = os.path.join(local_videos_dir, f"video_{int(time.time())}.mp4")
+        place_file(video_file, local_video_path)
+        published["video_url"] = f"local://{local_video_path}"
+        print(f"Video saved locally at: {local_video_path}")
+    if not extras and video_maker.poster_path and os.path.exists(video_maker.poster_path):
+        os.remove(video_maker.poster_path)
+    return published
+
+def _upgrade_to_hd(script_file, scene_name, narration, session_id, message_id):
+    """Background job: render the script in HD and swap it into the message"""
+    from app.controllers.video_maker import VideoMaker
+    try:
+        video_maker = VideoMaker(
+            script_file=script_file,
+            scene_name=scene_name,
+            quality='h',
+            preview=False,
+            session_id=session_id,
+            narration=narration
+        )
+        video_file = video_maker.render_video(add_voiceover=True)
+        if not video_file or not os.path.exists(video_file):
+            print(f"HD render for message {message_id} produced no video; keeping the draft")
+            return
+        # Messages only store video_url, so the HD pass skips the poster and HLS ladder
+        published = _publish_video(video_maker, video_file, session_id, extras=False)
+        update_message(message_id, session_id, {"video_url": published["video_url"]})
+        print(f"Message {message_id} upgraded to HD video {published['video_url']}")
+    finally:
+        if os.path.exists(script_file):
+            os.remove(script_file)
+
+@chat_bp.route("/message_video", methods=["GET"])
+def get_message_video():
+    """Current video of a message, polled by the client while an HD upgrade is pending"""
+    message_id = request.args.get("message_id")
+    if not message_id:
+        return jsonify({"error": "Missing message_id parameter"}), 400
+    message = get_message(message_id, columns=["id", "video_url"])
+    if not message:
+        return jsonify({"error": "Message not found"}), 404
+    return jsonify(message), 200
+
+def _package_and_upload_hls(storage, video_file):
+    """Package a video as HLS and store the tree under its content hash; None on failure"""
+    try:
+        digest = file_sha256(video_file)
+        hls_dir = os.path.join(os.getcwd(), "media", "hls", digest)
+        try:
+            if package_hls(video_file, hls_dir):
+                return storage.upload_tree(hls_dir, f"hls/{digest}", MASTER_PLAYLIST, move=True)
+        finally:
+            shutil.rmtree(hls_dir, ignore_errors=True)
+    except Exception as e:
+        print("Error packaging HLS: ", e)
+        traceback.print_exc()
+    return None
+
 @chat_bp.route("/serve_local_file", methods=["GET"])
 def serve_local_file():
     file_path = request.args.get("path")
@@ -258,8 +407,9 @@ def serve_local_file():
         if not os.path.exists(file_path):
             return jsonify({"error": "File not found"}), 404
             
-        # Return the file
-        return send_file(file_path)
+        # Return the file; an absolute path keeps send_file from resolving it
+        # against the app package instead of the working directory
+        return send_media_file(os.path.abspath(file_path))
     except Exception as e:
         print(f"Error serving local file: {e}")
 
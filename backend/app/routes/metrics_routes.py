@@ -0,0 +1,8 @@
+from flask import Blueprint, jsonify
+from app.services.metrics import snapshot
+
+metrics_bp = Blueprint("metrics", __name__)
+
+@metrics_bp.route("/metrics", methods=["GET"])
+def route_metrics():
+    return jsonify(snapshot()), 200
@@ -1,10 +1,11 @@
 from flask import Blueprint, jsonify, request
 from app.services.supabase import (
     get_chat_session,
-    get_all_chat_sessions,
+    get_chat_sessions_page,
     get_latest_chat_session,
     post_chat_session
 )
+from app.services.pagination import parse_limit
 
 session_bp = Blueprint("session", __name__)
 
@@ -23,8 +24,17 @@ def route_chat_session():
 
 @session_bp.route("/get_all_chat_sessions", methods=["GET"])
 def route_all_chat_sessions():
-    data = get_all_chat_sessions()
-    return jsonify(data)
+    try:
+        limit = parse_limit(request.args.get("limit"))
+        data, next_cursor = get_chat_sessions_page(limit, request.args.get("cursor"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    response = jsonify(data)
+    # Older sessions are fetched by passing this back as ?cursor=
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
 
 @session_bp.route("/get_latest_session", methods=["GET"])
 def route_latest_chat_session():
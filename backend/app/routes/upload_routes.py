@@ -1,8 +1,73 @@
-from flask import jsonify, request, Blueprint, send_from_directory
+from flask import jsonify, request, Blueprint, Response, abort, send_file
+from werkzeug.security import safe_join
+from urllib.parse import quote
+import mimetypes
 import os
+import re
 
 upload_bp = Blueprint("upload", __name__)
 
+# Media stored under its SHA-256 (see SupabaseStorage.upload_file) never
+# changes, and neither do HLS trees stored under their source video's hash
+CONTENT_ADDRESSED_NAME = re.compile(r"^([0-9a-f]{64})(\.[A-Za-z0-9]+)?$")
+CONTENT_ADDRESSED_DIR = re.compile(r"(^|/)hls/[0-9a-f]{64}/")
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+# Hand media bytes to the front server instead of streaming them from a
+# worker: "x-accel" (nginx X-Accel-Redirect), "x-sendfile" (Apache,
+# lighttpd) or empty to send from Flask, which is fine for development
+MEDIA_OFFLOAD = os.getenv("MEDIA_OFFLOAD", "").strip().lower()
+# For x-accel, files under MEDIA_OFFLOAD_ROOT are served by an `internal`
+# nginx location at MEDIA_OFFLOAD_PREFIX that aliases that directory
+MEDIA_OFFLOAD_ROOT = os.path.abspath(os.getenv("MEDIA_OFFLOAD_ROOT", os.getcwd()))
+MEDIA_OFFLOAD_PREFIX = os.getenv("MEDIA_OFFLOAD_PREFIX", "/protected-media/")
+
+
+def send_media_file(path):
+    """
+    Serve a media file with Range (206), ETag / Last-Modified and 304 support.
+
+    Content-addressed files use their hash as a strong ETag and are cached
+    as immutable for a year; anything else must be revalidated, which is
+    answered with a 304 when unchanged. With MEDIA_OFFLOAD set the route
+    only resolves the path, and the front server streams the bytes and
+    handles ranges and validators itself.
+    """
+    match = CONTENT_ADDRESSED_NAME.match(os.path.basename(path))
+    immutable = bool(match or CONTENT_ADDRESSED_DIR.search(path.replace(os.sep, "/")))
+    response = _offload_response(path)
+    if response is None:
+        if immutable:
+            etag = match.group(1) if match else True
+            response = send_file(path, conditional=True, etag=etag, max_age=IMMUTABLE_MAX_AGE)
+        else:
+            response = send_file(path, conditional=True)
+    # Same caching whether the bytes come from here or the front server
+    if immutable:
+        response.cache_control.public = True
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response
+
+
+def _offload_response(path):
+    """An empty response telling the front server to send path, or None to send it here"""
+    if MEDIA_OFFLOAD == "x-accel":
+        relative = os.path.relpath(path, MEDIA_OFFLOAD_ROOT)
+        if relative.startswith(".."):
+            print(f"Not offloading {path}: outside MEDIA_OFFLOAD_ROOT")
+            return None
+        header = ("X-Accel-Redirect", MEDIA_OFFLOAD_PREFIX.rstrip("/") + "/" + quote(relative.replace(os.sep, "/")))
+    elif MEDIA_OFFLOAD == "x-sendfile":
+        header = ("X-Sendfile", path)
+    else:
+        return None
+    response = Response(mimetype=mimetypes.guess_type(path)[0] or "application/octet-stream")
+    response.headers[header[0]] = header[1]
+    return response
+
 @upload_bp.route("/upload_image", methods=["POST"])
 def route_upload_image():
     if "image" not in request.files:
@@ -32,8 +97,11 @@ def upload_file():
     # Process the file upload
     return jsonify({"message": "File uploaded successfully"}), 200
 
-@upload_bp.route("/media/<filename>", methods=["GET"])
+@upload_bp.route("/media/<path:filename>", methods=["GET"])
 def serve_media(filename):
     """Serve media files from local storage"""
     local_storage_path = os.path.join(os.getcwd(), "local_storage")
-    return send_from_directory(local_storage_path, filename)
+    file_path = safe_join(local_storage_path, filename)
+    if file_path is None or not os.path.isfile(file_path):
+        abort(404)
+    return send_media_file(file_path)
@@ -0,0 +1,62 @@
+import os
+import hashlib
+from datetime import datetime
+
+# Message fields that can hold large payloads and are stored out of row
+ARTIFACT_FIELDS = ("manim_code", "image_summary")
+
+# Values at or below this many characters stay inline in chat_messages
+INLINE_LIMIT = int(os.getenv("ARTIFACT_INLINE_LIMIT", "512"))
+
+REF_PREFIX = "sha256:"
+
+# Supabase side table backing the artifact store:
+#
+#   create table chat_artifacts (
+#       hash text primary key,
+#       kind text,
+#       content text,
+#       time_created timestamptz
+#   );
+
+
+def is_ref(value):
+    return isinstance(value, str) and value.startswith(REF_PREFIX)
+
+
+def ref_hash(ref):
+    """The hex digest inside an artifact reference"""
+    return ref[len(REF_PREFIX):]
+
+
+def make_artifact(content, kind):
+    """Return (reference, artifact row) for a piece of content"""
+    digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    row = {
+        "hash": digest,
+        "kind": kind,
+        "content": content,
+        "time_created": datetime.now().isoformat(),
+    }
+    return REF_PREFIX + digest, row
+
+
+def split_artifacts(messages):
+    """
+    Move large ARTIFACT_FIELDS out of messages.
+
+    Returns copies of the messages with those fields replaced by
+    "sha256:<hex>" references, plus the de-duplicated artifact rows to store.
+    """
+    rows = {}
+    stored_messages = []
+    for message in messages:
+        message = dict(message)
+        for field in ARTIFACT_FIELDS:
+            value = message.get(field)
+            if isinstance(value, str) and len(value) > INLINE_LIMIT and not is_ref(value):
+                ref, row = make_artifact(value, field)
+                rows[row["hash"]] = row
+                message[field] = ref
+        stored_messages.append(message)
+    return stored_messages, list(rows.values())
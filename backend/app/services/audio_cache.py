@@ -0,0 +1,106 @@
+import os
+import re
+import json
+import hashlib
+import threading
+import unicodedata
+from app.services import metrics
+from app.services.fileops import place_file
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def normalize_text(text):
+    """
+    Canonical form of narration text for cache keys.
+
+    Unicode is NFKC-normalized and whitespace collapsed; case is kept, since
+    engines read "LSTM" and "lstm" differently.
+    """
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def split_sentences(text):
+    """Split normalized text into sentences, the unit the cache stores"""
+    return [sentence for sentence in _SENTENCE_END.split(normalize_text(text)) if sentence]
+
+
+def cache_key(text, lang, tld, slow, backend):
+    raw = json.dumps([normalize_text(text), lang, tld, bool(slow), backend])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class AudioCache:
+    """
+    Content-addressed cache of synthesized clips on disk.
+
+    Each clip is stored as <key><extension>, where the key hashes the
+    normalized text and every voice parameter including the backend. A hit
+    touches the file's mtime, and once the directory grows past max_bytes
+    the least recently used clips are deleted.
+    """
+
+    # Prefix of the hit/miss/eviction metrics
+    metric = "audio_cache"
+
+    def __init__(self, directory, max_bytes=512 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._size = sum(entry.stat().st_size for entry in os.scandir(directory) if entry.is_file())
+        metrics.set_gauge(f"{self.metric}.bytes", self._size)
+
+    def path_for(self, key, extension):
+        return os.path.join(self.directory, key + extension)
+
+    def get(self, key, extension):
+        """Path of the cached clip, or None on a miss"""
+        path = self.path_for(key, extension)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            metrics.incr(f"{self.metric}.misses")
+            return None
+        metrics.incr(f"{self.metric}.hits")
+        return path
+
+    def put(self, key, extension, source_path, move=True):
+        """Move (or with move=False, clone) a fresh clip into the cache and return its cached path"""
+        path = self.path_for(key, extension)
+        size = os.path.getsize(source_path)
+        with self._lock:
+            replaced = os.path.getsize(path) if os.path.exists(path) else 0
+            place_file(source_path, path, move=move)
+            self._size += size - replaced
+            self._evict(keep=path)
+            metrics.set_gauge(f"{self.metric}.bytes", self._size)
+        return path
+
+    def _evict(self, keep):
+        """Delete least recently used clips until under max_bytes (called with the lock held)"""
+        if self._size <= self.max_bytes:
+            return
+        entries = sorted(
+            # Dot files are still being written
+            (entry for entry in os.scandir(self.directory)
+             if entry.is_file() and not entry.name.startswith(".") and entry.path != keep),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        for entry in entries:
+            if self._size <= self.max_bytes:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+            except FileNotFoundError:
+                continue
+            self._size -= size
+            metrics.incr(f"{self.metric}.evictions")
+
+
+def create_audio_cache():
+    """Build the cache described by the AUDIO_CACHE_* environment variables"""
+    directory = os.getenv("AUDIO_CACHE_DIR") or os.path.join(os.getcwd(), "backend", "local_db", "audio_cache")
+    max_bytes = int(float(os.getenv("AUDIO_CACHE_MAX_MB", "512")) * 1024 * 1024)
+    return AudioCache(directory, max_bytes)
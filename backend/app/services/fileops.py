@@ -0,0 +1,60 @@
+import errno
+import os
+import shutil
+
+try:
+    import fcntl
+except ImportError:  # Windows: no reflinks, renames and copies still work
+    fcntl = None
+
+# ioctl(dest_fd, FICLONE, src_fd) from linux/fs.h; supported on Btrfs, XFS and bcachefs
+FICLONE = 0x40049409
+
+
+def place_file(src, dst, move=False):
+    """
+    Put the contents of src at dst without copying bytes where possible.
+
+    With move=True src is handed over: it is renamed into place, or copied
+    and removed when dst is on another device. Otherwise src is kept and dst
+    becomes a reflink (copy-on-write clone) where the filesystem supports
+    it, else a plain copy. src is never hardlinked: a caller that keeps it
+    may rewrite it in place, which would change dst too.
+
+    Returns how the file was placed: "rename", "reflink" or "copy".
+    """
+    if move:
+        try:
+            os.replace(src, dst)
+            return "rename"
+        except OSError as error:
+            if error.errno != errno.EXDEV:
+                raise
+        shutil.copyfile(src, dst)
+        os.remove(src)
+        return "copy"
+
+    # Never write through an existing dst: it may itself be a link to other data
+    if os.path.lexists(dst):
+        os.remove(dst)
+    if _reflink(src, dst):
+        return "reflink"
+    shutil.copyfile(src, dst)
+    return "copy"
+
+
+def _reflink(src, dst):
+    if fcntl is None:
+        return False
+    try:
+        with open(src, "rb") as source, open(dst, "wb") as target:
+            try:
+                fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+                return True
+            except OSError:
+                pass
+    except OSError:
+        return False
+    # The clone was refused; don't leave an empty dst behind
+    os.remove(dst)
+    return False
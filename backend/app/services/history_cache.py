@@ -0,0 +1,214 @@
+import os
+import json
+import threading
+import time
+from collections import OrderedDict
+from app.services import metrics
+from app.services.pagination import DEFAULT_PAGE_SIZE, encode_cursor
+
+try:
+    import redis
+except ImportError:  # Redis is only needed when the cache is shared across workers
+    redis = None
+
+
+class HistoryCache:
+    """
+    In-process read-through cache of the newest messages of each session.
+
+    Each entry keeps up to tail_size messages (oldest first) and whether
+    older messages exist beyond them, which is all the first page of
+    /api/get_chat_histories and load_context need. Sessions are evicted
+    least-recently-used once max_sessions is reached, and entries expire
+    after ttl seconds so other workers' writes are picked up eventually.
+    """
+
+    def __init__(self, max_sessions=256, tail_size=DEFAULT_PAGE_SIZE, ttl=60.0):
+        self.max_sessions = max_sessions
+        self.tail_size = tail_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        # Per-session write counter, so a fill racing a write can tell it is stale
+        self._stamps = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get_page(self, session_id, limit):
+        """Return (messages, next_cursor) for the newest page, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None and time.monotonic() - entry["stored_at"] > self.ttl:
+                del self._entries[session_id]
+                entry = None
+            if entry is None or (limit > len(entry["messages"]) and entry["has_older"]):
+                self._record(hit=False)
+                return None
+            self._entries.move_to_end(session_id)
+            self._record(hit=True)
+            return _page_from_tail(entry["messages"], entry["has_older"], limit)
+
+    def stamp(self, session_id):
+        """Token to take before loading a page; fill() ignores the page if a write came in since"""
+        with self._lock:
+            return self._stamps.get(session_id, 0)
+
+    def fill(self, session_id, messages, has_older, stamp=None):
+        """Store the newest page just loaded from Supabase or the local store"""
+        messages = list(messages)
+        if len(messages) > self.tail_size:
+            messages = messages[-self.tail_size:]
+            has_older = True
+        with self._lock:
+            if stamp is not None and self._stamps.get(session_id, 0) != stamp:
+                return
+            self._entries[session_id] = {
+                "messages": messages,
+                "has_older": has_older,
+                "stored_at": time.monotonic(),
+            }
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_sessions:
+                self._entries.popitem(last=False)
+                metrics.incr("history_cache.evictions")
+            metrics.set_gauge("history_cache.sessions", len(self._entries))
+
+    def append(self, message):
+        """Add a newly written message to its session's entry, if cached"""
+        session_id = message.get("chat_session_id")
+        with self._lock:
+            self._bump(session_id)
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return
+            messages = entry["messages"]
+            messages.append(message)
+            # Writes nearly always arrive in order; keep the tail sorted if not
+            if len(messages) > 1 and _sort_key(messages[-2]) > _sort_key(message):
+                messages.sort(key=_sort_key)
+            if len(messages) > self.tail_size:
+                del messages[:len(messages) - self.tail_size]
+                entry["has_older"] = True
+
+    def invalidate(self, session_id):
+        with self._lock:
+            self._bump(session_id)
+            self._entries.pop(session_id, None)
+            metrics.set_gauge("history_cache.sessions", len(self._entries))
+
+    def _bump(self, session_id):
+        """Count a write to session_id (called with the lock held)"""
+        self._stamps[session_id] = self._stamps.get(session_id, 0) + 1
+        self._stamps.move_to_end(session_id)
+        while len(self._stamps) > self.max_sessions:
+            self._stamps.popitem(last=False)
+
+    def _record(self, hit):
+        if hit:
+            self._hits += 1
+            metrics.incr("history_cache.hits")
+        else:
+            self._misses += 1
+            metrics.incr("history_cache.misses")
+        metrics.set_gauge("history_cache.hit_rate", round(self._hits / (self._hits + self._misses), 4))
+
+
+class RedisHistoryCache(HistoryCache):
+    """
+    The same cache kept in Redis so every worker sees one copy.
+
+    Writes invalidate the session's key instead of appending, which keeps
+    workers consistent without a read-modify-write race. Memory is bounded
+    by the Redis maxmemory / allkeys-lru policy plus a per-key TTL.
+    """
+
+    def __init__(self, url, tail_size=DEFAULT_PAGE_SIZE, ttl=60.0):
+        super().__init__(tail_size=tail_size, ttl=ttl)
+        self._redis = redis.Redis.from_url(url)
+
+    def get_page(self, session_id, limit):
+        try:
+            raw = self._redis.get(_redis_key(session_id))
+        except redis.RedisError as error:
+            print(f"History cache error: {error}")
+            raw = None
+        entry = json.loads(raw) if raw else None
+        if entry is None or (limit > len(entry["messages"]) and entry["has_older"]):
+            self._record(hit=False)
+            return None
+        self._record(hit=True)
+        return _page_from_tail(entry["messages"], entry["has_older"], limit)
+
+    def stamp(self, session_id):
+        try:
+            return int(self._redis.get(_stamp_key(session_id)) or 0)
+        except redis.RedisError as error:
+            print(f"History cache error: {error}")
+            return None
+
+    def fill(self, session_id, messages, has_older, stamp=None):
+        messages = list(messages)
+        if len(messages) > self.tail_size:
+            messages = messages[-self.tail_size:]
+            has_older = True
+        payload = json.dumps({"messages": messages, "has_older": has_older})
+        try:
+            # Only store the page if no worker wrote to the session since stamp was taken
+            with self._redis.pipeline() as pipe:
+                pipe.watch(_stamp_key(session_id))
+                if stamp is not None and int(pipe.get(_stamp_key(session_id)) or 0) != stamp:
+                    return
+                pipe.multi()
+                pipe.set(_redis_key(session_id), payload, ex=max(1, int(self.ttl)))
+                pipe.execute()
+        except redis.WatchError:
+            return
+        except redis.RedisError as error:
+            print(f"History cache error: {error}")
+
+    def append(self, message):
+        self.invalidate(message.get("chat_session_id"))
+
+    def invalidate(self, session_id):
+        try:
+            with self._redis.pipeline() as pipe:
+                pipe.incr(_stamp_key(session_id))
+                pipe.expire(_stamp_key(session_id), max(1, int(self.ttl)) * 2)
+                pipe.delete(_redis_key(session_id))
+                pipe.execute()
+        except redis.RedisError as error:
+            print(f"History cache error: {error}")
+
+
+def create_history_cache():
+    """Build the cache described by the HISTORY_CACHE_* environment variables"""
+    tail_size = int(os.getenv("HISTORY_CACHE_TAIL", str(DEFAULT_PAGE_SIZE)))
+    ttl = float(os.getenv("HISTORY_CACHE_TTL", "60"))
+    redis_url = os.getenv("HISTORY_CACHE_REDIS_URL")
+    if redis_url:
+        if redis is not None:
+            return RedisHistoryCache(redis_url, tail_size=tail_size, ttl=ttl)
+        print("HISTORY_CACHE_REDIS_URL is set but the redis package is not installed; using an in-process cache")
+    return HistoryCache(
+        max_sessions=int(os.getenv("HISTORY_CACHE_SESSIONS", "256")),
+        tail_size=tail_size,
+        ttl=ttl,
+    )
+
+
+def _page_from_tail(messages, has_older, limit):
+    page = messages[-limit:]
+    more = has_older or len(messages) > limit
+    return list(page), (encode_cursor(page[0]) if more and page else None)
+
+
+def _sort_key(message):
+    return (message.get("time_created") or "", message.get("id") or "")
+
+
+def _redis_key(session_id):
+    return f"history:{session_id}"
+
+
+def _stamp_key(session_id):
+    return f"history-stamp:{session_id}"
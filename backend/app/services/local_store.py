@@ -0,0 +1,309 @@
+import os
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+SESSION_COLUMNS = ["id", "title", "time_created"]
+MESSAGE_COLUMNS = [
+    "id",
+    "sender",
+    "message",
+    "chat_session_id",
+    "image_url",
+    "manim_code",
+    "image_summary",
+    "video_url",
+    "time_created",
+]
+ARTIFACT_COLUMNS = ["hash", "kind", "content", "time_created"]
+MEDIA_OBJECT_COLUMNS = ["sha256", "object_name", "url", "size", "time_created"]
+MEDIA_REF_COLUMNS = ["sha256", "session_id", "file_name", "time_created"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chat_sessions (
+    id TEXT PRIMARY KEY,
+    title TEXT,
+    time_created TEXT
+);
+-- Keyset pagination walks (time_created, id); the older single-column index is superseded
+DROP INDEX IF EXISTS idx_chat_sessions_time_created;
+CREATE INDEX IF NOT EXISTS idx_chat_sessions_time_id
+    ON chat_sessions (time_created, id);
+
+CREATE TABLE IF NOT EXISTS chat_messages (
+    id TEXT PRIMARY KEY,
+    sender TEXT,
+    message TEXT,
+    chat_session_id TEXT,
+    image_url TEXT,
+    manim_code TEXT,
+    image_summary TEXT,
+    video_url TEXT,
+    time_created TEXT
+);
+DROP INDEX IF EXISTS idx_chat_messages_session_time;
+CREATE INDEX IF NOT EXISTS idx_chat_messages_session_time_id
+    ON chat_messages (chat_session_id, time_created, id);
+CREATE INDEX IF NOT EXISTS idx_chat_messages_time_created
+    ON chat_messages (time_created);
+
+-- Large message payloads (manim_code, image_summary), addressed by SHA-256
+CREATE TABLE IF NOT EXISTS chat_artifacts (
+    hash TEXT PRIMARY KEY,
+    kind TEXT,
+    content TEXT,
+    time_created TEXT
+);
+
+-- Uploaded media stored once per SHA-256, and who uploaded it under which name
+CREATE TABLE IF NOT EXISTS media_objects (
+    sha256 TEXT PRIMARY KEY,
+    object_name TEXT,
+    url TEXT,
+    size INTEGER,
+    time_created TEXT
+);
+CREATE TABLE IF NOT EXISTS media_refs (
+    sha256 TEXT,
+    session_id TEXT,
+    file_name TEXT,
+    time_created TEXT,
+    PRIMARY KEY (sha256, session_id, file_name)
+);
+CREATE INDEX IF NOT EXISTS idx_media_refs_session
+    ON media_refs (session_id);
+
+CREATE TABLE IF NOT EXISTS store_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class LocalStore:
+    """
+    SQLite (WAL) store used when Supabase is not configured or unreachable.
+
+    Each thread gets its own connection; WAL lets readers run while a
+    writer commits, and every insert is its own transaction so concurrent
+    requests no longer overwrite each other's messages.
+    """
+
+    def __init__(self, db_path, sessions_file=None, messages_file=None):
+        self.db_path = db_path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+
+        conn = self._connect()
+        with conn:
+            conn.executescript(SCHEMA)
+        self._migrate_json(sessions_file, messages_file)
+
+    def _connect(self):
+        """Return this thread's connection, opening it on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            self._local.conn = conn
+        return conn
+
+    def _migrate_json(self, sessions_file, messages_file):
+        """One-time import of the old chat_sessions.json / chat_messages.json files"""
+        conn = self._connect()
+        row = conn.execute("SELECT value FROM store_meta WHERE key = 'json_migrated'").fetchone()
+        if row is not None:
+            return
+
+        sessions = _read_json_list(sessions_file)
+        messages = _read_json_list(messages_file)
+        with conn:
+            conn.executemany(_insert_sql("chat_sessions", SESSION_COLUMNS, ignore=True),
+                             [_row_values(s, SESSION_COLUMNS) for s in sessions])
+            conn.executemany(_insert_sql("chat_messages", MESSAGE_COLUMNS, ignore=True),
+                             [_row_values(m, MESSAGE_COLUMNS) for m in messages])
+            conn.execute("INSERT OR IGNORE INTO store_meta (key, value) VALUES ('json_migrated', ?)",
+                         (f"{len(sessions)} sessions, {len(messages)} messages",))
+        if sessions or messages:
+            print(f"Migrated {len(sessions)} sessions and {len(messages)} messages from JSON to {self.db_path}")
+
+    # Sessions
+
+    def insert_session(self, session):
+        conn = self._connect()
+        with conn:
+            conn.execute(_insert_sql("chat_sessions", SESSION_COLUMNS),
+                         _row_values(session, SESSION_COLUMNS))
+        return session
+
+    def get_session(self, session_id):
+        row = self._connect().execute(
+            "SELECT * FROM chat_sessions WHERE id = ?", (session_id,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def get_latest_session(self):
+        row = self._connect().execute(
+            "SELECT * FROM chat_sessions ORDER BY time_created DESC LIMIT 1"
+        ).fetchone()
+        return dict(row) if row else None
+
+    def get_all_sessions(self):
+        rows = self._connect().execute(
+            "SELECT * FROM chat_sessions ORDER BY time_created DESC"
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_sessions_page(self, limit, before=None):
+        """Up to limit sessions ordered newest first, starting after the (time_created, id) pair before"""
+        if before:
+            rows = self._connect().execute(
+                "SELECT * FROM chat_sessions WHERE (time_created, id) < (?, ?) "
+                "ORDER BY time_created DESC, id DESC LIMIT ?",
+                (before[0], before[1], limit),
+            ).fetchall()
+        else:
+            rows = self._connect().execute(
+                "SELECT * FROM chat_sessions ORDER BY time_created DESC, id DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    # Messages
+
+    def insert_message(self, message):
+        return self.insert_messages([message])[0]
+
+    def insert_messages(self, messages):
+        """Insert several messages in a single transaction"""
+        conn = self._connect()
+        with conn:
+            conn.executemany(_insert_sql("chat_messages", MESSAGE_COLUMNS),
+                             [_row_values(m, MESSAGE_COLUMNS) for m in messages])
+        return messages
+
+    def update_message(self, message_id, fields):
+        """Change some columns of one message; returns the number of rows updated"""
+        fields = {column: value for column, value in fields.items() if column in MESSAGE_COLUMNS}
+        if not fields:
+            return 0
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(f"UPDATE chat_messages SET {assignments} WHERE id = ?",
+                                  (*fields.values(), message_id))
+        return cursor.rowcount
+
+    def get_message(self, message_id):
+        row = self._connect().execute(
+            "SELECT * FROM chat_messages WHERE id = ?", (message_id,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def get_messages(self, session_id):
+        rows = self._connect().execute(
+            "SELECT * FROM chat_messages WHERE chat_session_id = ? ORDER BY time_created ASC",
+            (session_id,),
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_messages_page(self, session_id, limit, before=None, columns=None):
+        """
+        Up to limit messages of a session ordered newest first, starting after before.
+
+        columns restricts the selected fields (all of MESSAGE_COLUMNS by default).
+        """
+        select = _select_list(columns, MESSAGE_COLUMNS)
+        if before:
+            rows = self._connect().execute(
+                f"SELECT {select} FROM chat_messages WHERE chat_session_id = ? AND (time_created, id) < (?, ?) "
+                "ORDER BY time_created DESC, id DESC LIMIT ?",
+                (session_id, before[0], before[1], limit),
+            ).fetchall()
+        else:
+            rows = self._connect().execute(
+                f"SELECT {select} FROM chat_messages WHERE chat_session_id = ? "
+                "ORDER BY time_created DESC, id DESC LIMIT ?",
+                (session_id, limit),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    # Artifacts
+
+    def insert_artifacts(self, artifacts):
+        """Store artifacts in one transaction; existing hashes are left untouched"""
+        conn = self._connect()
+        with conn:
+            conn.executemany(_insert_sql("chat_artifacts", ARTIFACT_COLUMNS, ignore=True),
+                             [_row_values(a, ARTIFACT_COLUMNS) for a in artifacts])
+        return artifacts
+
+    def get_artifact(self, artifact_hash):
+        row = self._connect().execute(
+            "SELECT * FROM chat_artifacts WHERE hash = ?", (artifact_hash,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    # Media
+
+    def get_media_object(self, sha256):
+        row = self._connect().execute(
+            "SELECT * FROM media_objects WHERE sha256 = ?", (sha256,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def insert_media_object(self, media_object):
+        conn = self._connect()
+        with conn:
+            conn.execute(_insert_sql("media_objects", MEDIA_OBJECT_COLUMNS),
+                         _row_values(media_object, MEDIA_OBJECT_COLUMNS))
+        return media_object
+
+    def add_media_ref(self, sha256, session_id, file_name):
+        """Record that session_id uploaded the object sha256 as file_name"""
+        conn = self._connect()
+        with conn:
+            conn.execute(_insert_sql("media_refs", MEDIA_REF_COLUMNS, ignore=True),
+                         (sha256, session_id or "", file_name, datetime.now().isoformat()))
+
+    def get_media_refs(self, sha256):
+        rows = self._connect().execute(
+            "SELECT * FROM media_refs WHERE sha256 = ? ORDER BY time_created", (sha256,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+
+def _insert_sql(table, columns, ignore=False):
+    verb = "INSERT OR IGNORE" if ignore else "INSERT OR REPLACE"
+    placeholders = ", ".join("?" for _ in columns)
+    return f"{verb} INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+
+
+def _select_list(columns, allowed):
+    """Validated column list for a SELECT; never interpolates unknown names"""
+    if not columns:
+        return "*"
+    unknown = [c for c in columns if c not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown column(s): {', '.join(unknown)}")
+    return ", ".join(columns)
+
+
+def _row_values(record, columns):
+    return tuple(record.get(column) for column in columns)
+
+
+def _read_json_list(path):
+    """Read a legacy JSON list file, treating missing or corrupt files as empty"""
+    if not path or not os.path.exists(path):
+        return []
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+        return data if isinstance(data, list) else []
+    except (json.JSONDecodeError, OSError):
+        return []
@@ -0,0 +1,29 @@
+import threading
+import time
+
+# Process-wide counters and gauges, exposed through /api/metrics
+_lock = threading.Lock()
+_counters = {}
+_gauges = {}
+
+
+def incr(name, amount=1):
+    """Increase a counter by amount"""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def set_gauge(name, value):
+    """Record the current value of a gauge"""
+    with _lock:
+        _gauges[name] = value
+
+
+def snapshot():
+    """Return a copy of every metric, suitable for JSON serialization"""
+    with _lock:
+        return {
+            "counters": dict(_counters),
+            "gauges": dict(_gauges),
+            "time": time.time(),
+        }
@@ -0,0 +1,51 @@
+import base64
+import json
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def parse_limit(value, default=DEFAULT_PAGE_SIZE):
+    """Turn a ?limit= query value into a page size between 1 and MAX_PAGE_SIZE"""
+    if value in (None, ""):
+        return default
+    limit = int(value)  # ValueError for junk input, reported as a 400
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def encode_cursor(row):
+    """Opaque keyset cursor pointing just past row, ordered by (time_created, id)"""
+    raw = json.dumps([row.get("time_created"), row.get("id")]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Return the (time_created, id) pair encoded in cursor, or raise ValueError"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        time_created, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(time_created, str) or not isinstance(row_id, str):
+        raise ValueError("Invalid cursor")
+    return time_created, row_id
+
+
+def before_filter(position):
+    """PostgREST `or` filter selecting rows strictly before position in descending order"""
+    time_created, row_id = position
+    return f'(time_created.lt."{time_created}",and(time_created.eq."{time_created}",id.lt."{row_id}"))'
+
+
+def take_page(rows, limit):
+    """
+    Split rows fetched with limit + 1 into the page and the next cursor.
+
+    The extra row only tells us whether another page exists; the cursor
+    points at the last row actually returned.
+    """
+    page = rows[:limit]
+    next_cursor = encode_cursor(page[-1]) if len(rows) > limit and page else None
+    return page, next_cursor
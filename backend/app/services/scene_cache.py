@@ -0,0 +1,70 @@
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from app.services.audio_cache import AudioCache
+
+# "global" shares clips between all sessions, "session" only within one, "off" disables the cache
+SCENE_CACHE_SCOPE = os.getenv("SCENE_CACHE_SCOPE", "global").strip().lower()
+
+
+def scene_key(fingerprint, profile, session_id=None):
+    """
+    Cache key of one rendered scene: its normalized source (fingerprint),
+    everything about the render that changes the output (profile) and, with
+    the "session" scope, the session it belongs to.
+    """
+    scope = session_id if SCENE_CACHE_SCOPE == "session" else None
+    raw = json.dumps([fingerprint, profile, scope], sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class SceneCache(AudioCache):
+    """
+    Rendered scene clips plus the holds static-frame elision recorded for
+    them, in the same size-capped LRU store as synthesized speech.
+
+    A clip is stored as <key>.mp4 next to <key>.holds.json; an entry counts
+    as a hit only while both files are present.
+    """
+
+    metric = "scene_cache"
+
+    def get_scene(self, key):
+        """(clip path, holds) of a cached scene, or None on a miss"""
+        holds_path = self.get(key, ".holds.json")
+        clip_path = self.get(key, ".mp4") if holds_path else None
+        if clip_path is None:
+            return None
+        try:
+            with open(holds_path, "r") as f:
+                holds = [tuple(hold) for hold in json.load(f)]
+        except (OSError, ValueError):
+            return None
+        return clip_path, holds
+
+    def put_scene(self, key, clip_path, holds):
+        """Add a freshly rendered clip (cloned, so the render keeps its copy) and its holds"""
+        fd, holds_path = tempfile.mkstemp(suffix=".holds.json")
+        with os.fdopen(fd, "w") as f:
+            json.dump([list(hold) for hold in holds], f)
+        self.put(key, ".holds.json", holds_path)
+        return self.put(key, ".mp4", clip_path, move=False)
+
+
+_scene_cache = None
+_scene_cache_lock = threading.Lock()
+
+
+def get_scene_cache():
+    """The process-wide scene cache, or None when SCENE_CACHE_SCOPE is "off" """
+    global _scene_cache
+    if SCENE_CACHE_SCOPE == "off":
+        return None
+    with _scene_cache_lock:
+        if _scene_cache is None:
+            directory = os.getenv("SCENE_CACHE_DIR") or os.path.join(os.getcwd(), "backend", "local_db", "scene_cache")
+            max_bytes = int(float(os.getenv("SCENE_CACHE_MAX_MB", "2048")) * 1024 * 1024)
+            _scene_cache = SceneCache(directory, max_bytes)
+        return _scene_cache
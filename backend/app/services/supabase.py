@@ -1,11 +1,17 @@
 import os
-import requests
 from dotenv import load_dotenv
 import json
 from datetime import datetime
 import uuid
 import time
 import traceback
+import atexit
+from app.services.local_store import LocalStore, MESSAGE_COLUMNS
+from app.services.supabase_client import SupabaseRestClient
+from app.services.pagination import DEFAULT_PAGE_SIZE, decode_cursor, encode_cursor, before_filter, take_page
+from app.services.history_cache import create_history_cache
+from app.services.write_behind import MessageWriteQueue
+from app.services.artifacts import split_artifacts
 
 load_dotenv()
 
@@ -14,53 +20,23 @@ SUPABASE_ANON_KEY = os.getenv('supakey')
 
 # Setup local storage directory
 LOCAL_STORAGE_DIR = os.path.join(os.getcwd(), "backend", "local_db")
+LOCAL_DB_FILE = os.path.join(LOCAL_STORAGE_DIR, "local.db")
+# Legacy JSON files, imported into the SQLite store once on first start
 SESSIONS_FILE = os.path.join(LOCAL_STORAGE_DIR, "chat_sessions.json")
 MESSAGES_FILE = os.path.join(LOCAL_STORAGE_DIR, "chat_messages.json")
 
-# Create local storage directory if it doesn't exist
-if not os.path.exists(LOCAL_STORAGE_DIR):
-    os.makedirs(LOCAL_STORAGE_DIR, exist_ok=True)
+local_store = LocalStore(LOCAL_DB_FILE, SESSIONS_FILE, MESSAGES_FILE)
 
-# Initialize local storage files if they don't exist
-if not os.path.exists(SESSIONS_FILE):
-    with open(SESSIONS_FILE, 'w') as f:
-        json.dump([], f)
+# One pooled client for every Supabase call; its circuit breaker lets us skip
+# straight to local storage while Supabase is down
+rest_client = SupabaseRestClient(SUPABASE_URL, SUPABASE_ANON_KEY)
 
-if not os.path.exists(MESSAGES_FILE):
-    with open(MESSAGES_FILE, 'w') as f:
-        json.dump([], f)
+# Newest messages per session, shared by load_context and /api/get_chat_histories
+history_cache = create_history_cache()
 
-def _read_local_sessions():
-    """Read sessions from local storage"""
-    try:
-        with open(SESSIONS_FILE, 'r') as f:
-            return json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError):
-        # If file is corrupted or doesn't exist, initialize with empty array
-        with open(SESSIONS_FILE, 'w') as f:
-            json.dump([], f)
-        return []
-
-def _write_local_sessions(sessions):
-    """Write sessions to local storage"""
-    with open(SESSIONS_FILE, 'w') as f:
-        json.dump(sessions, f)
-
-def _read_local_messages():
-    """Read messages from local storage"""
-    try:
-        with open(MESSAGES_FILE, 'r') as f:
-            return json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError):
-        # If file is corrupted or doesn't exist, initialize with empty array
-        with open(MESSAGES_FILE, 'w') as f:
-            json.dump([], f)
-        return []
-
-def _write_local_messages(messages):
-    """Write messages to local storage"""
-    with open(MESSAGES_FILE, 'w') as f:
-        json.dump(messages, f)
+# Columns returned by history endpoints unless more are asked for; large
+# payloads (manim_code, image_summary) are fetched lazily via get_artifact
+HISTORY_COLUMNS = ["id", "sender", "message", "chat_session_id", "image_url", "video_url", "time_created"]
 
 def get_chat_session(uuid_val):
     if not uuid_val or uuid_val == "NULL":
@@ -69,16 +45,10 @@ def get_chat_session(uuid_val):
     # Try Supabase first    
     try:
         if SUPABASE_URL and SUPABASE_ANON_KEY:
-            url = f"{SUPABASE_URL}/rest/v1/chat_sessions?id=eq.{uuid_val}"
-            print(url)
-            headers = {
-                'Content-Type': 'application/json',
-                'Accept': 'application/json',
-                'apikey': SUPABASE_ANON_KEY,
-                'Authorization': f'Bearer {SUPABASE_ANON_KEY}'
-            }
-            response = requests.get(url, headers=headers)
-            if response.status_code == 200:
+            path = f"chat_sessions?id=eq.{uuid_val}"
+            print(path)
+            response = rest_client.get(path)
+            if response is not None and response.status_code == 200:
                 result = response.json()
                 # If no session found with the given ID, create a new one
                 if not result:
@@ -89,10 +59,9 @@ def get_chat_session(uuid_val):
         traceback.print_exc()
     
     # Use local storage as fallback
-    sessions = _read_local_sessions()
-    for session in sessions:
-        if session.get('id') == uuid_val:
-            return [session]  # Return as list to match Supabase format
+    session = local_store.get_session(uuid_val)
+    if session:
+        return [session]  # Return as list to match Supabase format
     
     # If no session found, create a new one
     return create_new_session()
@@ -102,15 +71,9 @@ def get_latest_chat_session():
     # Try Supabase first
     try:
         if SUPABASE_URL and SUPABASE_ANON_KEY:
-            url = f"{SUPABASE_URL}/rest/v1/chat_sessions?order=time_created.desc&limit=1"
-            headers = {
-                'Content-Type': 'application/json',
-                'Accept': 'application/json',
-                'apikey': SUPABASE_ANON_KEY,
-                'Authorization': f'Bearer {SUPABASE_ANON_KEY}'
-            }
-            response = requests.get(url, headers=headers)
-            if response.status_code == 200:
+            path = "chat_sessions?order=time_created.desc&limit=1"
+            response = rest_client.get(path)
+            if response is not None and response.status_code == 200:
                 result = response.json()
                 if result:  # Sessions found
                     return result[0]
@@ -119,11 +82,9 @@ def get_latest_chat_session():
         traceback.print_exc()
     
     # Use local storage as fallback
-    sessions = _read_local_sessions()
-    if sessions:
-        # Sort by time_created in descending order
-        sessions.sort(key=lambda x: x.get('time_created', ''), reverse=True)
-        return sessions[0]
+    session = local_store.get_latest_session()
+    if session:
+        return session
     
     # If no sessions found, create a new one
     return create_new_session()
@@ -132,25 +93,16 @@ def get_all_chat_sessions():
     # Try Supabase first
     try:
         if SUPABASE_URL and SUPABASE_ANON_KEY:
-            url = f"{SUPABASE_URL}/rest/v1/chat_sessions?order=time_created.desc"
-            headers = {
-                'Content-Type': 'application/json',
-                'Accept': 'application/json',
-                'apikey': SUPABASE_ANON_KEY,
-                'Authorization': f'Bearer {SUPABASE_ANON_KEY}'
-            }
-            response = requests.get(url, headers=headers)
-            if response.status_code == 200:
+            path = "chat_sessions?order=time_created.desc"
+            response = rest_client.get(path)
+            if response is not None and response.status_code == 200:
                 return response.json()
     except Exception as error:
         print(f"Supabase error: {error}. Using local storage instead.")
         traceback.print_exc()
     
     # Use local storage as fallback
-    sessions = _read_local_sessions()
-    # Sort by time_created in descending order
-    sessions.sort(key=lambda x: x.get('time_created', ''), reverse=True)
-    return sessions
+    return local_store.get_all_sessions()
 
 
 def get_chat_histories(session_id):
@@ -160,45 +112,133 @@ def get_chat_histories(session_id):
     # Try Supabase first
     try:
         if SUPABASE_URL and SUPABASE_ANON_KEY:
-            url = f"{SUPABASE_URL}/rest/v1/chat_messages?chat_session_id=eq.{session_id}&order=time_created.asc"
-            headers = {
-                'Content-Type': 'application/json',
-                'Accept': 'application/json',
-                'apikey': SUPABASE_ANON_KEY,
-                'Authorization': f'Bearer {SUPABASE_ANON_KEY}'
-            }
-            response = requests.get(url, headers=headers)
-            if response.status_code == 200:
+            path = f"chat_messages?chat_session_id=eq.{session_id}&order=time_created.asc"
+            response = rest_client.get(path)
+            if response is not None and response.status_code == 200:
                 return response.json()
     except Exception as error:
         print(f"Supabase error: {error}. Using local storage instead.")
         traceback.print_exc()
     
     # Use local storage as fallback
-    messages = _read_local_messages()
-    session_messages = [msg for msg in messages if msg.get('chat_session_id') == session_id]
-    # Sort by time_created in ascending order
-    session_messages.sort(key=lambda x: x.get('time_created', ''))
-    return session_messages
+    return local_store.get_messages(session_id)
+
+
+def get_chat_sessions_page(limit=DEFAULT_PAGE_SIZE, cursor=None):
+    """
+    Newest-first page of sessions using keyset pagination on (time_created, id).
+
+    Returns (sessions, next_cursor); next_cursor is None on the last page.
+    Raises ValueError for a malformed cursor.
+    """
+    before = decode_cursor(cursor) if cursor else None
+
+    # Try Supabase first
+    try:
+        if SUPABASE_URL and SUPABASE_ANON_KEY:
+            params = {"order": "time_created.desc,id.desc", "limit": limit + 1}
+            if before:
+                params["or"] = before_filter(before)
+            response = rest_client.get("chat_sessions", params=params)
+            if response is not None and response.status_code == 200:
+                return take_page(response.json(), limit)
+    except Exception as error:
+        print(f"Supabase error: {error}. Using local storage instead.")
+        traceback.print_exc()
+
+    # Use local storage as fallback
+    return take_page(local_store.get_sessions_page(limit + 1, before), limit)
+
+
+def get_chat_histories_page(session_id, limit=DEFAULT_PAGE_SIZE, cursor=None, columns=None):
+    """
+    Most recent page of a session's messages, returned oldest first.
+
+    Pages walk backwards in time: pass the returned cursor to load the
+    messages that came before this page. Only HISTORY_COLUMNS are selected
+    unless columns names others. Returns (messages, next_cursor) and raises
+    ValueError for a malformed cursor or an unknown column.
+    """
+    if not session_id or session_id == "NULL":
+        return [], None
+    before = decode_cursor(cursor) if cursor else None
+    columns = list(columns) if columns else HISTORY_COLUMNS
+    unknown = [c for c in columns if c not in MESSAGE_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+    # The history cache only holds the default projection
+    cacheable = before is None and columns == HISTORY_COLUMNS
+
+    # The newest page is served from the history cache when possible
+    if cacheable:
+        cached = history_cache.get_page(session_id, limit)
+        if cached is not None:
+            return cached
+        # A message written while the page loads makes the page stale; fill() then skips it
+        stamp = history_cache.stamp(session_id)
+
+    # Deferred messages are not in either store until the write-behind queue
+    # flushes them, so they are merged in; read before and after the load so a
+    # batch written in between is not missed
+    pending = message_queue.pending(session_id)
+    messages, next_cursor = _load_histories_page(session_id, limit, before, columns)
+    pending += message_queue.pending(session_id)
+    if pending:
+        messages, next_cursor = _merge_pending(messages, next_cursor, pending, limit, before, columns)
+    if cacheable:
+        history_cache.fill(session_id, messages, has_older=next_cursor is not None, stamp=stamp)
+    return messages, next_cursor
+
+
+def _merge_pending(messages, next_cursor, pending, limit, before, columns):
+    """Add queued messages that belong on this page, keeping it oldest first and at most limit long"""
+    merged = {message["id"]: message for message in messages}
+    for message in pending:
+        if before is None or (message["time_created"], message["id"]) < before:
+            merged.setdefault(message["id"], {column: message.get(column) for column in columns})
+    rows = sorted(merged.values(), key=lambda m: (m.get("time_created") or "", m.get("id") or ""))
+    if len(rows) > limit:
+        rows = rows[-limit:]
+        next_cursor = encode_cursor(rows[0])
+    return rows, next_cursor
+
+
+def _load_histories_page(session_id, limit, before, columns):
+    # Try Supabase first
+    try:
+        if SUPABASE_URL and SUPABASE_ANON_KEY:
+            params = {
+                "select": ",".join(columns),
+                "chat_session_id": f"eq.{session_id}",
+                "order": "time_created.desc,id.desc",
+                "limit": limit + 1,
+            }
+            if before:
+                params["or"] = before_filter(before)
+            response = rest_client.get("chat_messages", params=params)
+            if response is not None and response.status_code == 200:
+                messages, next_cursor = take_page(response.json(), limit)
+                return messages[::-1], next_cursor
+    except Exception as error:
+        print(f"Supabase error: {error}. Using local storage instead.")
+        traceback.print_exc()
+
+    # Use local storage as fallback
+    messages, next_cursor = take_page(local_store.get_messages_page(session_id, limit + 1, before, columns), limit)
+    return messages[::-1], next_cursor
 
 
 def post_chat_session(session_title):
     try:
-        url = f"{SUPABASE_URL}/rest/v1/chat_sessions"
-        headers = {
-            'Content-Type': 'application/json',
-            'Accept': 'application/json',
-            'Prefer': 'return=representation',
-            'apikey': SUPABASE_ANON_KEY,
-            'Authorization': f'Bearer {SUPABASE_ANON_KEY}'
-        }
         data = {
             "id": str(uuid.uuid4()),
             "title": session_title,
             "time_created": datetime.now().isoformat(),
         }
         
-        response = requests.post(url, headers=headers, json=data)
+        response = rest_client.post("chat_sessions", headers={'Prefer': 'return=representation'}, json=data)
+        if response is None:
+            return {"error": "Supabase is not configured or currently unavailable"}
         print("Response Content:", response.text)
 
         if response.status_code == 201:
@@ -215,7 +255,7 @@ def post_chat_session(session_title):
         return {"error": str(error)}
 
 
-def post_message(sender, message, chat_session_id, image_url=None, manim_code=None, image_summary=None, video_url=None):
+def post_message(sender, message, chat_session_id, image_url=None, manim_code=None, image_summary=None, video_url=None, defer=False):
     # If no session ID, create a new session
     if not chat_session_id or chat_session_id == "NULL":
         new_session = create_new_session()
@@ -238,30 +278,131 @@ def post_message(sender, message, chat_session_id, image_url=None, manim_code=No
         "video_url": video_url,
         "time_created": datetime.now().isoformat()
     }
+
+    # Deferred messages are spooled to disk and written in batches off the response path
+    if defer:
+        message_queue.enqueue(message_data)
+        history_cache.append(_history_projection(message_data))
+        return {"success": "Message queued!", "data": message_data}
+
+    # Large code / summaries go to the artifact store; the row keeps a reference
+    stored_messages, artifacts = split_artifacts([message_data])
+    stored_message = stored_messages[0]
+    _save_artifacts(artifacts)
     
     # Try Supabase first
     try:
         if SUPABASE_URL and SUPABASE_ANON_KEY:
-            url = f"{SUPABASE_URL}/rest/v1/chat_messages"
-            headers = {
-                'Content-Type': 'application/json',
-                'Accept': 'application/json',
-                'Prefer': 'return=representation',
-                'apikey': SUPABASE_ANON_KEY,
-                'Authorization': f'Bearer {SUPABASE_ANON_KEY}'
-            }
-            response = requests.post(url, headers=headers, json=message_data)
-            if response.status_code == 201:
+            response = rest_client.post("chat_messages", headers={'Prefer': 'return=representation'}, json=stored_message)
+            if response is not None and response.status_code == 201:
+                history_cache.append(_history_projection(message_data))
                 return {"success": "Message sent successfully!", "data": response.json()}
     except Exception as error:
         print(f"Supabase error: {error}. Using local storage instead.")
         traceback.print_exc()
     
     # Use local storage as fallback
-    messages = _read_local_messages()
-    messages.append(message_data)
-    _write_local_messages(messages)
-    return {"success": "Message saved locally!", "data": message_data}
+    local_store.insert_message(stored_message)
+    history_cache.append(_history_projection(message_data))
+    return {"success": "Message saved locally!", "data": stored_message}
+
+
+def update_message(message_id, chat_session_id, fields):
+    """
+    Change fields of a stored message (e.g. swap in an upgraded video_url).
+
+    Waits for the write-behind queue first so the row exists, then updates
+    it in Supabase or, if Supabase has no such row, in the local store.
+    """
+    message_queue.flush(timeout=30)
+    history_cache.invalidate(chat_session_id)
+
+    # Try Supabase first
+    try:
+        if SUPABASE_URL and SUPABASE_ANON_KEY:
+            response = rest_client.patch(
+                "chat_messages",
+                params={"id": f"eq.{message_id}"},
+                headers={'Prefer': 'return=representation'},
+                json=fields,
+            )
+            if response is not None and response.status_code == 200 and response.json():
+                return {"success": "Message updated successfully!", "data": response.json()[0]}
+    except Exception as error:
+        print(f"Supabase error: {error}. Using local storage instead.")
+        traceback.print_exc()
+
+    # Use local storage as fallback
+    if local_store.update_message(message_id, fields):
+        return {"success": "Message updated locally!", "data": local_store.get_message(message_id)}
+    return {"error": "Message not found"}
+
+
+def get_message(message_id, columns=None):
+    """One message by id, or None"""
+    select = ",".join(columns) if columns else "*"
+    # Try Supabase first
+    try:
+        if SUPABASE_URL and SUPABASE_ANON_KEY:
+            response = rest_client.get("chat_messages", params={"id": f"eq.{message_id}", "select": select})
+            if response is not None and response.status_code == 200 and response.json():
+                return response.json()[0]
+    except Exception as error:
+        print(f"Supabase error: {error}. Using local storage instead.")
+        traceback.print_exc()
+
+    # Use local storage as fallback
+    message = local_store.get_message(message_id)
+    if message and columns:
+        message = {column: message.get(column) for column in columns}
+    return message
+
+
+def _history_projection(message):
+    return {column: message.get(column) for column in HISTORY_COLUMNS}
+
+
+def _save_artifacts(artifacts):
+    """Store artifact rows, skipping hashes that already exist"""
+    if not artifacts:
+        return
+    # Try Supabase first
+    try:
+        if SUPABASE_URL and SUPABASE_ANON_KEY:
+            response = rest_client.post(
+                "chat_artifacts",
+                params={"on_conflict": "hash"},
+                headers={'Prefer': 'return=minimal,resolution=ignore-duplicates'},
+                json=artifacts,
+            )
+            if response is not None and response.status_code in (200, 201, 204):
+                return
+    except Exception as error:
+        print(f"Supabase error: {error}. Using local storage instead.")
+        traceback.print_exc()
+
+    # Use local storage as fallback
+    local_store.insert_artifacts(artifacts)
+
+
+def get_artifact(artifact_hash):
+    """Fetch the content behind an artifact reference, or None if unknown"""
+    # Try Supabase first
+    try:
+        if SUPABASE_URL and SUPABASE_ANON_KEY:
+            params = {"select": "content", "hash": f"eq.{artifact_hash}"}
+            response = rest_client.get("chat_artifacts", params=params)
+            if response is not None and response.status_code == 200:
+                rows = response.json()
+                if rows:
+                    return rows[0]["content"]
+    except Exception as error:
+        print(f"Supabase error: {error}. Using local storage instead.")
+        traceback.print_exc()
+
+    # Use local storage as fallback (also covers artifacts saved while Supabase was down)
+    artifact = local_store.get_artifact(artifact_hash)
+    return artifact["content"] if artifact else None
 
 def create_new_session():
     session_id = str(uuid.uuid4())
@@ -270,20 +411,12 @@ def create_new_session():
         "title": f"Session {datetime.now().strftime('%Y-%m-%d %H:%M')}",
         "time_created": datetime.now().isoformat()
     }
-    
+
     # Try Supabase first
     try:
         if SUPABASE_URL and SUPABASE_ANON_KEY:
-            url = f"{SUPABASE_URL}/rest/v1/chat_sessions"
-            headers = {
-                'Content-Type': 'application/json',
-                'Accept': 'application/json',
-                'Prefer': 'return=representation',
-                'apikey': SUPABASE_ANON_KEY,
-                'Authorization': f'Bearer {SUPABASE_ANON_KEY}'
-            }
-            response = requests.post(url, headers=headers, json=session_data)
-            if response.status_code == 201:
+            response = rest_client.post("chat_sessions", headers={'Prefer': 'return=representation'}, json=session_data)
+            if response is not None and response.status_code == 201:
                 try:
                     result = response.json()
                     if isinstance(result, list) and result:
@@ -296,8 +429,36 @@ def create_new_session():
         traceback.print_exc()
     
     # Use local storage as fallback
-    sessions = _read_local_sessions()
-    sessions.append(session_data)
-    _write_local_sessions(sessions)
+    local_store.insert_session(session_data)
     return [session_data]  # Return as list to match Supabase format
 
+
+def _write_messages_batch(messages):
+    """Persist a batch from the write-behind queue with one request or one transaction"""
+    messages, artifacts = split_artifacts(messages)
+    _save_artifacts(artifacts)
+
+    # Try Supabase first
+    try:
+        if SUPABASE_URL and SUPABASE_ANON_KEY:
+            # Upsert on id so a batch retried after a lost response is not duplicated
+            response = rest_client.post(
+                "chat_messages",
+                params={"on_conflict": "id"},
+                headers={'Prefer': 'return=minimal,resolution=merge-duplicates'},
+                json=messages,
+            )
+            if response is not None and response.status_code in (200, 201, 204):
+                return
+    except Exception as error:
+        print(f"Supabase error: {error}. Using local storage instead.")
+        traceback.print_exc()
+
+    # Use local storage as fallback
+    local_store.insert_messages(messages)
+
+
+# Queued messages survive restarts in this spool and are flushed on shutdown
+MESSAGE_SPOOL_FILE = os.path.join(LOCAL_STORAGE_DIR, "message_spool.jsonl")
+message_queue = MessageWriteQueue(MESSAGE_SPOOL_FILE, _write_messages_batch)
+atexit.register(message_queue.close)
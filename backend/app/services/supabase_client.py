@@ -0,0 +1,168 @@
+import os
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from app.services import metrics
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Numeric form of the breaker state for the metrics gauge
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitBreaker:
+    """
+    Skip a remote backend while it is failing.
+
+    After failure_threshold consecutive failures the breaker opens and every
+    call is refused. Once reset_timeout seconds have passed a single probe
+    request is let through (half-open); its outcome closes or re-opens it.
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._publish()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state
+
+    def allow_request(self):
+        """Return True if a call may go to the remote backend now"""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._state = HALF_OPEN
+                self._probe_in_flight = False
+                self._publish()
+            if self._state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            metrics.incr(f"{self.name}.short_circuited")
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._probe_in_flight = False
+            if self._state != CLOSED:
+                print(f"{self.name}: remote backend healthy again, closing circuit")
+                self._state = CLOSED
+                self._publish()
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            metrics.incr(f"{self.name}.failures")
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    print(f"{self.name}: opening circuit after {self._failures} failure(s)")
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._publish()
+
+    def _publish(self):
+        metrics.set_gauge(f"{self.name}.circuit_state", self._state)
+        metrics.set_gauge(f"{self.name}.circuit_state_value", STATE_VALUES[self._state])
+
+
+class SupabaseRestClient:
+    """
+    Shared, pooled client for the Supabase REST API.
+
+    A single requests.Session keeps connections alive across calls, every
+    request has a connect and read timeout, idempotent requests are retried
+    with backoff, and a CircuitBreaker skips Supabase while it is down so the
+    callers can go straight to local storage.
+    """
+
+    def __init__(self, base_url, api_key, connect_timeout=None, read_timeout=None,
+                 retries=None, pool_size=None, breaker=None):
+        self.base_url = base_url.rstrip("/") if base_url else base_url
+        self.api_key = api_key
+        self.timeout = (
+            connect_timeout if connect_timeout is not None else float(os.getenv("SUPABASE_CONNECT_TIMEOUT", "3")),
+            read_timeout if read_timeout is not None else float(os.getenv("SUPABASE_READ_TIMEOUT", "10")),
+        )
+        retries = retries if retries is not None else int(os.getenv("SUPABASE_RETRIES", "2"))
+        pool_size = pool_size if pool_size is not None else int(os.getenv("SUPABASE_POOL_SIZE", "10"))
+        self.breaker = breaker or CircuitBreaker(
+            "supabase",
+            failure_threshold=int(os.getenv("SUPABASE_BREAKER_THRESHOLD", "5")),
+            reset_timeout=float(os.getenv("SUPABASE_BREAKER_RESET", "30")),
+        )
+
+        # Connection errors are retried for every method; read errors and
+        # 5xx responses only for methods that are safe to repeat.
+        retry = Retry(
+            total=retries,
+            backoff_factor=0.2,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset(["GET", "HEAD"]),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            'Content-Type': 'application/json',
+            'Accept': 'application/json',
+            'apikey': api_key or "",
+            'Authorization': f'Bearer {api_key}',
+        })
+
+    @property
+    def enabled(self):
+        return bool(self.base_url and self.api_key)
+
+    def request(self, method, path, **kwargs):
+        """
+        Send a request to /rest/v1/<path>.
+
+        Returns None without touching the network when Supabase is not
+        configured or the circuit is open. Network errors are re-raised
+        after being counted against the breaker.
+        """
+        if not self.enabled or not self.breaker.allow_request():
+            return None
+
+        url = f"{self.base_url}/rest/v1/{path}"
+        kwargs.setdefault("timeout", self.timeout)
+        started = time.monotonic()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.RequestException:
+            self.breaker.record_failure()
+            raise
+        finally:
+            metrics.set_gauge("supabase.last_request_seconds", round(time.monotonic() - started, 4))
+
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def patch(self, path, **kwargs):
+        return self.request("PATCH", path, **kwargs)
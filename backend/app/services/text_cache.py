@@ -0,0 +1,124 @@
+import os
+import threading
+from app.services import metrics
+from app.services.audio_cache import AudioCache
+
+# Render common labels into the cache when the server starts
+TEXT_CACHE_WARMUP = os.getenv("TEXT_CACHE_WARMUP", "1").strip().lower() in ("1", "true", "yes")
+
+# Labels and sizes generated scenes use most; TEXT_CACHE_WARMUP_LABELS adds more (comma separated)
+COMMON_LABELS = [
+    "x", "y", "X", "Y", "f(x)", "0", "1", "2", "3", "4", "5", "+", "=",
+    "slope", "intercept", "Input", "Output", "Loss", "Error", "Summary",
+]
+COMMON_FONT_SIZES = [24, 26, 28, 30, 32, 36, 40, 48]
+
+
+# Prepended to every script Manim renders. Manim's text directory is the
+# shared cache itself, and it only checks that an SVG exists before reading
+# it, so each SVG Pango writes goes to a temporary name in the same
+# directory and is renamed into place once complete.
+PRELUDE = '''# --- shared text cache, inserted by the render pipeline ---
+import os as _text_cache_os
+import uuid as _text_cache_uuid
+import manimpango as _text_cache_pango
+
+def _text_cache_atomic(write):
+    def atomic_write(*args, **kwargs):
+        args = list(args)
+        if "file_name" in kwargs:
+            final = str(kwargs["file_name"])
+        else:
+            index = next(i for i, arg in enumerate(args) if str(arg).endswith(".svg"))
+            final = str(args[index])
+        directory, name = _text_cache_os.path.split(final)
+        staged = _text_cache_os.path.join(directory, f".{name}.{_text_cache_uuid.uuid4().hex[:8]}.tmp")
+        if "file_name" in kwargs:
+            kwargs["file_name"] = staged
+        else:
+            args[index] = staged
+        try:
+            write(*args, **kwargs)
+            _text_cache_os.replace(staged, final)
+        finally:
+            if _text_cache_os.path.exists(staged):
+                _text_cache_os.remove(staged)
+        return final
+    return atomic_write
+
+_text_cache_pango.text2svg = _text_cache_atomic(_text_cache_pango.text2svg)
+try:
+    _text_cache_pango.MarkupUtils.text2svg = staticmethod(_text_cache_atomic(_text_cache_pango.MarkupUtils.text2svg))
+except (AttributeError, TypeError):  # older manimpango; MarkupText then writes in place
+    pass
+# --- end of shared text cache ---
+
+'''
+
+
+class TextCache(AudioCache):
+    """
+    Text SVGs Manim has rendered, shared by every render job.
+
+    Manim names each SVG after a hash of the text and its settings (font,
+    size, weight, slant, line spacing) and reuses it whenever that file
+    exists, so the cache directory is Manim's text directory for every
+    render. The PRELUDE makes each new SVG appear through an atomic rename,
+    so concurrent renders in any process only ever see complete files.
+    LaTeX SVGs stay in each render's own directory, since Manim deletes
+    the scratch files next to them. Past the size cap the oldest entries
+    go first.
+    """
+
+    metric = "text_cache"
+    extension = ".svg"
+
+    def refresh(self):
+        """Count the SVGs renders wrote since the last call and evict past the cap; returns the entry count"""
+        with self._lock:
+            entries = [entry for entry in os.scandir(self.directory)
+                       if entry.is_file() and not entry.name.startswith(".")]
+            self._size = sum(entry.stat().st_size for entry in entries)
+            self._evict(keep=None)
+            metrics.set_gauge(f"{self.metric}.bytes", self._size)
+        return len(entries)
+
+
+def shared_text_script(script_file, output_file):
+    """Write a copy of script_file that writes its text SVGs into the shared cache atomically"""
+    with open(script_file, "r", encoding="utf-8") as f:
+        source = f.read()
+    with open(output_file, "w", encoding="utf-8") as f:
+        f.write(PRELUDE + source)
+    return output_file
+
+
+def warmup_source(labels=None, font_sizes=None):
+    """A Manim script whose scene only builds the warm-up labels"""
+    labels = list(labels or COMMON_LABELS) + [
+        label.strip() for label in os.getenv("TEXT_CACHE_WARMUP_LABELS", "").split(",") if label.strip()
+    ]
+    font_sizes = font_sizes or COMMON_FONT_SIZES
+    return PRELUDE + (
+        "from manim import *\n\n"
+        "class TextWarmup(Scene):\n"
+        "    def construct(self):\n"
+        f"        for label in {labels!r}:\n"
+        f"            for size in {list(font_sizes)!r}:\n"
+        "                Text(label, font_size=size)\n"
+    )
+
+
+_text_cache = None
+_text_cache_lock = threading.Lock()
+
+
+def get_text_cache():
+    """The process-wide text cache, created on first use"""
+    global _text_cache
+    with _text_cache_lock:
+        if _text_cache is None:
+            directory = os.getenv("TEXT_CACHE_DIR") or os.path.join(os.getcwd(), "backend", "local_db", "text_cache")
+            max_bytes = int(float(os.getenv("TEXT_CACHE_MAX_MB", "256")) * 1024 * 1024)
+            _text_cache = TextCache(directory, max_bytes)
+        return _text_cache
@@ -0,0 +1,153 @@
+import os
+import json
+import threading
+import time
+import traceback
+from app.services import metrics
+
+
+class MessageWriteQueue:
+    """
+    Write-behind queue for chat messages.
+
+    enqueue() appends the message to a JSONL spool file (fsynced) and returns
+    immediately; a background thread hands pending messages to write_batch
+    in groups, so a whole chat turn is persisted with one bulk request or one
+    local transaction. Messages stay in the spool until write_batch succeeds,
+    are replayed on the next start after a crash, and close() flushes
+    everything on shutdown.
+    """
+
+    def __init__(self, spool_path, write_batch, max_batch=50, flush_interval=0.25, retry_delay=5.0):
+        self.spool_path = spool_path
+        self.write_batch = write_batch
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.retry_delay = retry_delay
+        self._pending = []
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._idle = threading.Condition(self._lock)
+        self._writing = False
+        self._closed = False
+        self._thread = None
+
+        os.makedirs(os.path.dirname(os.path.abspath(spool_path)), exist_ok=True)
+        self._pending = self._read_spool()
+        if self._pending:
+            print(f"Replaying {len(self._pending)} unsaved message(s) from {spool_path}")
+            self._start()
+
+    def enqueue(self, message):
+        """Durably queue a message for writing; returns once it is in the spool"""
+        line = json.dumps(message) + "\n"
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Message queue is closed")
+            with open(self.spool_path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            self._pending.append(message)
+            metrics.set_gauge("write_behind.pending", len(self._pending))
+            self._wake.notify()
+        self._start()
+        return message
+
+    def pending(self, session_id):
+        """Queued messages of a session not yet written by write_batch"""
+        with self._lock:
+            return [dict(m) for m in self._pending if m.get("chat_session_id") == session_id]
+
+    def flush(self, timeout=None):
+        """Block until every queued message has been written; returns False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            self._wake.notify()
+            while self._pending or self._writing:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    def close(self, timeout=30.0):
+        """Flush-on-shutdown hook; anything still unsaved stays in the spool"""
+        flushed = self.flush(timeout)
+        with self._lock:
+            self._closed = True
+            self._wake.notify()
+        if not flushed:
+            print(f"Could not flush all queued messages; they remain in {self.spool_path}")
+        return flushed
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="message-write-behind", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._pending and not self._closed:
+                    self._wake.wait()
+                if not self._pending and self._closed:
+                    return
+                # Give the rest of the chat turn a moment to join this batch
+                if len(self._pending) < self.max_batch and not self._closed:
+                    self._wake.wait(self.flush_interval)
+                batch = self._pending[:self.max_batch]
+                self._writing = True
+
+            try:
+                self.write_batch(batch)
+                failed = False
+            except Exception as error:
+                print(f"Write-behind batch of {len(batch)} failed: {error}")
+                traceback.print_exc()
+                failed = True
+
+            with self._lock:
+                self._writing = False
+                if not failed:
+                    written = {id(m) for m in batch}
+                    self._pending = [m for m in self._pending if id(m) not in written]
+                    self._rewrite_spool()
+                    metrics.incr("write_behind.batches")
+                    metrics.incr("write_behind.messages", len(batch))
+                metrics.set_gauge("write_behind.pending", len(self._pending))
+                self._idle.notify_all()
+                if failed:
+                    if self._closed:
+                        return
+                    self._wake.wait(self.retry_delay)
+
+    def _rewrite_spool(self):
+        """Replace the spool with whatever is still pending (called with the lock held)"""
+        if not self._pending:
+            open(self.spool_path, "w").close()
+            return
+        tmp_path = self.spool_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for message in self._pending:
+                f.write(json.dumps(message) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.spool_path)
+
+    def _read_spool(self):
+        if not os.path.exists(self.spool_path):
+            return []
+        messages = []
+        with open(self.spool_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    messages.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A torn final line from a crash mid-write; nothing to recover
+                    print(f"Skipping unreadable spool line in {self.spool_path}")
+        return messages
@@ -0,0 +1,86 @@
+import json
+import os
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+
+# Every synthetic session gets this many messages (alternating user / ai)
+MESSAGES_PER_SESSION = 20
+BASE_TIME = datetime(2025, 4, 22, 13, 0, 0)
+
+
+def read_corpus(name):
+    """Read a text file from the checked-in benchmark corpus"""
+    with open(os.path.join(CORPUS_DIR, name), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def load_chunks():
+    """Load the nine scene chunks in plan order"""
+    chunk_dir = os.path.join(CORPUS_DIR, "chunks")
+    names = sorted(n for n in os.listdir(chunk_dir) if n.endswith(".txt"))
+    return [read_corpus(os.path.join("chunks", n)) for n in names]
+
+
+def build_message_corpus(total_messages):
+    """
+    Deterministically expand messages_seed.json into sessions and messages.
+
+    The same total always produces the same ids, texts and timestamps, so
+    numbers from different runs are comparable.
+    """
+    seed = json.loads(read_corpus("messages_seed.json"))
+    namespace = uuid.UUID("6f1c2b0e-5d7a-4c39-9a51-2b1e0c6d7f80")
+    sessions = []
+    messages = []
+    session_count = max(1, total_messages // MESSAGES_PER_SESSION)
+
+    for s in range(session_count):
+        session_id = str(uuid.uuid5(namespace, f"session-{s}"))
+        created = BASE_TIME + timedelta(minutes=s)
+        sessions.append({
+            "id": session_id,
+            "title": seed["session_titles"][s % len(seed["session_titles"])],
+            "time_created": created.isoformat(),
+        })
+
+    for i in range(total_messages):
+        session = sessions[(i // MESSAGES_PER_SESSION) % session_count]
+        is_ai = i % 2 == 1
+        pool = seed["ai_messages"] if is_ai else seed["user_messages"]
+        messages.append({
+            "id": str(uuid.uuid5(namespace, f"message-{i}")),
+            "sender": "ai" if is_ai else "user",
+            "message": pool[i % len(pool)],
+            "chat_session_id": session["id"],
+            "image_url": None,
+            "manim_code": seed["manim_code"] if is_ai else None,
+            "image_summary": None,
+            "video_url": seed["video_url"] if is_ai else None,
+            "time_created": (BASE_TIME + timedelta(seconds=i)).isoformat(),
+        })
+
+    return sessions, messages
+
+
+@pytest.fixture
+def scene_chunks():
+    return load_chunks()
+
+
+@pytest.fixture
+def narration_text():
+    return read_corpus("narration.txt")
+
+
+@pytest.fixture
+def combined_script(tmp_path):
+    """The combined corpus script written to disk, as the chat route does"""
+    path = tmp_path / "manim.py"
+    path.write_text(read_corpus("combined_script.txt"), encoding="utf-8")
+    return str(path)
@@ -0,0 +1,13 @@
+from app.controllers.combiner import CombinedCodeGenerator
+
+
+def test_generate_combined_code_nine_chunks(benchmark, scene_chunks):
+    assert len(scene_chunks) == 9
+    combiner = CombinedCodeGenerator(scene_chunks)
+
+    combined = benchmark(combiner.generate_combined_code)
+
+    assert "from manim import *" in combined
+    # Every chunk keeps its scene under a unique name
+    assert combiner.scene_names == [f"LSTMScene{i:02d}" for i in range(1, 10)]
+    assert all(f"class {name}(Scene)" in combined for name in combiner.scene_names)
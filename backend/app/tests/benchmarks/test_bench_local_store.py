@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+from app.services import supabase
+from app.services.history_cache import HistoryCache
+from app.services.local_store import LocalStore
+from .conftest import build_message_corpus
+
+STORE_SIZES = [1_000, 10_000, 100_000]
+
+
+@pytest.fixture(params=STORE_SIZES, ids=lambda n: f"{n}_messages")
+def local_store(request, tmp_path, monkeypatch):
+    """Point the local fallback at a store migrated from the corpus and disable Supabase"""
+    sessions, messages = build_message_corpus(request.param)
+
+    sessions_file = tmp_path / "chat_sessions.json"
+    messages_file = tmp_path / "chat_messages.json"
+    sessions_file.write_text(json.dumps(sessions))
+    messages_file.write_text(json.dumps(messages))
+
+    monkeypatch.setattr(supabase, "SUPABASE_URL", None)
+    store = LocalStore(str(tmp_path / "local.db"), str(sessions_file), str(messages_file))
+    monkeypatch.setattr(supabase, "local_store", store)
+    monkeypatch.setattr(supabase, "history_cache", HistoryCache())
+    return sessions, messages
+
+
+def test_get_chat_histories(benchmark, local_store):
+    sessions, _ = local_store
+    session_id = sessions[len(sessions) // 2]["id"]
+
+    history = benchmark(supabase.get_chat_histories, session_id)
+
+    assert history
+    assert all(msg["chat_session_id"] == session_id for msg in history)
+
+
+def test_get_all_chat_sessions(benchmark, local_store):
+    sessions, _ = local_store
+
+    result = benchmark(supabase.get_all_chat_sessions)
+
+    assert len(result) == len(sessions)
+
+
+def test_post_message(benchmark, local_store):
+    sessions, _ = local_store
+    session_id = sessions[0]["id"]
+
+    # Every call grows the store, so a handful of rounds is representative
+    result = benchmark.pedantic(supabase.post_message,
+                                args=("user", "How does the learning rate change the result?", session_id),
+                                rounds=5, iterations=1)
+
+    assert "success" in result
+
+
+def test_get_chat_sessions_page(benchmark, local_store):
+    sessions, _ = local_store
+
+    page, next_cursor = benchmark(supabase.get_chat_sessions_page, 50)
+
+    assert len(page) == min(50, len(sessions))
+
+
+def test_get_chat_histories_page(benchmark, local_store):
+    sessions, _ = local_store
+    session_id = sessions[len(sessions) // 2]["id"]
+
+    page, _ = benchmark(supabase.get_chat_histories_page, session_id, 6)
+
+    assert len(page) == 6
@@ -0,0 +1,32 @@
+from app.controllers.video_maker import VideoMaker
+
+
+def test_create_slides_from_text(benchmark, combined_script, narration_text):
+    maker = VideoMaker(script_file=combined_script, scene_name="LSTMScene", preview=False)
+
+    slides = benchmark(maker._create_slides_from_text, narration_text)
+
+    assert slides[0] == "Mathematical Visualization"
+    assert len(slides) >= 4
+
+
+def test_create_slide_image_body(benchmark, tmp_path, combined_script, narration_text):
+    maker = VideoMaker(script_file=combined_script, scene_name="LSTMScene", preview=False)
+    slide_text = maker._create_slides_from_text(narration_text)[1]
+    output_path = str(tmp_path / "slide_001.png")
+
+    # Full HD slides are slow to draw, so keep the round count small
+    benchmark.pedantic(maker._create_slide_image, args=(slide_text, output_path, False),
+                       rounds=3, iterations=1)
+
+    assert (tmp_path / "slide_001.png").exists()
+
+
+def test_create_slide_image_title(benchmark, tmp_path, combined_script):
+    maker = VideoMaker(script_file=combined_script, scene_name="LSTMScene", preview=False)
+    output_path = str(tmp_path / "slide_000.png")
+
+    benchmark.pedantic(maker._create_slide_image, args=("Mathematical Visualization", output_path, True),
+                       rounds=3, iterations=1)
+
+    assert (tmp_path / "slide_000.png").exists()
@@ -0,0 +1,10 @@
+from app.controllers.voiceover_maker import VoiceOverMaker
+
+
+def test_set_text_from_script(benchmark, combined_script):
+    maker = VoiceOverMaker()
+
+    found = benchmark(maker.set_text_from_script, combined_script)
+
+    assert found
+    assert maker.text.startswith("Linear regression")
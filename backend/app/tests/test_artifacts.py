@@ -0,0 +1,47 @@
+import pytest
+
+from app import create_app
+from app.services import supabase
+from app.services.artifacts import is_ref, ref_hash
+from app.services.history_cache import HistoryCache
+from app.services.local_store import LocalStore
+
+MANIM_CODE = "from manim import *\n\nclass LSTMScene(Scene):\n" + "    def construct(self):\n        self.wait(3)\n" * 40
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = LocalStore(str(tmp_path / "local.db"))
+    monkeypatch.setattr(supabase, "SUPABASE_URL", None)
+    monkeypatch.setattr(supabase, "local_store", store)
+    monkeypatch.setattr(supabase, "history_cache", HistoryCache())
+    return store
+
+
+def test_manim_code_is_stored_out_of_row(store):
+    result = supabase.post_message("ai", "Here is your video", "s1", manim_code=MANIM_CODE)
+
+    stored = result["data"]["manim_code"]
+    assert is_ref(stored)
+    assert supabase.get_artifact(ref_hash(stored)) == MANIM_CODE
+
+    # Identical code is stored once
+    supabase.post_message("ai", "Again", "s1", manim_code=MANIM_CODE)
+    count = store._connect().execute("SELECT COUNT(*) FROM chat_artifacts").fetchone()[0]
+    assert count == 1
+
+
+def test_history_endpoint_projects_columns(store):
+    supabase.post_message("ai", "Here is your video", "s1", manim_code=MANIM_CODE)
+    client = create_app().test_client()
+
+    default = client.get("/api/get_chat_histories?chat_session_id=s1").get_json()
+    assert "manim_code" not in default[0]
+    assert default[0]["message"] == "Here is your video"
+
+    full = client.get("/api/get_chat_histories?chat_session_id=s1&fields=id,manim_code").get_json()
+    artifact = client.get(f"/api/artifacts/{ref_hash(full[0]['manim_code'])}")
+    assert artifact.status_code == 200
+    assert artifact.get_data(as_text=True) == MANIM_CODE
+
+    assert client.get("/api/get_chat_histories?chat_session_id=s1&fields=password").status_code == 400
@@ -0,0 +1,54 @@
+from app.controllers.assembler import Assembly
+
+
+def test_slides_and_narration_are_encoded_in_one_graph(tmp_path):
+    slides = [str(tmp_path / f"slide_{i}.png") for i in range(3)]
+    assembly = Assembly(str(tmp_path / "out.mp4"), slides=slides, slide_duration=4.0, narration=[str(tmp_path / "voice.wav")])
+
+    cmd = assembly.command(video_duration=12.0, narration_duration=15.5)
+    graph = cmd[cmd.index("-filter_complex") + 1]
+
+    assert cmd.count("-i") == 4
+    assert "concat=n=3:v=1:a=0[vcat]" in graph
+    # Narration is longer, so the last slide is held instead of cutting the audio
+    assert "[vcat]tpad=stop_mode=clone:stop_duration=3.500[vpad]" in graph
+    assert "[3:a]apad[aout]" in graph
+    assert cmd[cmd.index("[aout]"):][3:5] == ["-t", "15.500"]
+    assert cmd.count("-movflags") == 1
+    assert cmd[-1] == str(tmp_path / "out_poster.jpg")
+
+
+def test_scene_clips_and_tracks_are_concatenated(tmp_path):
+    assembly = Assembly(
+        str(tmp_path / "out.mp4"),
+        clips=["scene1.mp4", "scene2.mp4"],
+        narration=["scene1.mp3", "scene2.mp3"],
+    )
+
+    cmd = assembly.command(video_duration=30.0, narration_duration=20.0)
+    graph = cmd[cmd.index("-filter_complex") + 1]
+
+    assert "[v0][v1]concat=n=2:v=1:a=0[vcat]" in graph
+    assert "[2:a][3:a]concat=n=2:v=0:a=1,apad[aout]" in graph
+    assert "tpad" not in graph
+    assert cmd[cmd.index("-t") + 1] == "30.000"
+
+
+def test_elided_holds_are_expanded_instead_of_copied(tmp_path):
+    assembly = Assembly(
+        str(tmp_path / "out.mp4"),
+        clips=["scene.mp4"],
+        narration=["voice.mp3"],
+        holds=[(2.0, 14.9), (5.5, 2.9)],
+    )
+
+    cmd = assembly.command(video_duration=27.8, narration_duration=20.0)
+    graph = cmd[cmd.index("-filter_complex") + 1]
+
+    assert "copy" not in cmd
+    assert "[v0]split=3[hs0][hs1][hs2]" in graph
+    assert "[hs0]trim=end=2.000000,setpts=PTS-STARTPTS,tpad=stop_mode=clone:stop_duration=14.900[h0]" in graph
+    assert "[hs1]trim=start=2.000000:end=5.500000,setpts=PTS-STARTPTS,tpad=stop_mode=clone:stop_duration=2.900[h1]" in graph
+    assert "[hs2]trim=start=5.500000,setpts=PTS-STARTPTS[h2]" in graph
+    assert "[h0][h1][h2]concat=n=3:v=1:a=0[vheld]" in graph
+    assert "[vheld]split=2[vout][vposter]" in graph
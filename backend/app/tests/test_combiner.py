@@ -0,0 +1,87 @@
+import ast
+
+from app.controllers.combiner import CombinedCodeGenerator, read_manifest
+
+CHUNK = '''```python
+from manim import *
+import random
+
+class LSTMScene(Scene):
+    def construct(self):
+        axes = Axes(x_range=(-3, 3), y_range=[-2, 6, 1])
+        dot = Dot(axes.c2p(1, 1))
+        line = Line(start=(-2, 0), end=(2, 1))
+        for i in range(-1.5, 2, 1):
+            self.add(Dot(point=(i, 0)))
+        self.wait(1)
+```
+This code draws a line.'''
+
+TREE_CHUNK = '''Here is the code for the scene:
+class MainScene(Scene):
+    def construct(self):
+        title = Text("Decision Trees")
+        tree = Tree({"root": ["left", "right"]})
+        self.play(Create(tree))
+'''
+
+
+def test_each_chunk_becomes_a_uniquely_named_scene(tmp_path):
+    combiner = CombinedCodeGenerator([CHUNK, TREE_CHUNK])
+    path = combiner.save_to_file(folder=str(tmp_path))
+    source = open(path).read()
+
+    tree = ast.parse(source)
+    scenes = [node.name for node in tree.body if isinstance(node, ast.ClassDef)]
+    assert scenes == ["LSTMScene01", "LSTMScene02"]
+    assert read_manifest(path) == scenes
+    assert "import random" in source
+    assert "This code" not in source and "Here is" not in source
+
+
+def test_fixups_are_applied_to_the_tree():
+    source = CombinedCodeGenerator([CHUNK]).generate_combined_code()
+
+    assert "class LSTMScene(Scene)" in source
+    assert "Line(start=np.array([-2, 0, 0]), end=np.array([2, 1, 0]))" in source
+    # Call arguments and *_range tuples are not points
+    assert "axes.c2p(1, 1)" in source
+    assert "x_range=(-3, 3)" in source
+    assert "np.arange(-1.5, 2, 1)" in source
+
+
+def test_scenes_using_forbidden_classes_get_a_stand_in():
+    source = CombinedCodeGenerator([TREE_CHUNK]).generate_combined_code()
+
+    assert "Tree(" not in source
+    assert "Text('Decision Trees').to_edge(DOWN)" in source
+    assert read_manifest("missing.py") == []
+
+
+def _helper_chunk(radius, caption):
+    return f'''from manim import *
+
+RADIUS = {radius}
+
+def make_dot():
+    return Dot(radius=RADIUS)
+
+class LSTMScene(Scene):
+    def construct(self):
+        self.add(make_dot(), Text({caption!r}))
+'''
+
+
+def test_conflicting_helpers_are_renamed_per_scene():
+    source = CombinedCodeGenerator([_helper_chunk(0.1, "a"), _helper_chunk(0.1, "b"), _helper_chunk(0.5, "c")]).generate_combined_code()
+    tree = ast.parse(source)
+    top = [node.name if hasattr(node, "name") else ast.unparse(node.targets) for node in tree.body
+           if isinstance(node, (ast.FunctionDef, ast.ClassDef, ast.Assign))]
+
+    # Identical helpers are kept once; the differing RADIUS and the make_dot that reads it are renamed
+    assert top == ["RADIUS", "make_dot", "LSTMScene03_RADIUS", "LSTMScene03_make_dot",
+                   "LSTMScene01", "LSTMScene02", "LSTMScene03", "SCENE_MANIFEST"]
+    assert "LSTMScene03_RADIUS = 0.5" in source
+    assert "Dot(radius=LSTMScene03_RADIUS)" in source
+    third = next(node for node in tree.body if getattr(node, "name", None) == "LSTMScene03")
+    assert "LSTMScene03_make_dot()" in ast.unparse(third)
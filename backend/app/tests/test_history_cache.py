@@ -0,0 +1,80 @@
+import threading
+
+from app.services import supabase
+from app.services.history_cache import HistoryCache
+from app.services.local_store import LocalStore
+from app.services.write_behind import MessageWriteQueue
+from app.services.pagination import decode_cursor
+
+
+def _message(i, session_id="s1"):
+    return {"id": f"m{i:02d}", "chat_session_id": session_id, "sender": "user",
+            "message": str(i), "time_created": f"2025-04-22T13:00:{i:02d}"}
+
+
+def test_hit_after_fill_and_append():
+    cache = HistoryCache(tail_size=5)
+    assert cache.get_page("s1", 3) is None
+
+    cache.fill("s1", [_message(i) for i in range(3)], has_older=False)
+    cache.append(_message(3))
+
+    page, next_cursor = cache.get_page("s1", 3)
+    assert [m["id"] for m in page] == ["m01", "m02", "m03"]
+    assert decode_cursor(next_cursor) == ("2025-04-22T13:00:01", "m01")
+
+    page, next_cursor = cache.get_page("s1", 10)
+    assert len(page) == 4 and next_cursor is None
+
+
+def test_short_tail_with_older_messages_is_a_miss():
+    cache = HistoryCache(tail_size=5)
+    cache.fill("s1", [_message(i) for i in range(4, 10)], has_older=True)
+
+    # Only the newest five are kept, and the cache knows older ones exist
+    assert cache.get_page("s1", 6) is None
+    page, next_cursor = cache.get_page("s1", 5)
+    assert [m["id"] for m in page] == ["m05", "m06", "m07", "m08", "m09"]
+    assert next_cursor is not None
+
+
+def test_least_recently_used_session_is_evicted():
+    cache = HistoryCache(max_sessions=2)
+    cache.fill("a", [_message(1, "a")], has_older=False)
+    cache.fill("b", [_message(1, "b")], has_older=False)
+    cache.get_page("a", 1)
+    cache.fill("c", [_message(1, "c")], has_older=False)
+
+    assert cache.get_page("b", 1) is None
+    assert cache.get_page("a", 1) is not None
+    assert cache.get_page("c", 1) is not None
+
+
+def test_fill_loaded_before_a_write_is_dropped():
+    cache = HistoryCache(tail_size=5)
+    stamp = cache.stamp("s1")
+    # Written while the page was loading; the session is not cached yet
+    cache.append(_message(3))
+    cache.fill("s1", [_message(i) for i in range(3)], has_older=False, stamp=stamp)
+
+    assert cache.get_page("s1", 3) is None
+
+
+def test_deferred_message_is_read_before_it_is_written(tmp_path, monkeypatch):
+    release = threading.Event()
+    store = LocalStore(str(tmp_path / "local.db"))
+    store.insert_message(_message(1))
+    queue = MessageWriteQueue(str(tmp_path / "spool.jsonl"), lambda batch: release.wait(5) and store.insert_messages(batch))
+    monkeypatch.setattr(supabase, "SUPABASE_URL", None)
+    monkeypatch.setattr(supabase, "local_store", store)
+    monkeypatch.setattr(supabase, "history_cache", HistoryCache())
+    monkeypatch.setattr(supabase, "message_queue", queue)
+
+    sent = supabase.post_message("user", "hello", "s1", defer=True)["data"]
+
+    # Cache miss, and the queue has not written the message yet
+    for _ in range(2):
+        page, next_cursor = supabase.get_chat_histories_page("s1")
+        assert [m["id"] for m in page] == ["m01", sent["id"]] and next_cursor is None
+    release.set()
+    assert queue.flush(timeout=5)
@@ -0,0 +1,22 @@
+from app.controllers import hls_packager
+
+
+def test_ladder_never_upscales():
+    ladder = hls_packager.parse_ladder("360:800, 1080:5000,720:2800")
+    assert ladder == [(1080, 5000), (720, 2800), (360, 800)]
+    assert hls_packager.ladder_for(720, ladder) == [(720, 2800), (360, 800)]
+    assert hls_packager.ladder_for(240, ladder) == [(240, 800)]
+
+
+def test_command_writes_one_variant_per_rung(tmp_path):
+    cmd = hls_packager.build_command("in.mp4", str(tmp_path), [(720, 2800), (360, 800)], has_audio=True)
+
+    assert cmd[cmd.index("-filter_complex") + 1] == "[0:v]split=2[s0][s1];[s0]scale=-2:720[v0];[s1]scale=-2:360[v1]"
+    assert cmd[cmd.index("-var_stream_map") + 1] == "v:0,a:0 v:1,a:1"
+    assert cmd[cmd.index("-b:v:1") + 1] == "800k"
+    assert cmd[cmd.index("-master_pl_name") + 1] == "master.m3u8"
+    assert cmd[-1] == str(tmp_path / "v%v" / "index.m3u8")
+
+    silent = hls_packager.build_command("in.mp4", str(tmp_path), [(720, 2800)], has_audio=False)
+    assert "0:a:0" not in silent
+    assert silent[silent.index("-var_stream_map") + 1] == "v:0"
@@ -0,0 +1,85 @@
+import json
+import sqlite3
+import threading
+
+from app.services import supabase
+from app.services.local_store import LocalStore
+
+
+def _message(i, session_id="s1"):
+    return {
+        "id": f"m{i}",
+        "sender": "user" if i % 2 == 0 else "ai",
+        "message": f"message {i}",
+        "chat_session_id": session_id,
+        "time_created": f"2025-04-22T13:{i // 60:02d}:{i % 60:02d}",
+    }
+
+
+def test_migrates_json_files_once(tmp_path):
+    sessions_file = tmp_path / "chat_sessions.json"
+    messages_file = tmp_path / "chat_messages.json"
+    sessions_file.write_text(json.dumps([{"id": "s1", "title": "Old", "time_created": "2025-04-22T13:00:00"}]))
+    messages_file.write_text(json.dumps([_message(1), _message(0)]))
+
+    db_path = str(tmp_path / "local.db")
+    store = LocalStore(db_path, str(sessions_file), str(messages_file))
+    assert store.get_session("s1")["title"] == "Old"
+    assert [m["id"] for m in store.get_messages("s1")] == ["m0", "m1"]
+
+    # A second start must not import the JSON files again
+    messages_file.write_text(json.dumps([_message(2)]))
+    store = LocalStore(db_path, str(sessions_file), str(messages_file))
+    assert [m["id"] for m in store.get_messages("s1")] == ["m0", "m1"]
+
+
+def test_concurrent_inserts_are_not_lost(tmp_path):
+    store = LocalStore(str(tmp_path / "local.db"))
+
+    def writer(offset):
+        for i in range(offset, offset + 20):
+            store.insert_message(_message(i))
+
+    threads = [threading.Thread(target=writer, args=(n * 20,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(store.get_messages("s1")) == 80
+
+
+def test_update_message_changes_only_known_columns(tmp_path):
+    store = LocalStore(str(tmp_path / "local.db"))
+    store.insert_message(_message(1))
+
+    assert store.update_message("m1", {"video_url": "hd.mp4", "not_a_column": "x"}) == 1
+    assert store.get_message("m1")["video_url"] == "hd.mp4"
+    assert store.update_message("missing", {"video_url": "hd.mp4"}) == 0
+
+
+def test_create_new_session_falls_back_to_local_store(tmp_path, monkeypatch):
+    store = LocalStore(str(tmp_path / "local.db"))
+    monkeypatch.setattr(supabase, "SUPABASE_URL", None)
+    monkeypatch.setattr(supabase, "local_store", store)
+
+    [session] = supabase.create_new_session()
+    assert store.get_session(session["id"])["title"] == session["title"]
+
+
+def test_keyset_indexes_replace_older_ones(tmp_path):
+    db_path = str(tmp_path / "local.db")
+    with sqlite3.connect(db_path) as conn:
+        # Schema as first shipped, before pagination keyed on (time_created, id)
+        conn.executescript("""
+            CREATE TABLE chat_sessions (id TEXT PRIMARY KEY, title TEXT, time_created TEXT);
+            CREATE INDEX idx_chat_sessions_time_created ON chat_sessions (time_created);
+        """)
+
+    LocalStore(db_path)
+
+    with sqlite3.connect(db_path) as conn:
+        indexes = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        columns = [row[2] for row in conn.execute("PRAGMA index_info(idx_chat_sessions_time_id)")]
+    assert "idx_chat_sessions_time_created" not in indexes
+    assert columns == ["time_created", "id"]
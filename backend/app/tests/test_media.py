@@ -0,0 +1,101 @@
+import hashlib
+import os
+
+import pytest
+
+from app import create_app
+from app.routes import upload_routes
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "local_storage").mkdir()
+    return create_app().test_client()
+
+
+def test_content_addressed_media_is_immutable(client, tmp_path):
+    payload = os.urandom(4096)
+    digest = hashlib.sha256(payload).hexdigest()
+    (tmp_path / "local_storage" / f"{digest}.mp4").write_bytes(payload)
+
+    response = client.get(f"/api/media/{digest}.mp4")
+    assert response.status_code == 200
+    assert response.headers["ETag"] == f'"{digest}"'
+    assert response.headers["Accept-Ranges"] == "bytes"
+    assert "immutable" in response.headers["Cache-Control"]
+    assert "max-age=31536000" in response.headers["Cache-Control"]
+
+    partial = client.get(f"/api/media/{digest}.mp4", headers={"Range": "bytes=100-199"})
+    assert partial.status_code == 206
+    assert partial.headers["Content-Range"] == "bytes 100-199/4096"
+    assert partial.data == payload[100:200]
+
+    cached = client.get(f"/api/media/{digest}.mp4", headers={"If-None-Match": f'"{digest}"'})
+    assert cached.status_code == 304
+    assert cached.data == b""
+
+
+def test_other_media_is_revalidated(client, tmp_path):
+    (tmp_path / "local_storage" / "old_upload.png").write_bytes(b"png" * 100)
+
+    response = client.get("/api/media/old_upload.png")
+    assert response.status_code == 200
+    assert "no-cache" in response.headers["Cache-Control"]
+
+    cached = client.get("/api/media/old_upload.png", headers={
+        "If-Modified-Since": response.headers["Last-Modified"],
+    })
+    assert cached.status_code == 304
+
+
+def test_media_outside_storage_is_not_served(client):
+    assert client.get("/api/media/..%2Fsecret.txt").status_code == 404
+    assert client.get("/api/media/missing.mp4").status_code == 404
+
+
+def test_serve_local_file_supports_ranges(client, tmp_path):
+    (tmp_path / "clip.mp4").write_bytes(b"0123456789")
+
+    response = client.get("/api/serve_local_file?path=clip.mp4", headers={"Range": "bytes=2-4"})
+    assert response.status_code == 206
+    assert response.data == b"234"
+
+
+def test_x_accel_offload_returns_internal_redirect(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_routes, "MEDIA_OFFLOAD", "x-accel")
+    monkeypatch.setattr(upload_routes, "MEDIA_OFFLOAD_ROOT", str(tmp_path))
+    digest = "ab" * 32
+    (tmp_path / "local_storage" / f"{digest}.mp4").write_bytes(b"video")
+
+    response = client.get(f"/api/media/{digest}.mp4")
+    assert response.status_code == 200
+    assert response.data == b""
+    assert response.headers["X-Accel-Redirect"] == f"/protected-media/local_storage/{digest}.mp4"
+    assert response.headers["Content-Type"] == "video/mp4"
+    assert "immutable" in response.headers["Cache-Control"]
+
+
+def test_x_sendfile_offload(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_routes, "MEDIA_OFFLOAD", "x-sendfile")
+    (tmp_path / "local_storage" / "poster.png").write_bytes(b"png")
+
+    response = client.get("/api/media/poster.png")
+    assert response.data == b""
+    assert response.headers["X-Sendfile"] == str(tmp_path / "local_storage" / "poster.png")
+    assert "no-cache" in response.headers["Cache-Control"]
+
+    # Served directly, the same file gets the same caching
+    monkeypatch.setattr(upload_routes, "MEDIA_OFFLOAD", "")
+    assert client.get("/api/media/poster.png").headers["Cache-Control"] == response.headers["Cache-Control"]
+
+
+def test_hls_tree_is_served_as_immutable(client, tmp_path):
+    segment_dir = tmp_path / "local_storage" / "hls" / ("d" * 64) / "v0"
+    segment_dir.mkdir(parents=True)
+    (segment_dir / "seg_000.ts").write_bytes(b"ts")
+
+    response = client.get("/api/media/hls/" + "d" * 64 + "/v0/seg_000.ts")
+    assert response.status_code == 200
+    assert response.headers["Content-Type"] == "video/mp2t"
+    assert "immutable" in response.headers["Cache-Control"]
@@ -0,0 +1,59 @@
+import subprocess
+
+from app.controllers import media_finish
+from app.controllers.voiceover_maker import VoiceOverMaker
+
+FFMPEG_STDERR = (
+    b"Input #0, mov,mp4,m4a,3gp,3g2,mj2, from 'scene.mp4':\n"
+    b"  Duration: 00:00:14.00, start: 0.000000, bitrate: 512 kb/s\n"
+    b"frame=  180 fps=0.0 q=-1.0 size=     256kB time=00:00:06.00 bitrate= 349.5kbits/s\n"
+    b"frame=  378 fps=0.0 q=-1.0 Lsize=     610kB time=00:00:12.58 bitrate= 397.2kbits/s\n"
+)
+
+
+def test_parse_duration_uses_last_progress_line():
+    assert media_finish.parse_duration(FFMPEG_STDERR) == 12.58
+    assert media_finish.parse_duration(b"no progress here") is None
+
+
+def test_voiceover_mux_is_faststart_with_poster(tmp_path, monkeypatch):
+    video = tmp_path / "scene.mp4"
+    audio = tmp_path / "voice.mp3"
+    video.write_bytes(b"video")
+    audio.write_bytes(b"audio")
+    calls = []
+
+    def fake_run(cmd, **kwargs):
+        if cmd[0] == "ffprobe":
+            duration = "14.0" if cmd[-1] == str(video) else "9.5"
+            return subprocess.CompletedProcess(cmd, 0, duration + "\n", "")
+        calls.append(cmd)
+        open(cmd[-1], "wb").write(b"jpeg")  # the poster output
+        open(str(tmp_path / "final.mp4"), "wb").write(b"muxed")
+        return subprocess.CompletedProcess(cmd, 0, b"", FFMPEG_STDERR)
+
+    monkeypatch.setattr(subprocess, "run", fake_run)
+    maker = VoiceOverMaker("narration")
+    maker.output_path = str(audio)
+
+    output = maker.combine_with_video(str(video), str(tmp_path / "final.mp4"))
+
+    # A single ffmpeg run; the narration fits, so the video is stream-copied
+    assert len(calls) == 1
+    cmd = calls[0]
+    assert output == str(tmp_path / "final.mp4")
+    assert cmd[cmd.index("-c:v") + 1] == "copy"
+    assert cmd[cmd.index("-t") + 1] == "14.000"
+    # Fast-start applies to the video output, which comes before the poster
+    assert cmd.index("+faststart") < cmd.index(output) < cmd.index(str(tmp_path / "final_poster.jpg"))
+    assert maker.poster_path == str(tmp_path / "final_poster.jpg")
+    assert maker.duration == 12.58
+
+
+def test_finish_video_keeps_original_on_failure(tmp_path, monkeypatch):
+    video = tmp_path / "scene.mp4"
+    video.write_bytes(b"video")
+    monkeypatch.setattr(subprocess, "run", lambda cmd, **kwargs: subprocess.CompletedProcess(cmd, 1, b"", b"boom"))
+
+    assert media_finish.finish_video(str(video)) == (str(video), None, None)
+    assert video.read_bytes() == b"video"
@@ -0,0 +1,48 @@
+import pytest
+
+from app import create_app
+from app.services import supabase
+from app.services.history_cache import HistoryCache
+from app.services.local_store import LocalStore
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    store = LocalStore(str(tmp_path / "local.db"))
+    # Same timestamp for several rows so the id tiebreak is exercised
+    for i in range(7):
+        store.insert_session({"id": f"s{i}", "title": f"Session {i}", "time_created": f"2025-04-22T13:00:0{i // 2}"})
+    for i in range(7):
+        store.insert_message({"id": f"m{i}", "sender": "user", "message": str(i),
+                              "chat_session_id": "s0", "time_created": f"2025-04-22T13:00:0{i // 2}"})
+    monkeypatch.setattr(supabase, "SUPABASE_URL", None)
+    monkeypatch.setattr(supabase, "local_store", store)
+    monkeypatch.setattr(supabase, "history_cache", HistoryCache())
+    return create_app().test_client()
+
+
+def _walk(client, url):
+    pages = []
+    cursor = None
+    while True:
+        response = client.get(url + (f"&cursor={cursor}" if cursor else ""))
+        assert response.status_code == 200
+        pages.append([row["id"] for row in response.get_json()])
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return pages
+
+
+def test_sessions_are_paged_newest_first(client):
+    pages = _walk(client, "/api/get_all_chat_sessions?limit=3")
+    assert pages == [["s6", "s5", "s4"], ["s3", "s2", "s1"], ["s0"]]
+
+
+def test_histories_page_backwards_but_read_oldest_first(client):
+    pages = _walk(client, "/api/get_chat_histories?chat_session_id=s0&limit=3")
+    assert pages == [["m4", "m5", "m6"], ["m1", "m2", "m3"], ["m0"]]
+
+
+def test_bad_cursor_is_rejected(client):
+    response = client.get("/api/get_all_chat_sessions?cursor=not-a-cursor")
+    assert response.status_code == 400
@@ -0,0 +1,69 @@
+import json
+import os
+import subprocess
+
+import pytest
+
+from app.controllers import render_cost, video_maker
+from app.controllers.video_maker import VideoMaker
+from app.services import text_cache
+from app.services.text_cache import TextCache
+
+SCENE = """from manim import *
+
+class LSTMScene(Scene):
+    def construct(self):
+        for i in range(5):
+            self.play(FadeIn(Dot()))
+            self.wait(3)
+"""
+
+
+@pytest.fixture(autouse=True)
+def isolated_text_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(text_cache, "_text_cache", TextCache(str(tmp_path / "text_cache")))
+
+
+def test_scene_is_split_by_animation_index(tmp_path, monkeypatch):
+    script = tmp_path / "manim.py"
+    script.write_text(SCENE)
+    monkeypatch.setattr(video_maker, "RENDER_PROCESSES", 3)
+
+    assert render_cost.animation_counts(SCENE) == {"LSTMScene": 10}
+    parts = VideoMaker(str(script), "LSTMScene", preview=False)._render_parts(["LSTMScene"])
+
+    # 10 animations over at most 10 // 4 = 2 processes; the last range is open-ended
+    assert parts == [("LSTMScene", (0, 4)), ("LSTMScene", (5, None))]
+
+
+def test_ranges_are_stitched_without_reencoding(tmp_path, monkeypatch):
+    script = tmp_path / "manim.py"
+    script.write_text(SCENE)
+    monkeypatch.setattr(video_maker, "RENDER_PROCESSES", 2)
+    concat_calls = []
+
+    def fake_run(cmd, **kwargs):
+        if cmd[0] == "manim":
+            media_dir = cmd[cmd.index("--media_dir") + 1]
+            out_dir = os.path.join(media_dir, "videos", "manim", "480p15")
+            os.makedirs(out_dir, exist_ok=True)
+            open(os.path.join(out_dir, "LSTMScene.mp4"), "wb").write(cmd[cmd.index("-n") + 1].encode())
+            with open(kwargs["env"]["ELIDED_HOLDS_FILE"], "w") as f:
+                json.dump([["LSTMScene", 1.5, 2.9]], f)
+            return subprocess.CompletedProcess(cmd, 0, "", "")
+        if cmd[0] == "ffprobe":
+            return subprocess.CompletedProcess(cmd, 0, "2.0\n", "")
+        concat_calls.append(cmd)
+        open(cmd[-1], "wb").write(b"joined")
+        return subprocess.CompletedProcess(cmd, 0, b"", b"")
+
+    monkeypatch.setattr(subprocess, "run", fake_run)
+    maker = VideoMaker(str(script), "LSTMScene", preview=False)
+    parts = maker._render_parts(["LSTMScene"])
+
+    outputs, holds = maker._render_parallel(str(script), parts, str(tmp_path), 60)
+
+    assert outputs == {"LSTMScene": str(tmp_path / "LSTMScene.mp4")}
+    assert concat_calls[0][-3:] == ["-c", "copy", str(tmp_path / "LSTMScene.mp4")]
+    # The second range's hold moves by the first range's length
+    assert holds == {"LSTMScene": [(1.5, 2.9), (3.5, 2.9)]}
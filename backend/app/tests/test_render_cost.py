@@ -0,0 +1,80 @@
+import threading
+
+from app.controllers import render_cost
+from app.controllers.render_queue import RenderQueue
+
+SCENE = '''
+from manim import *
+
+class LSTMScene(Scene):
+    def construct(self):
+        title = Text("Gates")
+        self.play(Write(title), run_time=2)
+        self.wait(15)
+        for i in range(3):
+            self.show_gate(i)
+        self.play(FadeOut(title))
+
+    def show_gate(self, i):
+        gate = MathTex("\\\\sigma")
+        self.play(Create(gate, run_time=0.5))
+        self.wait()
+'''
+
+
+def test_estimate_sums_timeline_and_objects():
+    estimate = render_cost.estimate_source(SCENE, "LSTMScene", quality="l", elide=False)
+
+    # 2 + 3 * 0.5 + 1 seconds of animation, 15 + 3 * 1 seconds of waiting
+    assert estimate.play_seconds == 4.5
+    assert estimate.wait_seconds == 18.0
+    assert estimate.frames == round(22.5 * 15)
+    assert (estimate.objects, estimate.tex_objects) == (4, 3)
+    assert render_cost.estimate_source("class Broken(:", "LSTMScene") is None
+
+
+def test_timeout_scales_with_cost_within_bounds():
+    short = render_cost.estimate_source(SCENE, quality="l")
+    long = render_cost.estimate_source(SCENE.replace("range(3)", "range(300)"), quality="h")
+
+    assert long.render_seconds > short.render_seconds
+    assert short.timeout(900) == render_cost.MIN_RENDER_TIMEOUT
+    assert long.timeout(900) == 900
+
+
+def test_queue_runs_shortest_job_first():
+    order = []
+    queue = RenderQueue(workers=1, name="test_sjf")
+    started, release = threading.Event(), threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+
+    queue.submit("blocker", block)
+    assert started.wait(5)
+    queue.submit("long", order.append, "long", cost=600)
+    queue.submit("short", order.append, "short", cost=30)
+    release.set()
+    queue.join()
+
+    assert order == ["short", "long"]
+
+
+def test_elided_waits_count_toward_length_but_not_cost():
+    full = render_cost.estimate_source(SCENE, quality="h", elide=False)
+    elided = render_cost.estimate_source(SCENE, quality="h", elide=True)
+
+    assert elided.frames == full.frames
+    assert (elided.wait_seconds, elided.held_seconds) == (0.0, 18.0)
+    assert elided.render_seconds < full.render_seconds
+
+
+def test_estimate_sums_only_the_listed_scenes():
+    source = SCENE + SCENE.replace("LSTMScene", "LSTMScene02").replace("from manim import *", "")
+    one = render_cost.estimate_source(source, "LSTMScene", quality="l")
+    both = render_cost.estimate_source(source, ["LSTMScene", "LSTMScene02"], quality="l")
+
+    assert render_cost.estimate_source(source, ["LSTMScene"], quality="l").frames == one.frames
+    assert both.play_seconds + both.wait_seconds + both.held_seconds == 45.0
+    assert one.play_seconds + one.wait_seconds + one.held_seconds == 22.5
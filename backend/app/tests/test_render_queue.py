@@ -0,0 +1,46 @@
+from types import SimpleNamespace
+
+from app.controllers.render_queue import RenderQueue
+from app.routes import chat_routes
+
+
+def test_jobs_run_in_order_and_survive_failures():
+    done = []
+
+    def fail():
+        raise RuntimeError("render crashed")
+
+    queue = RenderQueue(workers=1, name="test_render")
+    queue.submit("first", done.append, 1)
+    queue.submit("broken", fail)
+    queue.submit("last", done.append, 2)
+    queue.join()
+
+    assert done == [1, 2]
+    assert queue.pending() == 0
+
+
+def test_hd_publish_uploads_only_the_video(tmp_path, monkeypatch):
+    uploads = []
+
+    class FakeStorage:
+        def upload_file(self, path, file_name=None, session_id=None, move=False):
+            uploads.append(file_name)
+            return f"/api/media/{file_name}"
+
+    def no_hls(storage, video_file):
+        raise AssertionError("HD pass must not package HLS")
+
+    video, poster = tmp_path / "hd.mp4", tmp_path / "poster.jpg"
+    video.write_bytes(b"video")
+    poster.write_bytes(b"poster")
+    monkeypatch.setattr(chat_routes, "SupabaseStorage", FakeStorage)
+    monkeypatch.setattr(chat_routes, "HLS_ENABLED", True)
+    monkeypatch.setattr(chat_routes, "_package_and_upload_hls", no_hls)
+
+    maker = SimpleNamespace(duration=12.0, poster_path=str(poster))
+    published = chat_routes._publish_video(maker, str(video), "s1", extras=False)
+
+    assert len(uploads) == 1 and published["video_url"] == f"/api/media/{uploads[0]}"
+    assert published["video_hls_url"] is None and published["video_poster_url"] is None
+    assert not poster.exists()
@@ -0,0 +1,110 @@
+import json
+import os
+import subprocess
+
+import pytest
+
+from app.controllers.combiner import CombinedCodeGenerator, scene_fingerprints
+from app.controllers.video_maker import VideoMaker
+from app.controllers.voiceover_maker import VoiceOverMaker
+from app.services import scene_cache
+from app.services.scene_cache import SceneCache
+
+
+def _chunk(caption, wait=3):
+    return f"""from manim import *
+
+class LSTMScene(Scene):
+    def construct(self):
+        title = Text({caption!r})  # a comment that does not matter
+        self.play(Write(title))
+        self.wait({wait})
+"""
+
+
+@pytest.fixture(autouse=True)
+def cache(tmp_path, monkeypatch):
+    cache = SceneCache(str(tmp_path / "scene_cache"))
+    monkeypatch.setattr(scene_cache, "_scene_cache", cache)
+    monkeypatch.chdir(tmp_path)
+    return cache
+
+
+def test_fingerprint_ignores_position_and_comments():
+    first = CombinedCodeGenerator([_chunk("Intro"), _chunk("Loss")]).generate_combined_code()
+    second = CombinedCodeGenerator([_chunk("Loss").replace("# a comment", "# other"), _chunk("Gradient")]).generate_combined_code()
+
+    assert scene_fingerprints(first)["LSTMScene02"] == scene_fingerprints(second)["LSTMScene01"]
+    assert scene_fingerprints(first)["LSTMScene01"] != scene_fingerprints(second)["LSTMScene02"]
+
+
+def test_follow_up_renders_only_changed_scenes(tmp_path, monkeypatch):
+    rendered = []
+
+    def fake_run(cmd, **kwargs):
+        if cmd[:2] == ["manim", "--version"]:
+            return subprocess.CompletedProcess(cmd, 0, "Manim Community v0.18.0\n", "")
+        if cmd[0] == "manim":
+            scenes = cmd[cmd.index("--disable_caching") + 2:]
+            rendered.append(scenes)
+            media_dir = cmd[cmd.index("--media_dir") + 1]
+            out_dir = os.path.join(media_dir, "videos", "manim", "480p15")
+            os.makedirs(out_dir, exist_ok=True)
+            for scene in scenes:
+                open(os.path.join(out_dir, f"{scene}.mp4"), "wb").write(scene.encode())
+            with open(kwargs["env"]["ELIDED_HOLDS_FILE"], "w") as f:
+                json.dump([[scene, 1.0, 2.9] for scene in scenes], f)
+            return subprocess.CompletedProcess(cmd, 0, "", "")
+        if cmd[0] == "ffprobe":
+            return subprocess.CompletedProcess(cmd, 0, "2.0\n", "")
+        open(cmd[cmd.index("-movflags") + 2], "wb").write(b"joined")
+        return subprocess.CompletedProcess(cmd, 0, b"", b"")
+
+    monkeypatch.setattr(subprocess, "run", fake_run)
+
+    def render(chunks):
+        script = CombinedCodeGenerator(chunks).save_to_file(folder=str(tmp_path / "generated"))
+        maker = VideoMaker(script, "LSTMScene", preview=False, session_id="s1")
+        return maker._try_manim_render()
+
+    assert render([_chunk("Intro"), _chunk("Loss")])
+    assert render([_chunk("Intro"), _chunk("Loss", wait=5)])
+
+    assert rendered == [["LSTMScene01", "LSTMScene02"], ["LSTMScene02"]]
+
+
+def test_scenes_and_narration_are_assembled_in_one_pass(tmp_path, monkeypatch):
+    encodes = []
+
+    def fake_run(cmd, **kwargs):
+        if cmd[:2] == ["manim", "--version"]:
+            return subprocess.CompletedProcess(cmd, 0, "Manim Community v0.18.0\n", "")
+        if cmd[0] == "manim":
+            media_dir = cmd[cmd.index("--media_dir") + 1]
+            out_dir = os.path.join(media_dir, "videos", "manim", "480p15")
+            os.makedirs(out_dir, exist_ok=True)
+            for scene in cmd[cmd.index("--disable_caching") + 2:]:
+                open(os.path.join(out_dir, f"{scene}.mp4"), "wb").write(scene.encode())
+            with open(kwargs["env"]["ELIDED_HOLDS_FILE"], "w") as f:
+                json.dump([["LSTMScene02", 1.0, 2.9]], f)
+            return subprocess.CompletedProcess(cmd, 0, "", "")
+        if cmd[0] == "ffprobe":
+            return subprocess.CompletedProcess(cmd, 0, "2.0\n", "")
+        encodes.append(cmd)
+        open(cmd[cmd.index("-movflags") + 2], "wb").write(b"final")
+        return subprocess.CompletedProcess(cmd, 0, b"", b"")
+
+    monkeypatch.setattr(subprocess, "run", fake_run)
+    narration = VoiceOverMaker()
+    narration.output_path = str(tmp_path / "voice.mp3")
+    open(narration.output_path, "wb").close()
+    monkeypatch.setattr(VideoMaker, "_narration", lambda self, voiceover=None: narration)
+
+    script = CombinedCodeGenerator([_chunk("Intro"), _chunk("Loss")]).save_to_file(folder=str(tmp_path / "generated"))
+    assert VideoMaker(script, "LSTMScene", preview=False).render_video(add_voiceover=True)
+
+    [cmd] = encodes
+    inputs = [cmd[i + 1] for i, arg in enumerate(cmd) if arg == "-i"]
+    assert [os.path.basename(path) for path in inputs] == ["LSTMScene01.mp4", "LSTMScene02.mp4", "voice.mp3"]
+    # The second scene's hold lands after the first scene's two seconds
+    assert "end=3.000000" in cmd[cmd.index("-filter_complex") + 1]
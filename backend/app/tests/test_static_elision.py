@@ -0,0 +1,85 @@
+import atexit
+import json
+import sys
+import types
+
+import pytest
+
+from app.controllers import static_elision
+
+
+class FakeRenderer:
+    """Like Manim's renderer under -n: the clock runs through skipped animations too"""
+
+    def __init__(self, first_animation):
+        self.first_animation = first_animation
+        self.num_plays = 0
+        self.time = 0.0
+        self.skip_animations = False
+
+    def play(self, seconds):
+        self.skip_animations = self.num_plays < self.first_animation
+        self.time += seconds
+        self.num_plays += 1
+
+
+class FakeScene:
+    def __init__(self, first_animation=0):
+        self.renderer = FakeRenderer(first_animation)
+
+    def play(self, seconds):
+        self.renderer.play(seconds)
+
+    def wait(self, duration=1.0, stop_condition=None, frozen_frame=None):
+        self.play(duration)
+
+    def should_update_mobjects(self):
+        return False
+
+
+def render_holds(tmp_path, monkeypatch, first_animation):
+    """Run the prelude against a fake Manim and return the holds it writes"""
+    holds_file = tmp_path / f"holds{first_animation}.json"
+    writers = []
+    monkeypatch.setitem(sys.modules, "manim", types.SimpleNamespace(
+        Scene=type("Scene", (FakeScene,), {}), config=types.SimpleNamespace(frame_rate=10)))
+    monkeypatch.setattr(atexit, "register", writers.append)
+    monkeypatch.setenv("ELIDED_HOLDS_FILE", str(holds_file))
+    namespace = {}
+    exec(static_elision.PRELUDE, namespace)
+    scene = type("LSTMScene", (namespace["_ElisionScene"],), {})(first_animation)
+    for _ in range(3):
+        scene.play(1.0)
+        scene.wait(3)
+    writers[0]()
+    return static_elision.read_holds(str(holds_file)).get("LSTMScene", [])
+
+
+def test_elided_script_keeps_the_scene_and_compiles(tmp_path):
+    script = tmp_path / "manim.py"
+    script.write_text("from manim import *\n\nclass LSTMScene(Scene):\n    def construct(self):\n        self.wait(5)\n")
+
+    elided = static_elision.elide_script(str(script), str(tmp_path / "elided.py"))
+
+    source = open(elided).read()
+    compile(source, elided, "exec")
+    assert source.endswith(script.read_text())
+    assert "_ElisionScene.wait = _elided_wait" in source
+
+
+def test_read_holds_sorts_and_tolerates_missing_files(tmp_path):
+    holds_file = tmp_path / "holds.json"
+    holds_file.write_text(json.dumps([["S01", 6.5, 2.9], ["S01", 2.0, 14.9], ["S01", 3.0, 0], ["S02", 1.0, 4.9]]))
+
+    assert static_elision.read_holds(str(holds_file)) == {"S01": [(2.0, 14.9), (6.5, 2.9)], "S02": [(1.0, 4.9)]}
+    assert static_elision.read_holds(str(tmp_path / "missing.json")) == {}
+
+
+def test_ranged_render_holds_are_relative_to_its_own_clip(tmp_path, monkeypatch):
+    serial = render_holds(tmp_path, monkeypatch, 0)
+    # -n 2 skips the first play and wait; its clip starts at the second play
+    ranged = render_holds(tmp_path, monkeypatch, 2)
+
+    assert [position for position, _ in serial] == pytest.approx([1.1, 2.2, 3.3])
+    assert [position for position, _ in ranged] == pytest.approx([1.1, 2.2])
+    assert [seconds for _, seconds in ranged] == pytest.approx([2.9, 2.9])
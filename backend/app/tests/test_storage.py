@@ -0,0 +1,133 @@
+import hashlib
+import os
+
+import pytest
+
+from app.routes import blawb
+from app.routes.blawb import SupabaseStorage
+from app.services.local_store import LocalStore
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("supaurl", raising=False)
+    monkeypatch.delenv("supakey", raising=False)
+    # Tiny parts so a small file exercises the chunked path
+    monkeypatch.setattr(blawb, "CHUNK_SIZE", 1000)
+    monkeypatch.setattr(blawb, "RESUMABLE_THRESHOLD", 4000)
+    monkeypatch.setattr(blawb, "local_store", LocalStore(str(tmp_path / "media.db")))
+    return SupabaseStorage()
+
+
+def test_large_local_upload_is_written_in_parts(storage, tmp_path, monkeypatch):
+    # Only uploads from another device are copied, so pretend this one is
+    monkeypatch.setattr(blawb, "_same_device", lambda path, directory: False)
+    source = tmp_path / "video.mp4"
+    payload = os.urandom(10_500)
+    source.write_bytes(payload)
+
+    url = storage.upload_file(str(source))
+    stored_name = url.rsplit("/", 1)[-1]
+
+    assert (tmp_path / "local_storage" / stored_name).read_bytes() == payload
+    assert not list((tmp_path / "local_storage").glob("*.upload"))
+
+    download = tmp_path / "download.mp4"
+    assert storage.retrieve_file(stored_name, str(download)) == str(download)
+    assert download.read_bytes() == payload
+
+
+def test_failed_part_is_retried(monkeypatch, tmp_path, storage):
+    monkeypatch.setattr(blawb.time, "sleep", lambda seconds: None)
+    source = tmp_path / "clip.mp4"
+    source.write_bytes(b"x" * 5000)
+
+    upload = blawb._LocalChunkedUpload(str(tmp_path / "clip_copy.mp4"), 5000)
+    real_upload_part = upload.upload_part
+    failures = {2000: 1}
+
+    def flaky_upload_part(offset, data):
+        if failures.get(offset):
+            failures[offset] -= 1
+            raise ConnectionError("dropped")
+        real_upload_part(offset, data)
+
+    upload.upload_part = flaky_upload_part
+    storage._upload_in_parts(upload, str(source))
+
+    assert (tmp_path / "clip_copy.mp4").read_bytes() == b"x" * 5000
+
+
+def test_identical_uploads_are_stored_once(storage, tmp_path):
+    payload = os.urandom(2000)
+    first = tmp_path / "first.png"
+    second = tmp_path / "second.png"
+    first.write_bytes(payload)
+    second.write_bytes(payload)
+
+    url_a = storage.upload_file(str(first), session_id="s1")
+    url_b = storage.upload_file(str(second), session_id="s2")
+
+    digest = hashlib.sha256(payload).hexdigest()
+    assert url_a == url_b == f"/api/media/{digest}.png"
+    assert [p.name for p in (tmp_path / "local_storage").iterdir()] == [f"{digest}.png"]
+    refs = blawb.local_store.get_media_refs(digest)
+    assert [(r["session_id"], r["file_name"]) for r in refs] == [("s1", "first.png"), ("s2", "second.png")]
+
+
+def test_kept_source_can_be_rewritten_after_upload(storage, tmp_path):
+    source = tmp_path / "image.png"
+    payload = os.urandom(3000)
+    source.write_bytes(payload)
+
+    url = storage.upload_file(str(source))
+    stored = tmp_path / "local_storage" / url.rsplit("/", 1)[-1]
+    # The next upload with the same name rewrites the file in place
+    with open(source, "wb") as f:
+        f.write(os.urandom(3000))
+
+    assert os.stat(stored).st_ino != os.stat(source).st_ino
+    assert stored.read_bytes() == payload
+
+
+def test_moved_upload_takes_the_source(storage, tmp_path):
+    source = tmp_path / "render.mp4"
+    payload = os.urandom(3000)
+    source.write_bytes(payload)
+
+    url = storage.upload_file(str(source), move=True)
+
+    assert not source.exists()
+    assert (tmp_path / "local_storage" / url.rsplit("/", 1)[-1]).read_bytes() == payload
+
+
+def test_moved_duplicate_is_removed(storage, tmp_path, monkeypatch):
+    payload = os.urandom(3000)
+    first, second, third = (tmp_path / f"render{i}.mp4" for i in range(3))
+    for path in (first, second, third):
+        path.write_bytes(payload)
+
+    url = storage.upload_file(str(first))
+    # Known hash
+    assert storage.upload_file(str(second), move=True) == url
+    # Object already in local storage but missing from the index
+    monkeypatch.setattr(blawb, "local_store", LocalStore(str(tmp_path / "fresh.db")))
+    assert storage.upload_file(str(third), move=True) == url
+
+    assert not second.exists() and not third.exists()
+    assert (tmp_path / "local_storage" / url.rsplit("/", 1)[-1]).read_bytes() == payload
+
+
+def test_tree_upload_keeps_relative_paths(storage, tmp_path):
+    tree = tmp_path / "hls"
+    (tree / "v0").mkdir(parents=True)
+    (tree / "master.m3u8").write_text("#EXTM3U\nv0/index.m3u8\n")
+    (tree / "v0" / "index.m3u8").write_text("#EXTM3U\nseg_000.ts\n")
+    (tree / "v0" / "seg_000.ts").write_bytes(b"ts")
+
+    url = storage.upload_tree(str(tree), "hls/" + "c" * 64, "master.m3u8")
+
+    assert url == "/api/media/hls/" + "c" * 64 + "/master.m3u8"
+    stored = tmp_path / "local_storage" / "hls" / ("c" * 64)
+    assert (stored / "v0" / "seg_000.ts").read_bytes() == b"ts"
@@ -0,0 +1,71 @@
+import pytest
+import requests
+
+from app.services import metrics
+from app.services import supabase_client
+from app.services.supabase_client import CircuitBreaker, SupabaseRestClient
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(supabase_client.time, "monotonic", fake)
+    return fake
+
+
+def test_breaker_opens_and_probes_after_reset(clock):
+    breaker = CircuitBreaker("test_breaker", failure_threshold=2, reset_timeout=30)
+
+    breaker.record_failure()
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow_request()
+
+    clock.now += 31
+    # Exactly one probe is let through while half-open
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert metrics.snapshot()["gauges"]["test_breaker.circuit_state"] == "closed"
+
+
+def test_failed_probe_reopens(clock):
+    breaker = CircuitBreaker("test_probe", failure_threshold=1, reset_timeout=5)
+    breaker.record_failure()
+    clock.now += 6
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow_request()
+
+
+def test_client_skips_network_while_open(monkeypatch, clock):
+    client = SupabaseRestClient("http://supabase.invalid", "key", retries=0,
+                                breaker=CircuitBreaker("test_client", failure_threshold=1))
+    calls = []
+
+    def failing_request(*args, **kwargs):
+        calls.append(args)
+        raise requests.ConnectionError("down")
+
+    monkeypatch.setattr(client.session, "request", failing_request)
+
+    with pytest.raises(requests.ConnectionError):
+        client.get("chat_sessions")
+    assert client.get("chat_sessions") is None
+    assert len(calls) == 1
+
+
+def test_client_disabled_without_credentials():
+    assert SupabaseRestClient(None, None).get("chat_sessions") is None
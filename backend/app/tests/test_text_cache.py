@@ -0,0 +1,56 @@
+import os
+import sys
+import types
+
+from app.services.text_cache import PRELUDE, TextCache, shared_text_script, warmup_source
+
+
+def test_prelude_writes_svgs_into_place_atomically(tmp_path, monkeypatch):
+    final = tmp_path / "3f2a9c0d1b7e4a55.svg"
+    written = []
+
+    def text2svg(settings, size, line_spacing, disable_liga, file_name, *rest):
+        # A concurrent render checking for the SVG must not see it half written
+        assert not final.exists()
+        with open(file_name, "w") as f:
+            f.write("<svg>f(x)</svg>")
+        written.append(file_name)
+        return file_name
+
+    pango = types.SimpleNamespace(text2svg=text2svg, MarkupUtils=type("MarkupUtils", (), {}))
+    monkeypatch.setitem(sys.modules, "manimpango", pango)
+    exec(PRELUDE, {})
+
+    assert pango.text2svg([], 48, 1, False, str(final), 0, 0, 600, 400, "f(x)") == str(final)
+    assert final.read_text() == "<svg>f(x)</svg>"
+    assert written[0] != str(final)
+    assert os.listdir(tmp_path) == [final.name]
+
+
+def test_refresh_counts_new_svgs_and_evicts_the_oldest(tmp_path):
+    cache = TextCache(str(tmp_path / "text_cache"), max_bytes=100)
+    for i, name in enumerate(["old.svg", "new.svg"]):
+        path = os.path.join(cache.directory, name)
+        with open(path, "w") as f:
+            f.write("x" * 60)
+        os.utime(path, (i, i))
+    # An SVG another render is still writing is neither counted nor evicted
+    open(os.path.join(cache.directory, ".new2.svg.1234abcd.tmp"), "w").write("x" * 60)
+
+    assert cache.refresh() == 2
+    assert sorted(os.listdir(cache.directory)) == [".new2.svg.1234abcd.tmp", "new.svg"]
+
+
+def test_scripts_and_warmup_carry_the_prelude(tmp_path, monkeypatch):
+    script = tmp_path / "manim.py"
+    script.write_text("from manim import *\n")
+    shared = shared_text_script(str(script), str(tmp_path / "shared.py"))
+    assert open(shared).read() == PRELUDE + "from manim import *\n"
+
+    monkeypatch.setenv("TEXT_CACHE_WARMUP_LABELS", "Gradient, Epoch")
+    source = warmup_source(labels=["x"], font_sizes=[30])
+
+    compile(source, "text_warmup.py", "exec")
+    assert source.startswith(PRELUDE)
+    assert "['x', 'Gradient', 'Epoch']" in source
+    assert "Text(label, font_size=size)" in source
@@ -0,0 +1,138 @@
+import threading
+import time
+
+import pytest
+
+from app.controllers import tts_backends
+from app.controllers import video_maker as video_maker_module
+from app.controllers.tts_backends import TTSBackend, TTSRegistry
+from app.services.audio_cache import AudioCache
+from app.controllers.video_maker import VideoMaker
+from app.controllers.voiceover_maker import VoiceOverMaker
+
+
+@pytest.fixture(autouse=True)
+def audio_cache(tmp_path, monkeypatch):
+    cache = AudioCache(str(tmp_path / "audio_cache"))
+    monkeypatch.setattr(tts_backends, "_audio_cache", cache)
+    return cache
+
+
+class FakeBackend(TTSBackend):
+    extension = ".mp3"
+
+    def __init__(self, name, fail=False, delay=0.0):
+        self.name = name
+        self.fail = fail
+        self.delay = delay
+        self.active = []
+        self.peak = 0
+        self.calls = []
+
+    def synthesize(self, text, path, lang="en", tld="us", slow=False):
+        self.calls.append(text)
+        self.active.append(text)
+        self.peak = max(self.peak, len(self.active))
+        time.sleep(self.delay)
+        self.active.remove(text)
+        if self.fail:
+            raise ConnectionError("offline")
+        with open(path, "wb") as f:
+            f.write(text.encode())
+
+
+def test_scene_clips_are_synthesized_in_parallel_and_joined_in_order(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    backend = FakeBackend("fake", delay=0.05)
+    monkeypatch.setattr(tts_backends, "registry", TTSRegistry([backend]))
+    maker = VoiceOverMaker()
+
+    track = maker.generate_scene_voiceovers(["One neuron", "", "A layer", "The network"])
+
+    assert open(track, "rb").read() == b"One neuronA layerThe network"
+    assert backend.peak > 1
+    assert list((tmp_path / "temp").iterdir()) == [tmp_path / "temp" / track.rsplit("/", 1)[-1]]
+
+
+def test_offline_backend_falls_back_and_is_ranked_last(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    online = FakeBackend("online", fail=True)
+    local = FakeBackend("local")
+    registry = TTSRegistry([online, local])
+    monkeypatch.setattr(tts_backends, "registry", registry)
+
+    maker = VoiceOverMaker("Gradient descent")
+    assert open(maker.generate_voiceover(), "rb").read() == b"Gradient descent"
+    assert [backend.name for backend in registry.ordered()] == ["local", "online"]
+
+
+def test_registry_prefers_the_fastest_measured_backend():
+    slow, fast, new = FakeBackend("slow"), FakeBackend("fast"), FakeBackend("new")
+    registry = TTSRegistry([slow, fast, new])
+    registry.record(slow, 2.0, 100)
+    registry.record(fast, 0.5, 100)
+
+    # Unmeasured backends get a first try, then measured ones by speed
+    assert [backend.name for backend in registry.ordered()] == ["new", "fast", "slow"]
+    assert [backend.name for backend in TTSRegistry([slow, fast], order="fixed").ordered()] == ["slow", "fast"]
+
+
+def test_narration_is_ready_before_render_finishes(tmp_path, monkeypatch):
+    script = tmp_path / "scene.py"
+    script.write_text("# Scene\n")
+    narration_done = threading.Event()
+    order = []
+
+    def fake_voiceovers(self, texts, max_workers=4):
+        self.output_path = str(tmp_path / "voice.mp3")
+        open(self.output_path, "wb").close()
+        narration_done.set()
+        return self.output_path
+
+    def fake_render(self):
+        order.append(("render saw narration", narration_done.wait(1)))
+        path = tmp_path / "render.mp4"
+        path.write_bytes(b"video")
+        return [str(path)]
+
+    def fake_combine(self, video_path, output_path=None, holds=()):
+        order.append("combine")
+        return video_path
+
+    monkeypatch.setattr(VoiceOverMaker, "generate_scene_voiceovers", fake_voiceovers)
+    monkeypatch.setattr(VoiceOverMaker, "combine_with_video", fake_combine)
+    monkeypatch.setattr(VideoMaker, "_try_manim_render", fake_render)
+    monkeypatch.setattr(video_maker_module, "finish_video", lambda path: (path, None, None))
+
+    maker = VideoMaker(str(script), preview=False, narration=["One neuron", "A layer"])
+    maker.render_video(add_voiceover=True)
+
+    assert order == [("render saw narration", True), "combine"]
+
+
+def test_sentences_are_reused_across_narrations(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    backend = FakeBackend("fake")
+    monkeypatch.setattr(tts_backends, "registry", TTSRegistry([backend]))
+
+    first = VoiceOverMaker("A neuron sums inputs.  It then fires.").generate_voiceover()
+    second = VoiceOverMaker("A neuron sums inputs. Layers stack neurons.").generate_voiceover()
+
+    assert backend.calls == ["A neuron sums inputs.", "It then fires.", "Layers stack neurons."]
+    assert open(first, "rb").read() == b"A neuron sums inputs.It then fires."
+    assert open(second, "rb").read() == b"A neuron sums inputs.Layers stack neurons."
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = AudioCache(str(tmp_path / "cache"), max_bytes=250)
+    for name in ("a", "b", "c"):
+        clip = tmp_path / f"{name}.mp3"
+        clip.write_bytes(b"x" * 100)
+        cache.put(name, ".mp3", str(clip))
+        if name == "b":
+            # Touch "a" so "b" is now the least recently used
+            time.sleep(0.01)
+            assert cache.get("a", ".mp3")
+
+    assert cache.get("b", ".mp3") is None
+    assert cache.get("a", ".mp3") and cache.get("c", ".mp3")
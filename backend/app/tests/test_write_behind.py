@@ -0,0 +1,35 @@
+import threading
+
+from app.services.write_behind import MessageWriteQueue
+
+
+def test_messages_are_written_in_one_batch(tmp_path):
+    batches = []
+    queue = MessageWriteQueue(str(tmp_path / "spool.jsonl"), batches.append, flush_interval=0.2)
+
+    queue.enqueue({"id": "m1", "sender": "user"})
+    queue.enqueue({"id": "m2", "sender": "ai"})
+
+    assert queue.flush(timeout=5)
+    assert [[m["id"] for m in batch] for batch in batches] == [["m1", "m2"]]
+    assert (tmp_path / "spool.jsonl").read_text() == ""
+
+
+def test_unwritten_messages_are_replayed_from_spool(tmp_path):
+    spool = str(tmp_path / "spool.jsonl")
+    blocked = threading.Event()
+
+    def failing_write(batch):
+        blocked.set()
+        raise ConnectionError("store unavailable")
+
+    queue = MessageWriteQueue(spool, failing_write, flush_interval=0, retry_delay=60)
+    queue.enqueue({"id": "m1"})
+    assert blocked.wait(5)
+    assert not queue.close(timeout=0.2)
+
+    # A fresh queue (e.g. after a restart) picks the message up again
+    written = []
+    replayed = MessageWriteQueue(spool, written.extend, flush_interval=0)
+    assert replayed.flush(timeout=5)
+    assert [m["id"] for m in written] == ["m1"]
@@ -1,6 +1,13 @@
 from app import create_app
+from app.controllers.render_queue import hd_render_queue
+from app.controllers.video_maker import warm_up_text_cache
+from app.services.text_cache import TEXT_CACHE_WARMUP
 
 app = create_app()
 
+# Fill the shared text cache in the background; the render workers run it before any HD job
+if TEXT_CACHE_WARMUP:
+    hd_render_queue.submit("text cache warm-up", warm_up_text_cache)
+
 if __name__ == "__main__":
     app.run(debug=True, use_reloader=False, port=5001)
@@ -6,10 +6,11 @@ import { Textarea } from "@/components/ui/textarea";
 import { Button } from "@/components/ui/button";
 import { Send, User, Bot, X, Calendar } from "lucide-react";
 import Image from "next/image";
-import { Session, Message } from "@/lib/types";
+import { Session, Message, HistoryRow } from "@/lib/types";
+import { fetchPage } from "@/lib/utils";
 import ReactMarkdown from 'react-markdown';
 
-const sendMessageToBackend = async (message: Message): Promise<{message: string, video_url: string | null}> => {
+const sendMessageToBackend = async (message: Message): Promise<{message: string, video_url: string | null, video_poster_url: string | null, video_hls_url: string | null, message_id: string | null, video_upgrade_pending: boolean}> => {
   console.log("Sending message to backend...");
   const formData = new FormData();
   formData.append("session_id", message.session_id || "NULL");
@@ -37,17 +38,60 @@ const sendMessageToBackend = async (message: Message): Promise<{message: string,
 
     return {
       message: result.message || "",
-      video_url: result.video_url || null
+      video_url: result.video_url || null,
+      video_poster_url: result.video_poster_url || null,
+      video_hls_url: result.video_hls_url || null,
+      message_id: result.message_id || null,
+      video_upgrade_pending: Boolean(result.video_upgrade_pending)
     };
   } catch (error) {
     console.error("Upload failed in sendMessageToBackend:", error);
     return {
       message: "Sorry, there was an error processing your request.",
-      video_url: null
+      video_url: null,
+      video_poster_url: null,
+      video_hls_url: null,
+      message_id: null,
+      video_upgrade_pending: false
     };
   }
 };
 
+// Poll until the background HD render replaces a draft video; resolves with the new URL, or null on timeout
+const waitForVideoUpgrade = async (messageId: string, draftUrl: string, intervalMs = 15000, timeoutMs = 30 * 60 * 1000): Promise<string | null> => {
+  const deadline = Date.now() + timeoutMs;
+  while (Date.now() < deadline) {
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+    try {
+      const response = await fetch(
+        `${process.env.NEXT_PUBLIC_BACKEND_URL}/api/message_video?message_id=${encodeURIComponent(messageId)}`
+      );
+      if (!response.ok) continue;
+      const result = await response.json();
+      if (result.video_url && result.video_url !== draftUrl) {
+        return result.video_url;
+      }
+    } catch (error) {
+      console.error("Polling for HD video failed:", error);
+    }
+  }
+  return null;
+};
+
+const historyUrl = (sessionId: string) =>
+  `${process.env.NEXT_PUBLIC_BACKEND_URL}/api/get_chat_histories?chat_session_id=${sessionId}`;
+
+const toMessage = (msg: HistoryRow): Message => ({
+  id: msg.id,
+  session_id: msg.chat_session_id,
+  sender: msg.sender,
+  message: msg.message,
+  videoUrl: msg.video_url,
+  imageUrl: msg.image_url,
+  time_created: msg.time_created,
+  file: null
+});
+
 // Helper function to format dates
 const formatDate = (dateString: string) => {
   try {
@@ -101,6 +145,9 @@ export default function ChatWindow({
   const [previewUrl, setPreviewUrl] = useState<string | null>(null);
   const [dragActive, setDragActive] = useState(false);
   const [isProcessing, setIsProcessing] = useState(false);
+  // Cursor for the next page of older messages; null once they are all loaded
+  const [historyCursor, setHistoryCursor] = useState<string | null>(null);
+  const [loadingEarlier, setLoadingEarlier] = useState(false);
   const scrollRef = useRef<HTMLDivElement | null>(null);
 
   useEffect(() => {
@@ -118,32 +165,10 @@ export default function ChatWindow({
     const loadSessionMessages = async () => {
       if (currentSession?.id && !newSession) {
         try {
-          const response = await fetch(
-            `${process.env.NEXT_PUBLIC_BACKEND_URL}/api/get_chat_histories?chat_session_id=${currentSession.id}`
-          );
-          const messages = await response.json();
-          
-          // Process messages to ensure video URLs are properly set
-          const processedMessages = messages.map((msg: {
-            id: string;
-            chat_session_id: string;
-            sender: "user" | "ai";
-            message: string;
-            video_url?: string;
-            image_url?: string;
-            time_created: string;
-          }) => ({
-            id: msg.id,
-            session_id: msg.chat_session_id,
-            sender: msg.sender,
-            message: msg.message,
-            videoUrl: msg.video_url,
-            imageUrl: msg.image_url,
-            time_created: msg.time_created,
-            file: null
-          }));
-          
-          setMessageHistory(processedMessages);
+          // Only the newest page; older messages load on request
+          const { rows, nextCursor } = await fetchPage<HistoryRow>(historyUrl(currentSession.id));
+          setMessageHistory(rows.map(toMessage));
+          setHistoryCursor(nextCursor);
         } catch (error) {
           console.error("Error loading chat history:", error);
         }
@@ -153,13 +178,30 @@ export default function ChatWindow({
     loadSessionMessages();
   }, [currentSession?.id, newSession]);
 
+  const loadEarlierMessages = async () => {
+    if (!currentSession?.id || !historyCursor || loadingEarlier) return;
+    setLoadingEarlier(true);
+    try {
+      const { rows, nextCursor } = await fetchPage<HistoryRow>(historyUrl(currentSession.id), historyCursor);
+      setMessageHistory((prev) => [...rows.map(toMessage), ...prev]);
+      setHistoryCursor(nextCursor);
+    } catch (error) {
+      console.error("Error loading earlier messages:", error);
+    } finally {
+      setLoadingEarlier(false);
+    }
+  };
+
+  // Follow new messages, but stay put when earlier ones are prepended
+  const lastMessage = messageHistory[messageHistory.length - 1];
   useEffect(() => {
     scrollRef.current?.scrollIntoView({ behavior: "smooth" });
-  }, [messageHistory]);
+  }, [lastMessage]);
 
   useEffect(() => {
     if (newSession) {
       setMessageHistory([]);
+      setHistoryCursor(null);
       setInput("");
       setFile(null);
       setPreviewUrl(null);
@@ -227,7 +269,7 @@ export default function ChatWindow({
 
     const newMessages: Message[] = [
       {
-        id: null,
+        id: response.message_id,
         session_id: currentSession?.id || null,
         sender: "ai",
         message: aiMessage,
@@ -240,12 +282,28 @@ export default function ChatWindow({
 
     if (videoUrl) {
       newMessages[0].videoUrl = videoUrl;
+      newMessages[0].videoPosterUrl = response.video_poster_url;
+      newMessages[0].videoHlsUrl = response.video_hls_url;
     }
 
     setMessageHistory((prev) => [...prev, ...newMessages]);
 
     console.log("history after", messageHistory);
     setIsProcessing(false);
+
+    // Swap in the HD render once it has been published
+    if (videoUrl && response.message_id && response.video_upgrade_pending) {
+      const messageId = response.message_id;
+      const hdUrl = await waitForVideoUpgrade(messageId, videoUrl);
+      if (hdUrl) {
+        setMessageHistory((prev) =>
+          prev.map((msg) =>
+            // The draft's HLS ladder would still be preferred, so drop it
+            msg.id === messageId ? { ...msg, videoUrl: hdUrl, videoHlsUrl: null } : msg
+          )
+        );
+      }
+    }
   };
 
   return (
@@ -264,10 +322,20 @@ export default function ChatWindow({
         </div>
       </div>
       <div className="flex-1 overflow-y-auto px-4 py-6 space-y-6">
+        {!newSession && historyCursor && (
+          <Button
+            className="w-full cursor-pointer text-zinc-400 hover:text-zinc-100"
+            variant="ghost"
+            onClick={loadEarlierMessages}
+            disabled={loadingEarlier}
+          >
+            {loadingEarlier ? "Loading..." : "Load earlier messages"}
+          </Button>
+        )}
         {!newSession &&
           messageHistory.map((msg, idx) => {
             return (
-              <div key={idx} className="flex items-start gap-4 w-full">
+              <div key={msg.id ?? `pending-${idx}`} className="flex items-start gap-4 w-full">
                 <div className="mt-1">
                   {msg.sender === "user" ? (
                     <User className="h-5 w-5 text-zinc-400" />
@@ -302,7 +370,28 @@ export default function ChatWindow({
                   {/* Handle video display from various sources */}
                   {msg.videoUrl && (
                     <div className="mt-3">
-                      <video controls className="rounded-md w-full max-w-md">
+                      <video
+                        key={msg.videoUrl}
+                        controls
+                        preload="metadata"
+                        poster={
+                          msg.videoPosterUrl?.startsWith('/api')
+                            ? `${process.env.NEXT_PUBLIC_BACKEND_URL}${msg.videoPosterUrl}`
+                            : msg.videoPosterUrl || undefined
+                        }
+                        className="rounded-md w-full max-w-md"
+                      >
+                        {/* Browsers with native HLS (Safari, iOS) stream the adaptive ladder; others use the mp4 */}
+                        {msg.videoHlsUrl && (
+                          <source
+                            src={
+                              msg.videoHlsUrl.startsWith('/api')
+                                ? `${process.env.NEXT_PUBLIC_BACKEND_URL}${msg.videoHlsUrl}`
+                                : msg.videoHlsUrl
+                            }
+                            type="application/vnd.apple.mpegurl"
+                          />
+                        )}
                         <source 
                           src={
                             msg.videoUrl.startsWith('/api') 
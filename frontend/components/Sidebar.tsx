@@ -3,6 +3,7 @@
 import { Button } from "@/components/ui/button";
 import { ScrollArea } from "@/components/ui/scroll-area";
 import { Session, Message } from "@/lib/types";
+import { fetchPage } from "@/lib/utils";
 import { Plus, MessageSquare } from "lucide-react";
 import React, { useState, useEffect } from "react";
 
@@ -56,50 +57,38 @@ export default function Sidebar({
   newSession: boolean;
   setNewSession: React.Dispatch<React.SetStateAction<boolean>>;
 }) {
+  // Cursor for the next page of older sessions; null once they are all loaded
+  const [sessionsCursor, setSessionsCursor] = useState<string | null>(null);
+
   useEffect(() => {
     const getSessions = async () => {
-      const response = await fetch(
+      const { rows, nextCursor } = await fetchPage<Session>(
         `${process.env.NEXT_PUBLIC_BACKEND_URL}/api/get_all_chat_sessions`
       );
-      const results = await response.json();
-      setSessionsList(results);
+      setSessionsList(rows);
+      setSessionsCursor(nextCursor);
     };
     getSessions();
   }, []);
 
+  const loadMoreSessions = async () => {
+    if (!sessionsCursor) return;
+    const { rows, nextCursor } = await fetchPage<Session>(
+      `${process.env.NEXT_PUBLIC_BACKEND_URL}/api/get_all_chat_sessions`,
+      sessionsCursor
+    );
+    setSessionsList((prev) => [...prev, ...rows]);
+    setSessionsCursor(nextCursor);
+  };
+
   const handleSession = async (id: string) => {
     const session_response = await fetch(
       `${process.env.NEXT_PUBLIC_BACKEND_URL}/api/get_chat_session?uuid=${id}`
     );
     const session_result = await session_response.json();
 
-    const history_response = await fetch(
-      `${process.env.NEXT_PUBLIC_BACKEND_URL}/api/get_chat_histories?chat_session_id=${id}`
-    );
-    const history_result = await history_response.json();
-
-    // Process messages to include video URLs properly
-    const processedMessages = history_result.map((msg: {
-      id: string;
-      chat_session_id: string;
-      sender: "user" | "ai";
-      message: string;
-      video_url?: string;
-      image_url?: string;
-      time_created: string;
-    }) => ({
-      id: msg.id,
-      session_id: msg.chat_session_id,
-      sender: msg.sender,
-      message: msg.message,
-      videoUrl: msg.video_url,
-      imageUrl: msg.image_url,
-      time_created: msg.time_created,
-      file: null
-    }));
-
+    // ChatWindow loads the session's newest messages when it changes
     setCurrentSession(session_result[0]);
-    setMessageHistory(processedMessages);
     setNewSession(false);
   };
 
@@ -155,6 +144,15 @@ export default function Sidebar({
                 </div>
               </div>
             ))}
+          {sessionsCursor && (
+            <Button
+              className="w-full cursor-pointer text-zinc-400 hover:text-zinc-100"
+              variant="ghost"
+              onClick={loadMoreSessions}
+            >
+              Load more
+            </Button>
+          )}
         </div>
       </ScrollArea>
     </div>
@@ -12,7 +12,20 @@ export interface Message {
     message: string | null;
     imageUrl?: string | null;
     videoUrl?: string | null;
+    videoPosterUrl?: string | null;
+    videoHlsUrl?: string | null;
     file?: File | null;
     time_created: string | null;
     imageSummary?: string | null;
 }
+
+// A message row as returned by /api/get_chat_histories
+export interface HistoryRow {
+    id: string;
+    chat_session_id: string;
+    sender: "user" | "ai";
+    message: string;
+    video_url?: string;
+    image_url?: string;
+    time_created: string;
+}
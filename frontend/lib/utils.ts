@@ -4,3 +4,11 @@ import { twMerge } from "tailwind-merge"
 export function cn(...inputs: ClassValue[]) {
   return twMerge(clsx(inputs))
 }
+
+// One page of a keyset-paginated endpoint; nextCursor is null on the last page
+export async function fetchPage<T>(url: string, cursor?: string | null): Promise<{ rows: T[]; nextCursor: string | null }> {
+  const separator = url.includes("?") ? "&" : "?";
+  const response = await fetch(cursor ? `${url}${separator}cursor=${encodeURIComponent(cursor)}` : url);
+  const rows: T[] = await response.json();
+  return { rows, nextCursor: response.headers.get("X-Next-Cursor") };
+}